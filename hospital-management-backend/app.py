@@ -2,11 +2,21 @@ from flask import Flask, request, jsonify, session, make_response
 from extensions import db, migrate, cors
 from config import Config
 from auth import login, logout
+from commands import register_commands
+from sql_stats import init_sql_stats
+from passwords import init_passwords
+from metrics import init_metrics
+from slow_queries import init_slow_queries
+from partitions import init_partitions
+from serializers import init_json
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     
+    # JSON responses through orjson when available, ISO 8601 datetimes
+    init_json(app)
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
@@ -16,21 +26,42 @@ def create_app():
                   origins=["http://localhost:3000", "http://localhost:3002"], 
                   supports_credentials=True,
                   allow_headers=["Content-Type", "Authorization"],
+                  expose_headers=["X-Next-Cursor", "X-SQL-Count"],
                   methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
     
     # Import models
-    from models import User, Patient, Appointment, Consultation, Billing, Queue, VitalSigns
+    from models import User, Patient, Appointment, Consultation, Billing, Queue, VitalSigns, DoctorPatient, DailyStats, QueueEvent
     
     # Register blueprints
     from routes.admin_routes import admin_bp
     from routes.receptionist_routes import receptionist_bp
     from routes.doctor_routes import doctor_bp
     from routes.vitals_routes import vitals_bp
+    from routes.export_routes import export_bp
     
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     app.register_blueprint(receptionist_bp, url_prefix='/api/receptionist')
     app.register_blueprint(doctor_bp, url_prefix='/api/doctor')
     app.register_blueprint(vitals_bp, url_prefix='/api/vitals')
+    app.register_blueprint(export_bp, url_prefix='/api/export')
+    
+    # CLI commands (flask check-query-plans, ...)
+    register_commands(app)
+    
+    # Per-request SQL statement count (optional X-SQL-Count header)
+    init_sql_stats(app)
+    
+    # 503 + Retry-After when the password hashing pool is saturated
+    init_passwords(app)
+    
+    # Per-endpoint latency, status and SQL metrics, served on /metrics
+    init_metrics(app)
+    
+    # Rotating JSON log of statements over SLOW_QUERY_THRESHOLD_MS
+    init_slow_queries(app)
+    
+    # Keeps monthly partitions created ahead of time (Postgres)
+    init_partitions(app)
     
     # Auth routes
     @app.route('/api/login', methods=['POST'])
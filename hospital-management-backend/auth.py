@@ -1,12 +1,18 @@
 from flask import request, jsonify, session
 from models import User
 from extensions import db
+from passwords import hash_password, needs_rehash
 
 def login():
     data = request.json
     user = User.query.filter_by(email=data['email']).first()
 
     if user and user.check_password(data['password']):
+        # Bring hashes made with an older method or cost up to the current one
+        if needs_rehash(user.password_hash):
+            user.password_hash = hash_password(data['password'])
+            db.session.commit()
+        
         session['user_id'] = user.id
         session['role'] = user.role
         session['department'] = user.department
@@ -0,0 +1,220 @@
+"""Throughput of gthread vs gevent workers under many concurrent clients.
+
+Starts gunicorn once per worker class (using gunicorn.conf.py, so the same
+settings production uses) against the same database, and drives it with
+--clients concurrent keep-alive clients cycling through the queue, dashboard
+and list endpoints for --duration seconds. Benchmark users and a small data
+set are created first if missing. Postgres shows the difference best: gevent
+only helps while a request is waiting on I/O, and SQLite calls block.
+
+    python -m benchmarks.concurrency --database-url postgresql://... --clients 200
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+PASSWORD = 'bench-password'
+ENDPOINTS = {
+    'receptionist': [
+        '/api/receptionist/queue',
+        '/api/receptionist/dashboard-summary',
+        '/api/receptionist/appointments?limit=50',
+        '/api/receptionist/all-billing?limit=50'
+    ],
+    'doctor': [
+        '/api/doctor/queue',
+        '/api/doctor/dashboard',
+        '/api/doctor/appointments?limit=50'
+    ],
+    'admin': [
+        '/api/admin/dashboard-summary',
+        '/api/admin/all-patients?limit=50'
+    ]
+}
+
+
+def _seed(database_url, patients, seed):
+    # Imported here so the app is configured for the benchmark database
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app
+    from extensions import db
+    from models import Appointment, Patient, Queue, User
+
+    app = create_app()
+    rng = random.Random(seed)
+    with app.app_context():
+        db.create_all()
+        for role in ENDPOINTS:
+            email = f'bench-{role}@hospital.com'
+            if not User.query.filter_by(email=email).first():
+                db.session.add(User(
+                    name=f'Bench {role.title()}', email=email, role=role,
+                    department='eye' if role == 'doctor' else None,
+                    password_hash=generate_password_hash(PASSWORD)
+                ))
+        db.session.commit()
+
+        doctor = User.query.filter_by(email='bench-doctor@hospital.com').one()
+        existing = Patient.query.count()
+        now = datetime.utcnow()
+        for i in range(existing, patients):
+            patient = Patient(
+                name=f'Bench Patient {i}', age=rng.randrange(1, 90),
+                gender=rng.choice(('male', 'female')), phone=f'07{rng.randrange(10 ** 8):08d}',
+                department='eye', created_at=now - timedelta(days=rng.randrange(30))
+            )
+            db.session.add(patient)
+            db.session.flush()
+            db.session.add(Appointment(
+                patient_id=patient.id, doctor_id=doctor.id,
+                date=date.today() + timedelta(days=rng.randrange(-15, 15)),
+                time=datetime.strptime('10:00', '%H:%M').time()
+            ))
+            if i % 10 == 0:
+                db.session.add(Queue(patient_id=patient.id, doctor_id=doctor.id, status='waiting'))
+        db.session.commit()
+
+
+def _wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f'gunicorn did not start on port {port}')
+
+
+def _login(port, role):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('POST', '/api/login', json.dumps({
+        'email': f'bench-{role}@hospital.com', 'password': PASSWORD
+    }), {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    response.read()
+    if response.status != 200:
+        raise SystemExit(f'Login as bench-{role} failed with HTTP {response.status}')
+    return response.getheader('Set-Cookie').split(';', 1)[0]
+
+
+def _client(port, cookies, deadline, rng, samples, errors, lock):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    local_samples = []
+    local_errors = 0
+    while time.time() < deadline:
+        role = rng.choice(list(ENDPOINTS))
+        path = rng.choice(ENDPOINTS[role])
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path, headers={'Cookie': cookies[role]})
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                local_samples.append((time.perf_counter() - started) * 1000)
+            else:
+                local_errors += 1
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    with lock:
+        samples.extend(local_samples)
+        errors[0] += local_errors
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+
+def _run_mode(mode, args, port):
+    env = dict(os.environ, DATABASE_URL=args.database_url,
+               GUNICORN_WORKER_CLASS=mode, GUNICORN_BIND=f'127.0.0.1:{port}',
+               GUNICORN_WORKERS=str(args.workers))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'run:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_for_port(port)
+        cookies = {role: _login(port, role) for role in ENDPOINTS}
+
+        samples = []
+        errors = [0]
+        lock = threading.Lock()
+        rng = random.Random(args.seed)
+        started = time.time()
+        deadline = started + args.duration
+        clients = [
+            threading.Thread(target=_client, args=(
+                port, cookies, deadline, random.Random(rng.random()), samples, errors, lock
+            ))
+            for _ in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.time() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    ordered = sorted(samples)
+    return {
+        'mode': mode,
+        'requests': len(ordered),
+        'errors': errors[0],
+        'requests_per_second': round(len(ordered) / elapsed, 1),
+        'p50_ms': round(_percentile(ordered, 0.50), 2),
+        'p95_ms': round(_percentile(ordered, 0.95), 2),
+        'p99_ms': round(_percentile(ordered, 0.99), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--modes', nargs='+', default=['gthread', 'gevent'])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--patients', type=int, default=5000, help='benchmark patients to create')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    _seed(args.database_url, args.patients, args.seed)
+
+    results = []
+    print(f'{"mode":<8} {"requests":>9} {"errors":>7} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for mode in args.modes:
+        row = _run_mode(mode, args, args.port)
+        results.append(row)
+        print(f'{row["mode"]:<8} {row["requests"]:>9} {row["errors"]:>7} {row["requests_per_second"]:>8.1f} '
+              f'{row["p50_ms"]:>8.1f} {row["p95_ms"]:>8.1f} {row["p99_ms"]:>8.1f}')
+
+    if len(results) > 1 and results[0]['requests_per_second']:
+        gain = results[-1]['requests_per_second'] / results[0]['requests_per_second']
+        print(f'{results[-1]["mode"]} vs {results[0]["mode"]}: {gain:.2f}x throughput '
+              f'at {args.clients} clients')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'clients': args.clients, 'workers': args.workers,
+                       'duration': args.duration, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Latency of func.date() filters vs half-open timestamp ranges.
+
+Fills consultation and billing with synthetic rows spread over a year and,
+at each scale, times the dashboard-style counts both ways. Runs against a
+throwaway SQLite file by default; pass --database-url to use Postgres (the
+tables are created if missing and the inserted rows are left in place).
+
+    python -m benchmarks.date_filters --scales 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, func, insert, select
+
+from date_ranges import within_days
+from extensions import db
+from models import Billing, Consultation, Patient, User
+
+DAYS = 365
+BATCH = 10000
+
+
+def _setup(engine):
+    db.metadata.create_all(engine, tables=[
+        User.__table__, Patient.__table__, Consultation.__table__, Billing.__table__
+    ])
+    with engine.begin() as conn:
+        doctor_id = conn.execute(insert(User).values(
+            name='Bench Doctor', email=f'bench-{time.time_ns()}@hospital.com',
+            password_hash='-', role='doctor', department='eye'
+        )).inserted_primary_key[0]
+        patient_id = conn.execute(insert(Patient).values(
+            name='Bench Patient', age=40, gender='female', phone='0700000000',
+            department='eye'
+        )).inserted_primary_key[0]
+    return doctor_id, patient_id
+
+
+def _fill(engine, rng, count, doctor_id, patient_id):
+    start = datetime.now() - timedelta(days=DAYS)
+    with engine.begin() as conn:
+        next_id = (conn.execute(select(func.max(Consultation.id))).scalar() or 0) + 1
+        for offset in range(0, count, BATCH):
+            size = min(BATCH, count - offset)
+            ids = range(next_id + offset, next_id + offset + size)
+            stamps = [start + timedelta(seconds=rng.randrange(DAYS * 86400)) for _ in ids]
+            conn.execute(insert(Consultation), [{
+                'id': i, 'patient_id': patient_id, 'doctor_id': doctor_id,
+                'diagnosis': 'benchmark', 'created_at': stamp
+            } for i, stamp in zip(ids, stamps)])
+            conn.execute(insert(Billing), [{
+                'consultation_id': i, 'patient_id': patient_id, 'amount': 500.0,
+                'status': rng.choice(('paid', 'pending')), 'created_at': stamp
+            } for i, stamp in zip(ids, stamps)])
+
+
+def _time(engine, stmt, repeat):
+    samples = []
+    with engine.connect() as conn:
+        conn.execute(stmt).scalar()  # warm the cache
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(stmt).scalar()
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def _queries(doctor_id):
+    end = date.today()
+    start = end - timedelta(days=6)
+    return {
+        'doctor consultations (7 days)': (
+            select(func.count(Consultation.id)).where(
+                Consultation.doctor_id == doctor_id,
+                func.date(Consultation.created_at) >= start,
+                func.date(Consultation.created_at) <= end
+            ),
+            select(func.count(Consultation.id)).where(
+                Consultation.doctor_id == doctor_id,
+                within_days(Consultation.created_at, start, end)
+            )
+        ),
+        'paid revenue (7 days)': (
+            select(func.sum(Billing.amount)).where(
+                func.date(Billing.created_at) >= start,
+                func.date(Billing.created_at) <= end,
+                Billing.status == 'paid'
+            ),
+            select(func.sum(Billing.amount)).where(
+                within_days(Billing.created_at, start, end),
+                Billing.status == 'paid'
+            )
+        )
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url')
+    parser.add_argument('--scales', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    url = args.database_url
+    if not url:
+        path = os.path.join(tempfile.mkdtemp(), 'date_filters.db')
+        url = f'sqlite:///{path}'
+    engine = create_engine(url)
+    rng = random.Random(args.seed)
+    doctor_id, patient_id = _setup(engine)
+
+    results = []
+    rows = 0
+    print(f'{"rows":>10}  {"query":<30} {"func.date ms":>13} {"range ms":>10} {"speedup":>8}')
+    for scale in sorted(args.scales):
+        _fill(engine, rng, scale - rows, doctor_id, patient_id)
+        rows = scale
+        for name, (wrapped, ranged) in _queries(doctor_id).items():
+            before = _time(engine, wrapped, args.repeat)
+            after = _time(engine, ranged, args.repeat)
+            results.append({
+                'rows': rows, 'query': name,
+                'func_date_ms': round(before, 3), 'range_ms': round(after, 3)
+            })
+            print(f'{rows:>10}  {name:<30} {before:>13.2f} {after:>10.2f} {before / after:>7.1f}x')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'database': engine.dialect.name, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,383 @@
+"""Per-route latency and throughput under replayed staff workflows.
+
+Starts gunicorn with gunicorn.conf.py (or targets --url) on a database
+filled by benchmarks.synthetic (pass --rows to fill it first), logs in as
+the synthetic staff, and runs --users virtual users for --duration seconds.
+Each one repeatedly plays a receptionist, doctor or admin workflow (weights
+from --mix): registering and finding patients, booking, queueing and
+vitals; calling the next patient and saving the consultation; dashboards
+and lists. Reports p50/p95/p99 and requests/s per route. --json saves the
+results with the git commit they were measured on; --compare prints the
+change in p95 against an earlier results file.
+
+    python -m benchmarks.load --database-url postgresql://... --rows 1000000 \\
+        --users 50 --duration 60 --json load-$(git rev-parse --short HEAD).json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from urllib.parse import urlsplit
+
+from benchmarks.concurrency import _percentile, _wait_for_port
+from benchmarks.synthetic import DEPARTMENTS, FIRST_NAMES, LAST_NAMES, PASSWORD
+
+# Responses a workflow step can legitimately get besides 200
+EXPECTED = {
+    'POST /api/doctor/call-next': (404,),  # nobody waiting
+}
+
+
+class Client:
+    # One keep-alive connection with a session cookie; records the latency
+    # of every request under its route template
+
+    def __init__(self, host, port, cookie, results):
+        self.host = host
+        self.port = port
+        self.cookie = cookie
+        self.results = results
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+
+    def call(self, method, route, path=None, body=None):
+        name = f'{method} {route}'
+        headers = {'Cookie': self.cookie}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path or route, json.dumps(body) if body is not None else None, headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.results.record(name, None, False)
+            return None, None
+        elapsed = (time.perf_counter() - started) * 1000
+        ok = response.status == 200 or response.status in EXPECTED.get(name, ())
+        self.results.record(name, elapsed, ok)
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.recording = False
+
+    def record(self, name, elapsed, ok):
+        if not self.recording:
+            return
+        with self.lock:
+            if ok:
+                self.samples[name].append(elapsed)
+            else:
+                self.errors[name] += 1
+
+
+def _search_term(rng):
+    return rng.choice(FIRST_NAMES + LAST_NAMES)[:rng.randrange(3, 6)]
+
+
+def receptionist_workflow(client, rng):
+    client.call('GET', '/api/receptionist/dashboard-summary')
+    _, found = client.call('GET', '/api/receptionist/patients/search',
+                           f'/api/receptionist/patients/search?q={_search_term(rng)}')
+    if found and rng.random() < 0.7:
+        patient = rng.choice(found)
+        patient_id, department = patient['id'], patient['department']
+    else:
+        department = rng.choice(DEPARTMENTS)
+        _, registered = client.call('POST', '/api/receptionist/register-patient', body={
+            'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'age': rng.randrange(1, 95), 'gender': rng.choice(('male', 'female')),
+            'phone': f'07{rng.randrange(10 ** 8):08d}', 'department': department
+        })
+        if not registered:
+            return
+        patient_id = registered['patient_id']
+
+    _, doctors = client.call('GET', '/api/receptionist/doctors/<department>',
+                             f'/api/receptionist/doctors/{department}')
+    if not doctors:
+        return
+    doctor_id = rng.choice(doctors)['id']
+    if rng.random() < 0.4:
+        client.call('POST', '/api/receptionist/create-appointment', body={
+            'patient_id': patient_id, 'doctor_id': doctor_id,
+            'date': (date.today() + timedelta(days=rng.randrange(1, 30))).isoformat(),
+            'time': rng.choice(('08:30', '10:00', '14:00'))
+        })
+    client.call('POST', '/api/receptionist/add-to-queue', body={
+        'patient_id': patient_id, 'doctor_id': doctor_id
+    })
+    client.call('POST', '/api/vitals/record/<patient_id>', f'/api/vitals/record/{patient_id}', {
+        'blood_pressure': f'{rng.randrange(95, 170)}/{rng.randrange(60, 105)}',
+        'heart_rate': rng.randrange(55, 110), 'temperature': round(rng.uniform(36.0, 38.5), 1),
+        'weight': round(rng.uniform(8, 110), 1), 'oxygen_saturation': rng.randrange(90, 101)
+    })
+    client.call('GET', '/api/receptionist/queue')
+
+    _, bills = client.call('GET', '/api/receptionist/all-billing?status=pending',
+                           '/api/receptionist/all-billing?status=pending&limit=20')
+    if bills:
+        bill = rng.choice(bills)
+        client.call('POST', '/api/receptionist/mark-paid/<bill_id>',
+                    f'/api/receptionist/mark-paid/{bill["id"]}',
+                    {'payment_method': rng.choice(('cash', 'mpesa', 'card'))})
+
+
+def doctor_workflow(client, rng):
+    client.call('GET', '/api/doctor/queue')
+    status, started = client.call('POST', '/api/doctor/call-next', body={})
+    if status == 200:
+        patient_id = started['patient']['id']
+        client.call('GET', '/api/vitals/latest/<patient_id>', f'/api/vitals/latest/{patient_id}')
+        client.call('GET', '/api/doctor/patient-history/<patient_id>',
+                    f'/api/doctor/patient-history/{patient_id}')
+        client.call('POST', '/api/doctor/save-consultation', body={
+            'patient_id': patient_id, 'symptoms': 'Load test symptoms',
+            'diagnosis': 'Load test diagnosis', 'prescription': 'Load test prescription',
+            'exam_data': json.dumps({'findings': 'Normal'}),
+            'amount': rng.randrange(500, 5000, 50), 'payment_method': 'cash'
+        })
+    client.call('GET', '/api/doctor/dashboard')
+    client.call('GET', '/api/doctor/appointments?limit=50', '/api/doctor/appointments?limit=50')
+
+
+def admin_workflow(client, rng):
+    client.call('GET', '/api/admin/dashboard-summary')
+    client.call('GET', '/api/admin/hospital-overview')
+    _, patients = client.call('GET', '/api/admin/all-patients?limit=50',
+                              f'/api/admin/all-patients?limit=50&sort={rng.choice(("id", "-created_at"))}')
+    if patients:
+        patient_id = rng.choice(patients)['id']
+        client.call('GET', '/api/admin/patient-details/<patient_id>',
+                    f'/api/admin/patient-details/{patient_id}')
+    client.call('GET', '/api/admin/appointments?limit=50', '/api/admin/appointments?limit=50')
+    client.call('GET', '/api/admin/billing-overview')
+
+
+WORKFLOWS = {
+    'receptionist': receptionist_workflow,
+    'doctor': doctor_workflow,
+    'admin': admin_workflow
+}
+
+
+def _login(host, port, email):
+    # Logins go one at a time before the run; retried when the password
+    # hashing pool answers 503
+    for _ in range(10):
+        connection = http.client.HTTPConnection(host, port, timeout=60)
+        connection.request('POST', '/api/login', json.dumps({'email': email, 'password': PASSWORD}),
+                           {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        if response.status == 200:
+            return response.getheader('Set-Cookie').split(';', 1)[0]
+        if response.status != 503:
+            raise SystemExit(f'Login as {email} failed with HTTP {response.status}; '
+                             'fill the database with benchmarks.synthetic first')
+        time.sleep(int(response.getheader('Retry-After', 1)))
+    raise SystemExit(f'Login as {email} kept getting 503')
+
+
+def _accounts(host, port, per_role):
+    # Synthetic staff, found through the admin staff list
+    admin_cookie = _login(host, port, 'synthetic-admin-0@hospital.com')
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    connection.request('GET', '/api/admin/all-staff', headers={'Cookie': admin_cookie})
+    staff = json.loads(connection.getresponse().read())
+    connection.close()
+
+    cookies = {'admin': [admin_cookie], 'doctor': [], 'receptionist': []}
+    for user in staff:
+        role = user['role']
+        if user['email'].startswith('synthetic-') and len(cookies[role]) < per_role:
+            cookies[role].append(_login(host, port, user['email']))
+    return cookies
+
+
+def _virtual_user(host, port, role, cookie, seed, deadline, results):
+    rng = random.Random(seed)
+    client = Client(host, port, cookie, results)
+    workflow = WORKFLOWS[role]
+    while time.time() < deadline:
+        workflow(client, rng)
+
+
+def _summary(samples, errors, elapsed):
+    ordered = sorted(samples)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'requests_per_second': round(len(ordered) / elapsed, 2),
+        'mean_ms': round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+        'p50_ms': round(_percentile(ordered, 0.50), 2),
+        'p95_ms': round(_percentile(ordered, 0.95), 2),
+        'p99_ms': round(_percentile(ordered, 0.99), 2)
+    }
+
+
+def _git():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def run(*args):
+        return subprocess.run(['git', *args], cwd=root, capture_output=True, text=True).stdout.strip()
+
+    return {
+        'commit': run('rev-parse', 'HEAD') or None,
+        'subject': run('log', '-1', '--format=%s') or None,
+        # Uncommitted changes to the backend make the commit hash misleading
+        'dirty': bool(run('status', '--porcelain', '--untracked-files=no', '--', '.'))
+    }
+
+
+def _compare(results, path):
+    with open(path) as f:
+        baseline = json.load(f)
+    print(f'\np95 vs {path} ({(baseline["git"]["commit"] or "unknown")[:10]}):')
+    for name, row in results['routes'].items():
+        before = baseline['routes'].get(name)
+        if not before or not before['p95_ms']:
+            continue
+        change = (row['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+        flag = '  <-- slower' if change > 10 else ''
+        print(f'  {name:<55} {before["p95_ms"]:>8.1f} -> {row["p95_ms"]:>8.1f} ms ({change:+.0f}%){flag}')
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        role, _, weight = part.partition('=')
+        if role not in WORKFLOWS:
+            raise argparse.ArgumentTypeError(f'unknown role {role!r}')
+        mix[role] = float(weight or 1)
+    return mix
+
+
+def _start_server(args, port):
+    env = dict(os.environ, DATABASE_URL=args.database_url, GUNICORN_BIND=f'127.0.0.1:{port}',
+               GUNICORN_WORKERS=str(args.workers), GUNICORN_WORKER_CLASS=args.worker_class)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'run:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    _wait_for_port(port)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='start gunicorn on this database')
+    parser.add_argument('--url', help='use an already running server instead')
+    parser.add_argument('--rows', type=int, help='fill the database with this many synthetic rows first')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--warmup', type=float, default=5, help='seconds run before recording')
+    parser.add_argument('--mix', type=_parse_mix, default='receptionist=4,doctor=4,admin=1')
+    parser.add_argument('--accounts', type=int, default=10, help='staff logins per role')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--worker-class', default='gthread')
+    parser.add_argument('--port', type=int, default=8098)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='earlier --json results to compare p95 with')
+    args = parser.parse_args()
+    if bool(args.database_url) == bool(args.url):
+        parser.error('pass one of --database-url or --url')
+    if args.rows and not args.database_url:
+        parser.error('--rows needs --database-url')
+
+    if args.rows:
+        os.environ['DATABASE_URL'] = args.database_url
+        from app import create_app
+        from extensions import db
+        from benchmarks.synthetic import generate
+
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            generate(args.rows, args.seed)
+
+    server = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        host, port = '127.0.0.1', args.port
+        server = _start_server(args, port)
+
+    try:
+        cookies = _accounts(host, port, args.accounts)
+        rng = random.Random(args.seed)
+        roles = rng.choices(list(args.mix), weights=list(args.mix.values()), k=args.users)
+        results = Results()
+        deadline = time.time() + args.warmup + args.duration
+        users = [
+            threading.Thread(target=_virtual_user, args=(
+                host, port, role, cookies[role][i % len(cookies[role])],
+                rng.random(), deadline, results
+            ))
+            for i, role in enumerate(roles)
+        ]
+        for user in users:
+            user.start()
+        time.sleep(args.warmup)
+        results.recording = True
+        started = time.time()
+        for user in users:
+            user.join()
+        elapsed = time.time() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        'git': _git(),
+        'measured_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'config': {
+            'database': (args.database_url or args.url).split('@')[-1],
+            'users': args.users, 'duration': args.duration,
+            'mix': args.mix, 'workers': args.workers, 'worker_class': args.worker_class,
+            'seed': args.seed
+        },
+        'overall': _summary([s for samples in results.samples.values() for s in samples],
+                            sum(results.errors.values()), elapsed),
+        'routes': {
+            name: _summary(results.samples.get(name, []), results.errors.get(name, 0), elapsed)
+            for name in sorted(set(results.samples) | set(results.errors))
+        }
+    }
+
+    print(f'{"route":<55} {"requests":>9} {"errors":>7} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for name, row in list(report['routes'].items()) + [('overall', report['overall'])]:
+        print(f'{name:<55} {row["requests"]:>9} {row["errors"]:>7} {row["requests_per_second"]:>8.1f} '
+              f'{row["p50_ms"]:>8.1f} {row["p95_ms"]:>8.1f} {row["p99_ms"]:>8.1f}')
+
+    if args.compare:
+        _compare(report, args.compare)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Latency of a normal endpoint while a burst of logins is in flight.
+
+Runs against a live server. One client keeps requesting a probe endpoint
+(the receptionist queue by default) on its own session, first alone and then
+while --clients concurrent clients each log in --logins times, as at a shift
+change. Reports probe latency percentiles before and during the burst, login
+throughput, and how many logins were turned away with 503.
+
+    python -m benchmarks.login_burst --url http://127.0.0.1:8000 \\
+        --probe-email reception@hospital.com --probe-password receptionist123 \\
+        --email doctor@hospital.com --password doctor123
+"""
+import argparse
+import http.cookiejar
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def _opener():
+    return urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+    )
+
+
+def _request(opener, url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with opener.open(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    return status, (time.perf_counter() - started) * 1000
+
+
+def _percentiles(samples):
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 2)
+
+    return {
+        'count': len(ordered),
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+        'max_ms': round(ordered[-1], 2)
+    }
+
+
+def _probe(opener, url, stop, samples):
+    while not stop.is_set():
+        status, elapsed = _request(opener, url)
+        if status == 200:
+            samples.append(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--email', required=True, help='account the burst logs in as')
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--probe-email', required=True)
+    parser.add_argument('--probe-password', required=True)
+    parser.add_argument('--probe-path', default='/api/receptionist/queue')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--logins', type=int, default=5, help='logins per client')
+    parser.add_argument('--baseline-seconds', type=float, default=5)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    base = args.url.rstrip('/')
+    probe = _opener()
+    status, _ = _request(probe, base + '/api/login', {
+        'email': args.probe_email, 'password': args.probe_password
+    })
+    if status != 200:
+        raise SystemExit(f'Probe login failed with HTTP {status}')
+
+    # Baseline: the probe endpoint with nothing else going on
+    baseline = []
+    stop = threading.Event()
+    prober = threading.Thread(target=_probe, args=(probe, base + args.probe_path, stop, baseline))
+    prober.start()
+    time.sleep(args.baseline_seconds)
+    stop.set()
+    prober.join()
+
+    # Burst: every client logs in repeatedly while the probe keeps going
+    during = []
+    logins = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def login_client():
+        opener = _opener()
+        for _ in range(args.logins):
+            status, elapsed = _request(opener, base + '/api/login', {
+                'email': args.email, 'password': args.password
+            })
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    logins.append(elapsed)
+
+    stop = threading.Event()
+    prober = threading.Thread(target=_probe, args=(probe, base + args.probe_path, stop, during))
+    clients = [threading.Thread(target=login_client) for _ in range(args.clients)]
+    prober.start()
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    burst_seconds = time.perf_counter() - started
+    stop.set()
+    prober.join()
+
+    results = {
+        'clients': args.clients,
+        'logins_per_client': args.logins,
+        'burst_seconds': round(burst_seconds, 2),
+        'logins_per_second': round(len(logins) / burst_seconds, 1),
+        'login_statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'login_latency': _percentiles(logins),
+        'probe_baseline': _percentiles(baseline),
+        'probe_during_burst': _percentiles(during)
+    }
+
+    print(f'{"":<22} {"count":>7} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+    for name in ('probe_baseline', 'probe_during_burst', 'login_latency'):
+        row = results[name]
+        if row['count']:
+            print(f'{name:<22} {row["count"]:>7} {row["p50_ms"]:>9.1f} {row["p95_ms"]:>9.1f} {row["p99_ms"]:>9.1f}')
+    print(f'{results["logins_per_second"]} logins/s over {results["burst_seconds"]}s, '
+          f'statuses {results["login_statuses"]}')
+    if results['probe_baseline']['count'] and results['probe_during_burst']['count']:
+        ratio = results['probe_during_burst']['p95_ms'] / results['probe_baseline']['p95_ms']
+        print(f'probe p95 degraded {ratio:.1f}x during the burst')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Time to serialize a 10k-row list response: hand-built dicts vs schemas.
+
+Builds --rows billing list rows (Billing, Patient, User model instances, as
+the billing list queries return them) in memory and times turning them into
+a JSON response body three ways: the dicts routes used to build by hand with
+.isoformat() per row through Flask's stock provider; serializers.Schema with
+the standard library provider; and Schema with the orjson provider (when
+orjson is installed). No database is involved.
+
+    python -m benchmarks.serialization --rows 10000 --repeat 20
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from models import Billing, Patient, User
+from serializers import BILLING, JSONProvider, ORJSONProvider, orjson
+
+Row = namedtuple('Row', 'Billing Patient User')
+
+BILLING_LIST = BILLING.prefixed('Billing').extend(patient_name='Patient.name', doctor_name='User.name')
+
+
+def _rows(count, rng):
+    doctors = [User(id=i, name=f'Doctor {i}', role='doctor', department='eye') for i in range(30)]
+    start = datetime.utcnow() - timedelta(days=365)
+    rows = []
+    for i in range(count):
+        patient = Patient(id=i, name=f'Patient {i}', age=rng.randrange(1, 90), gender='female',
+                          phone='0700000000', department='eye')
+        bill = Billing(id=i, consultation_id=i, patient_id=i, amount=float(rng.randrange(500, 5000, 50)),
+                       status=rng.choice(('paid', 'pending')), payment_method='cash',
+                       created_at=start + timedelta(seconds=rng.randrange(365 * 86400)))
+        rows.append(Row(bill, patient, rng.choice(doctors)))
+    return rows
+
+
+def _by_hand(rows):
+    # receptionist.get_all_billing before serializers.py
+    return [{
+        'id': record.Billing.id,
+        'patient_name': record.Patient.name,
+        'doctor_name': record.User.name,
+        'amount': float(record.Billing.amount),
+        'status': record.Billing.status,
+        'payment_method': record.Billing.payment_method,
+        'created_at': record.Billing.created_at.isoformat()
+    } for record in rows]
+
+
+def _time(provider, build, rows, repeat):
+    # Median (build ms, encode ms) over `repeat` runs after a warm-up run
+    builds, encodes = [], []
+    body = None
+    for _ in range(repeat + 1):
+        started = time.perf_counter()
+        data = build(rows)
+        built = time.perf_counter()
+        body = provider.response(data).get_data()
+        builds.append((built - started) * 1000)
+        encodes.append((time.perf_counter() - built) * 1000)
+    return statistics.median(builds[1:]), statistics.median(encodes[1:]), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    rows = _rows(args.rows, random.Random(args.seed))
+    variants = [
+        ('hand-built dicts + stdlib jsonify', DefaultJSONProvider(app), _by_hand),
+        ('Schema + stdlib provider', JSONProvider(app), BILLING_LIST.many),
+    ]
+    if orjson is not None:
+        variants.append(('Schema + orjson provider', ORJSONProvider(app), BILLING_LIST.many))
+    else:
+        print('orjson is not installed; skipping the orjson provider')
+
+    results = []
+    baseline = None
+    expected = None
+    print(f'{"variant":<36} {"build ms":>9} {"encode ms":>10} {"total ms":>9} {"rows/s":>10} {"speedup":>8}')
+    for name, provider, build in variants:
+        build_ms, encode_ms, body = _time(provider, build, rows, args.repeat)
+        elapsed = build_ms + encode_ms
+        # Every variant must produce the same document
+        document = json.loads(body)
+        if expected is None:
+            expected = document
+        elif document != expected:
+            raise SystemExit(f'{name} produced different JSON')
+        baseline = baseline or elapsed
+        results.append({'variant': name, 'build_ms': round(build_ms, 3), 'encode_ms': round(encode_ms, 3),
+                        'bytes': len(body)})
+        print(f'{name:<36} {build_ms:>9.2f} {encode_ms:>10.2f} {elapsed:>9.2f} '
+              f'{args.rows / elapsed * 1000:>10,.0f} {baseline / elapsed:>7.1f}x')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'rows': args.rows, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""Seeded synthetic hospital data at benchmark scale.
+
+Fills user, patient, appointment, consultation, billing, vital_signs and
+queue with about --rows rows in total (ROWS_PER_PATIENT per patient on
+average), inserted in batches through the bulk importer's write path (COPY
+on Postgres, executemany elsewhere) with the daily_stats and doctor_patient
+rollups rebuilt at the end. The same seed against an empty database gives
+the same data, dated relative to today so the dashboards have something to
+show. Staff are synthetic-<role>-<n>@hospital.com with password PASSWORD;
+benchmarks.load logs in as them.
+
+    python -m benchmarks.synthetic --database-url postgresql://... --rows 1000000
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, time as clock, timedelta
+
+from werkzeug.security import generate_password_hash
+
+PASSWORD = 'synthetic-password'
+DEPARTMENTS = ('eye', 'ent', 'skin')
+DAYS = 365
+# Patient + 2 appointments + 1.5 consultations + 1.35 bills + 2 vitals
+ROWS_PER_PATIENT = 8
+QUEUE_PER_DOCTOR = 10
+SLOTS = tuple(clock.fromisoformat(slot) for slot in ('08:30', '09:00', '10:00', '11:30', '14:00', '15:30'))
+
+FIRST_NAMES = (
+    'Amina', 'Brian', 'Cynthia', 'David', 'Esther', 'Felix', 'Grace', 'Hassan',
+    'Irene', 'James', 'Kevin', 'Lucy', 'Mercy', 'Nathan', 'Otieno', 'Purity',
+    'Rose', 'Samuel', 'Tabitha', 'Victor', 'Wanjiru', 'Yusuf', 'Zawadi'
+)
+LAST_NAMES = (
+    'Achieng', 'Barasa', 'Chebet', 'Hassan', 'Kamau', 'Kariuki', 'Kiptoo',
+    'Mutua', 'Mwangi', 'Njoroge', 'Ochieng', 'Odhiambo', 'Omondi', 'Otieno',
+    'Wafula', 'Wambui', 'Wanjiku'
+)
+DIAGNOSES = {
+    'eye': ('Myopia', 'Cataract', 'Glaucoma', 'Conjunctivitis', 'Presbyopia'),
+    'ent': ('Otitis media', 'Sinusitis', 'Tonsillitis', 'Rhinitis', 'Hearing loss'),
+    'skin': ('Eczema', 'Acne', 'Psoriasis', 'Dermatitis', 'Fungal infection')
+}
+
+
+def _exam(rng, department):
+    # Same shape as the exam room form submits for each department
+    if department == 'eye':
+        exam = {}
+        for eye in ('od', 'os'):
+            exam[f'{eye}_visual_acuity'] = rng.choice(('6/6', '6/9', '6/12', '6/18', '6/60'))
+            exam[f'{eye}_pressure'] = rng.randrange(10, 32)
+            for part in ('cornea', 'lens', 'retina'):
+                exam[f'{eye}_{part}'] = rng.choice(('Clear', 'Normal', 'Opacity', 'Hazy'))
+        return exam
+    return {
+        'findings': rng.choice(('Normal', 'Inflamed', 'Discharge', 'Lesion')),
+        'severity': rng.choice(('mild', 'moderate', 'severe'))
+    }
+
+
+def _staff(users, doctors, receptionists, admins):
+    # Existing synthetic staff are reused, so the generator can be rerun to
+    # add patients to a database it filled before
+    from extensions import db
+
+    accounts = [('admin', None, i) for i in range(admins)]
+    accounts += [('receptionist', None, i) for i in range(receptionists)]
+    accounts += [('doctor', DEPARTMENTS[i % len(DEPARTMENTS)], i) for i in range(doctors)]
+    emails = [f'synthetic-{role}-{i}@hospital.com' for role, _, i in accounts]
+
+    with db.engine.begin() as connection:
+        existing = dict(connection.execute(
+            users.select().with_only_columns(users.c.email, users.c.id)
+            .where(users.c.email.in_(emails))
+        ).all())
+        password_hash = generate_password_hash(PASSWORD)
+        for (role, department, i), email in zip(accounts, emails):
+            if email not in existing:
+                existing[email] = connection.execute(users.insert().values(
+                    name=f'Synthetic {role.title()} {i}', email=email, role=role,
+                    department=department, password_hash=password_hash, is_active=True,
+                    created_at=datetime.utcnow()
+                )).inserted_primary_key[0]
+
+    by_department = {department: [] for department in DEPARTMENTS}
+    for (role, department, _), email in zip(accounts, emails):
+        if role == 'doctor':
+            by_department[department].append(existing[email])
+    receptionist_ids = [existing[email] for (role, _, _), email in zip(accounts, emails)
+                        if role == 'receptionist']
+    return by_department, receptionist_ids
+
+
+def _next_id(connection, table):
+    from sqlalchemy import func, select
+    return (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def generate(rows=10000, seed=42, doctors=30, receptionists=10, admins=2,
+             batch_size=10000, report=print):
+    # Must run inside an app context
+    from bulk_import import _insert_batch, _prepare, _reset_sequences
+    from extensions import db
+    from rollups import rebuild_daily_stats, rebuild_doctor_patients
+
+    tables = db.metadata.tables
+    users = tables['user']
+    order = ('patient', 'appointment', 'consultation', 'billing', 'vital_signs')
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    doctor_ids, receptionist_ids = _staff(users, doctors, receptionists, admins)
+    recorders = receptionist_ids + [i for ids in doctor_ids.values() for i in ids]
+
+    with db.engine.connect() as connection:
+        next_ids = {name: _next_id(connection, tables[name]) for name in order + ('queue',)}
+
+    now = datetime.utcnow()
+    today = date.today()
+    patients = max(1, rows // ROWS_PER_PATIENT)
+    per_batch = max(1, batch_size // ROWS_PER_PATIENT)
+    counts = dict.fromkeys(order + ('queue',), 0)
+    queue_candidates = {department: [] for department in DEPARTMENTS}
+
+    for first in range(0, patients, per_batch):
+        batch = {name: [] for name in order}
+
+        def add(table_name, /, **row):
+            row['id'] = next_ids[table_name]
+            next_ids[table_name] += 1
+            batch[table_name].append(_prepare(tables[table_name], row))
+            return row['id']
+
+        for _ in range(first, min(first + per_batch, patients)):
+            department = rng.choice(DEPARTMENTS)
+            created_at = now - timedelta(days=rng.random() * DAYS)
+            patient_id = add(
+                'patient',
+                name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                age=rng.randrange(1, 95), gender=rng.choice(('male', 'female')),
+                phone=f'07{rng.randrange(10 ** 8):08d}', address=None,
+                department=department, created_at=created_at
+            )
+            if len(queue_candidates[department]) < doctors * QUEUE_PER_DOCTOR:
+                queue_candidates[department].append(patient_id)
+            doctor_id = rng.choice(doctor_ids[department])
+
+            for _ in range(rng.randrange(5)):
+                day = (created_at + timedelta(days=rng.randrange(-5, 60))).date()
+                add(
+                    'appointment', patient_id=patient_id, doctor_id=doctor_id, date=day,
+                    time=rng.choice(SLOTS),
+                    status='completed' if day < today else 'scheduled',
+                    created_at=created_at
+                )
+
+            for _ in range(rng.randrange(4)):
+                seen_at = created_at + (now - created_at) * rng.random()
+                consultation_id = add(
+                    'consultation', patient_id=patient_id, doctor_id=doctor_id,
+                    symptoms='Synthetic symptoms', diagnosis=rng.choice(DIAGNOSES[department]),
+                    prescription='Synthetic prescription',
+                    tests=_exam(rng, department), notes=None, created_at=seen_at
+                )
+                if rng.random() < 0.9:
+                    paid = rng.random() < 0.8
+                    add(
+                        'billing', consultation_id=consultation_id, patient_id=patient_id,
+                        amount=float(rng.randrange(500, 5000, 50)),
+                        status='paid' if paid else 'pending',
+                        payment_method=rng.choice(('cash', 'mpesa', 'card')), created_at=seen_at
+                    )
+
+            for _ in range(rng.randrange(5)):
+                systolic, diastolic = rng.randrange(95, 170), rng.randrange(60, 90)
+                add(
+                    'vital_signs', patient_id=patient_id,
+                    blood_pressure=f'{systolic}/{diastolic}', systolic=systolic, diastolic=diastolic,
+                    heart_rate=rng.randrange(55, 110), temperature=round(rng.uniform(36.0, 38.5), 1),
+                    weight=round(rng.uniform(8, 110), 1), height=round(rng.uniform(70, 195), 1),
+                    oxygen_saturation=rng.randrange(90, 101), recorded_by=rng.choice(recorders),
+                    created_at=created_at + (now - created_at) * rng.random()
+                )
+
+        with db.engine.begin() as connection:
+            for name in order:
+                if batch[name]:
+                    _insert_batch(connection, tables[name], batch[name])
+                    counts[name] += len(batch[name])
+        done = min(first + per_batch, patients)
+        if done == patients or (done // per_batch) % 10 == 0:
+            report(f'{done:,}/{patients:,} patients ({sum(counts.values()):,} rows)')
+
+    # Today's queue: a few waiting patients per doctor, appointments first
+    queue = []
+    for department, ids in doctor_ids.items():
+        candidates = queue_candidates[department]
+        for doctor_id in ids:
+            for patient_id in rng.sample(candidates, min(QUEUE_PER_DOCTOR, len(candidates))):
+                queue.append(_prepare(tables['queue'], {
+                    'id': next_ids['queue'], 'patient_id': patient_id, 'doctor_id': doctor_id,
+                    'status': 'waiting', 'priority': rng.choice((0, 0, 1)),
+                    'created_at': now - timedelta(minutes=rng.randrange(180))
+                }))
+                next_ids['queue'] += 1
+    with db.engine.begin() as connection:
+        if queue:
+            _insert_batch(connection, tables['queue'], queue)
+        counts['queue'] = len(queue)
+        _reset_sequences(connection, [users] + [tables[name] for name in order + ('queue',)])
+
+    rebuild_doctor_patients()
+    rebuild_daily_stats()
+
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    report(', '.join(f'{name} {count:,}' for name, count in counts.items()))
+    report(f'Generated {total:,} rows in {elapsed:.1f}s ({total / elapsed if elapsed else total:,.0f} rows/s)')
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--rows', type=int, default=10000, help='approximate total rows to add')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--doctors', type=int, default=30)
+    parser.add_argument('--receptionists', type=int, default=10)
+    parser.add_argument('--admins', type=int, default=2)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    # Imported here so the app is configured for the target database
+    os.environ['DATABASE_URL'] = args.database_url
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        generate(args.rows, args.seed, args.doctors, args.receptionists, args.admins,
+                 args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
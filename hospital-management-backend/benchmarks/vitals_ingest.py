@@ -0,0 +1,195 @@
+"""Sustained vitals ingestion rate from simulated bedside monitors.
+
+Starts gunicorn with gunicorn.conf.py and a single worker by default (or
+targets --url) on a database filled by benchmarks.synthetic, logs in as a
+synthetic receptionist and has --clients feeders post readings for --beds
+patients for --duration seconds: --batch-size readings per
+POST /api/vitals/batch, or one POST /api/vitals/record/<id> per reading with
+--single for comparison. Reports readings/s, requests/s and request latency
+percentiles.
+
+    python -m benchmarks.vitals_ingest --database-url postgresql://... \\
+        --rows 100000 --clients 8 --batch-size 200 --duration 30
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from benchmarks.concurrency import _percentile
+from benchmarks.load import _git, _login, _start_server
+
+
+def _reading(rng, patient_id):
+    systolic = rng.randrange(95, 170)
+    return {
+        'patient_id': patient_id,
+        'systolic': systolic,
+        'diastolic': rng.randrange(55, min(systolic, 105)),
+        'heart_rate': rng.randrange(50, 130),
+        'temperature': round(rng.uniform(36.0, 39.0), 1),
+        'oxygen_saturation': rng.randrange(88, 101)
+    }
+
+
+def _patients(host, port, cookie, beds):
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    connection.request('GET', f'/api/receptionist/patients?limit={beds}', headers={'Cookie': cookie})
+    patients = json.loads(connection.getresponse().read())
+    connection.close()
+    if not patients:
+        raise SystemExit('No patients; fill the database with benchmarks.synthetic first')
+    return [patient['id'] for patient in patients]
+
+
+def _feeder(host, port, cookie, patient_ids, args, seed, deadline, totals, lock):
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    headers = {'Cookie': cookie, 'Content-Type': 'application/json'}
+    samples = []
+    readings = rejected = errors = 0
+
+    while time.time() < deadline:
+        if args.single:
+            reading = _reading(rng, rng.choice(patient_ids))
+            path = f"/api/vitals/record/{reading.pop('patient_id')}"
+            reading['blood_pressure'] = f"{reading.pop('systolic')}/{reading.pop('diastolic')}"
+            body, count = reading, 1
+        else:
+            path = '/api/vitals/batch'
+            body = {'readings': [_reading(rng, rng.choice(patient_ids)) for _ in range(args.batch_size)]}
+            count = args.batch_size
+
+        started = time.perf_counter()
+        try:
+            connection.request('POST', path, json.dumps(body), headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=60)
+            errors += 1
+            continue
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status != 200:
+            errors += 1
+            continue
+        samples.append(elapsed)
+        if args.single:
+            readings += 1
+        else:
+            result = json.loads(data)
+            readings += result['accepted']
+            rejected += result['rejected']
+
+    with lock:
+        totals['samples'].extend(samples)
+        totals['readings'] += readings
+        totals['rejected'] += rejected
+        totals['errors'] += errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='start gunicorn on this database')
+    parser.add_argument('--url', help='use an already running server instead')
+    parser.add_argument('--rows', type=int, help='fill the database with this many synthetic rows first')
+    parser.add_argument('--beds', type=int, default=200, help='patients the monitors report for')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent feeders')
+    parser.add_argument('--batch-size', type=int, default=100, help='readings per batch request')
+    parser.add_argument('--single', action='store_true', help='one request per reading instead')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--worker-class', default='gthread')
+    parser.add_argument('--port', type=int, default=8097)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+    if bool(args.database_url) == bool(args.url):
+        parser.error('pass one of --database-url or --url')
+    if args.rows and not args.database_url:
+        parser.error('--rows needs --database-url')
+
+    if args.rows:
+        os.environ['DATABASE_URL'] = args.database_url
+        from app import create_app
+        from extensions import db
+        from benchmarks.synthetic import generate
+
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            generate(args.rows, args.seed)
+
+    server = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        host, port = '127.0.0.1', args.port
+        server = _start_server(args, port)
+
+    try:
+        cookie = _login(host, port, 'synthetic-receptionist-0@hospital.com')
+        patient_ids = _patients(host, port, cookie, args.beds)
+        rng = random.Random(args.seed)
+        totals = {'samples': [], 'readings': 0, 'rejected': 0, 'errors': 0}
+        lock = threading.Lock()
+        started = time.time()
+        deadline = started + args.duration
+        feeders = [
+            threading.Thread(target=_feeder, args=(
+                host, port, cookie, patient_ids, args, rng.random(), deadline, totals, lock
+            ))
+            for _ in range(args.clients)
+        ]
+        for feeder in feeders:
+            feeder.start()
+        for feeder in feeders:
+            feeder.join()
+        elapsed = time.time() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    ordered = sorted(totals['samples'])
+    report = {
+        'git': _git(),
+        'measured_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'config': {
+            'database': (args.database_url or args.url).split('@')[-1],
+            'beds': len(patient_ids), 'clients': args.clients,
+            'batch_size': 1 if args.single else args.batch_size,
+            'mode': 'single' if args.single else 'batch',
+            'duration': args.duration, 'workers': args.workers, 'worker_class': args.worker_class
+        },
+        'readings': totals['readings'],
+        'rejected': totals['rejected'],
+        'errors': totals['errors'],
+        'readings_per_second': round(totals['readings'] / elapsed, 1),
+        'requests_per_second': round(len(ordered) / elapsed, 2),
+        'p50_ms': round(_percentile(ordered, 0.50), 2),
+        'p95_ms': round(_percentile(ordered, 0.95), 2),
+        'p99_ms': round(_percentile(ordered, 0.99), 2)
+    }
+
+    print(f"{report['config']['mode']}: {report['readings']} readings in {elapsed:.1f}s "
+          f"({report['readings_per_second']:,.0f} readings/s, {report['requests_per_second']:.1f} req/s), "
+          f"{report['rejected']} rejected, {report['errors']} failed requests")
+    print(f"request latency p50 {report['p50_ms']:.1f} ms, p95 {report['p95_ms']:.1f} ms, "
+          f"p99 {report['p99_ms']:.1f} ms")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
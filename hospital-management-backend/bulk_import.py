@@ -0,0 +1,271 @@
+import csv
+import io
+import json
+import time as timer
+from datetime import date, datetime, time
+
+from sqlalchemy import JSON, Column, Integer, MetaData, String, Table, select
+
+from extensions import db
+from exam_fields import normalize_exam
+from vital_trends import parse_blood_pressure
+
+# Progress of an interrupted import lives in the target database, committed
+# in the same transaction as each batch, so a resume never skips or repeats
+# rows. The table only exists while an import is in flight.
+_checkpoint_metadata = MetaData()
+import_checkpoint = Table(
+    'import_checkpoint', _checkpoint_metadata,
+    Column('table_name', String(64), primary_key=True),
+    Column('rows_done', Integer, nullable=False)
+)
+
+
+class ExportReader:
+    # Streams {"table": [{row}, {row}, ...], ...} without loading the whole
+    # document: rows are decoded one object at a time from a sliding buffer.
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError('Unexpected end of export file')
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f'Expected {char!r} at offset {self.pos} of the export file')
+        self.pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self._fill():
+                    raise
+                continue
+            # A value ending exactly at the buffer edge may be truncated
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _rows(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._peek() == ',':
+                self.pos += 1
+                continue
+            self._expect(']')
+            return
+
+    def tables(self):
+        # Yields (table_name, row iterator); each iterator must be consumed
+        # before moving on to the next table.
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            name = self._value()
+            self._expect(':')
+            if self._peek() == '[':
+                yield name, self._rows()
+            else:
+                self._value()
+            if self._peek() == ',':
+                self.pos += 1
+                continue
+            self._expect('}')
+            return
+
+
+def _column_default(column):
+    default = column.default
+    if default is None:
+        return None
+    if default.is_callable:
+        return default.arg(None)
+    return default.arg
+
+
+def _convert(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return datetime.utcnow()
+    if python_type is date and isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    if python_type is time and isinstance(value, str):
+        return time.fromisoformat(value)
+    if python_type is bool:
+        return bool(value)
+    return value
+
+
+def _prepare(table, row):
+    # Every row gets every column (executemany and COPY need a fixed shape);
+    # fields that no longer exist in the schema are dropped.
+    prepared = {
+        column.name: _convert(column, row[column.name]) if column.name in row
+        else _column_default(column)
+        for column in table.columns
+    }
+    # Exports from before the split only carry the blood pressure text
+    if table.name == 'vital_signs' and prepared['systolic'] is None:
+        prepared['systolic'], prepared['diastolic'] = parse_blood_pressure(prepared['blood_pressure'])
+    # ... and the exam form as a JSON string
+    if table.name == 'consultation':
+        prepared['tests'] = normalize_exam(prepared['tests'])
+    return prepared
+
+
+def _copy_value(value, column):
+    if value is None:
+        return '\\N'
+    if isinstance(column.type, JSON):
+        return json.dumps(value)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def _insert_batch(connection, table, rows):
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(row[column.name], column) for column in table.columns])
+        buffer.seek(0)
+        columns = ', '.join(f'"{column.name}"' for column in table.columns)
+        cursor = connection.connection.dbapi_connection.cursor()
+        cursor.copy_expert(
+            f'COPY "{table.name}" ({columns}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')',
+            buffer
+        )
+    else:
+        connection.execute(table.insert(), rows)
+
+
+def _reset_sequences(connection, tables):
+    if connection.dialect.name != 'postgresql':
+        return
+    for table in tables:
+        connection.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), "
+            f"COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM \"{table.name}\""
+        )
+
+
+def import_export_file(path, batch_size=5000, report=print):
+    # Imports an export produced from the old SQLite database. Tables must be
+    # listed parents first, as the export script writes them. Commits every
+    # batch_size rows; rerunning after a failure resumes from the last
+    # committed batch.
+    engine = db.engine
+    tables = db.metadata.tables
+    import_checkpoint.create(engine, checkfirst=True)
+
+    with engine.connect() as connection:
+        done = dict(connection.execute(
+            select(import_checkpoint.c.table_name, import_checkpoint.c.rows_done)
+        ).all())
+    if done:
+        report('Resuming import: ' + ', '.join(f'{name} {rows}' for name, rows in done.items()))
+
+    seen = set()
+    imported = []
+    total = 0
+    started = timer.perf_counter()
+
+    with open(path, 'r') as f:
+        for name, rows in ExportReader(f).tables():
+            table = tables.get(name)
+            if table is None:
+                report(f'Skipping unknown table {name}')
+                for _ in rows:
+                    pass
+                continue
+
+            missing = {fk.column.table.name for fk in table.foreign_keys} - seen - {name}
+            if missing:
+                raise ValueError(f'{name} appears before {", ".join(sorted(missing))} in {path}')
+            seen.add(name)
+
+            skip = done.get(name, 0)
+            count = 0
+            batch = []
+            table_started = timer.perf_counter()
+
+            def flush():
+                with engine.begin() as connection:
+                    _insert_batch(connection, table, batch)
+                    progress = {'table_name': name, 'rows_done': count}
+                    updated = connection.execute(
+                        import_checkpoint.update()
+                        .where(import_checkpoint.c.table_name == name)
+                        .values(rows_done=count)
+                    ).rowcount
+                    if not updated:
+                        connection.execute(import_checkpoint.insert().values(**progress))
+                batch.clear()
+
+            for row in rows:
+                count += 1
+                if count <= skip:
+                    continue
+                batch.append(_prepare(table, row))
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+
+            elapsed = timer.perf_counter() - table_started
+            loaded = count - skip
+            total += loaded
+            imported.append(table)
+            report(f'Imported {loaded} {name} rows in {elapsed:.1f}s '
+                   f'({loaded / elapsed if elapsed else loaded:,.0f} rows/s)')
+
+    with engine.begin() as connection:
+        _reset_sequences(connection, imported)
+
+    # Bulk inserts bypass the write paths that maintain the rollups
+    from rollups import rebuild_daily_stats, rebuild_doctor_patients
+    rebuild_doctor_patients()
+    rebuild_daily_stats()
+
+    import_checkpoint.drop(engine)
+
+    elapsed = timer.perf_counter() - started
+    report(f'Imported {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else total:,.0f} rows/s)')
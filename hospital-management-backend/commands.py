@@ -0,0 +1,91 @@
+import click
+
+
+def register_commands(app):
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """Fail if a hot route query is planned as a sequential scan."""
+        from query_plans import check_query_plans
+
+        failures = check_query_plans()
+        for endpoint, table, detail in failures:
+            click.echo(f'{endpoint}: {detail} ({table})', err=True)
+
+        if failures:
+            raise SystemExit(1)
+        click.echo('All hot queries use an index.')
+
+    @app.cli.command('rebuild-doctor-patients')
+    def rebuild_doctor_patients_command():
+        """Backfill the doctor_patient panel table from the source tables."""
+        from rollups import rebuild_doctor_patients
+
+        rows = rebuild_doctor_patients()
+        click.echo(f'Rebuilt {rows} doctor panel rows.')
+
+    @app.cli.command('rebuild-daily-stats')
+    def rebuild_daily_stats_command():
+        """Backfill the daily_stats rollup from the source tables."""
+        from rollups import rebuild_daily_stats
+
+        rows = rebuild_daily_stats()
+        click.echo(f'Rebuilt {rows} daily statistics rows.')
+
+    @app.cli.command('import-data')
+    @click.argument('path', default='sqlite_data_export.json')
+    @click.option('--batch-size', type=int, help='Rows per committed batch.')
+    def import_data_command(path, batch_size):
+        """Bulk import an export file; rerun to resume after a failure."""
+        from bulk_import import import_export_file
+
+        import_export_file(
+            path,
+            batch_size=batch_size or app.config['IMPORT_BATCH_SIZE'],
+            report=click.echo
+        )
+
+    @app.cli.command('purge-user')
+    @click.argument('user_id', type=int)
+    @click.option('--batch-size', type=int, help='Rows per committed batch.')
+    def purge_user_command(user_id, batch_size):
+        """Delete a user and their history in batches (for very long histories)."""
+        from models import User
+        from purges import purge_user
+
+        user = User.query.get(user_id)
+        if user is None or user.role == 'admin':
+            raise click.ClickException('No such non-admin user.')
+        deleted = purge_user(user_id, batch_size)
+        click.echo(f'Deleted {user.email}: ' + ', '.join(f'{count} {name}' for name, count in deleted.items()))
+
+    @app.cli.command('create-partitions')
+    @click.option('--months-ahead', type=int, help='Months to create beyond the current one.')
+    def create_partitions_command(months_ahead):
+        """Create the coming monthly partitions (Postgres)."""
+        from partitions import ensure_partitions
+
+        created = ensure_partitions(months_ahead if months_ahead is not None
+                                    else app.config['PARTITION_MONTHS_AHEAD'])
+        click.echo(f'Created {", ".join(created)}.' if created else 'No partitions to create.')
+
+    @app.cli.command('list-partitions')
+    def list_partitions_command():
+        """Show the monthly partitions and their sizes (Postgres)."""
+        from partitions import list_partitions
+
+        for table, name, bounds, size in list_partitions():
+            click.echo(f'{name:<28} {bounds:<70} {size / 1024 / 1024:>10.1f} MB')
+
+    @app.cli.command('detach-partitions')
+    @click.option('--before', required=True, help='First month to keep, as YYYY-MM.')
+    @click.option('--schema', help='Schema to move detached partitions to.')
+    @click.option('--tablespace', help='Also move them to this tablespace.')
+    def detach_partitions_command(before, schema, tablespace):
+        """Detach monthly partitions older than --before into an archive schema (Postgres)."""
+        from datetime import datetime
+        from partitions import detach_partitions
+
+        month = datetime.strptime(before, '%Y-%m').date()
+        schema = schema or app.config['PARTITION_ARCHIVE_SCHEMA']
+        detached = detach_partitions(month, schema, tablespace)
+        click.echo(f'Moved {", ".join(detached)} to {schema}.' if detached else 'Nothing to detach.')
@@ -1,9 +1,124 @@
 import os
 from dotenv import load_dotenv
+from sqlalchemy.pool import NullPool
+
+from db_pool import InstrumentedQueuePool
 
 load_dotenv()
 
+
+def _engine_options(database_url):
+    # Connection pool per worker process, set per environment through .env.
+    # Size against Postgres max_connections: workers x (DB_POOL_SIZE +
+    # DB_MAX_OVERFLOW), plus one LISTEN connection per worker for the queue
+    # event streams.
+    if os.environ.get('DB_POOL_MODE', 'app') == 'pgbouncer':
+        # PgBouncer in transaction mode does the pooling; holding idle
+        # connections here as well would only pin server connections
+        return {'poolclass': NullPool, 'pool_pre_ping': False}
+    if not database_url or database_url in ('sqlite://', 'sqlite:///:memory:'):
+        # In-memory SQLite runs on a single static connection
+        return {}
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    }
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') 
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    
+    # Direct (session-mode) Postgres URL for the queue event LISTEN
+    # connection when DATABASE_URL points at PgBouncer in transaction mode
+    LISTEN_DATABASE_URL = os.environ.get('LISTEN_DATABASE_URL')
+    
+    # List endpoints: default and maximum rows per page (keyset pagination).
+    # Only requests that send ?limit= or ?cursor= are paged; the others get
+    # the whole list.
+    PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 100))
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 500))
+    
+    # Vitals trend: default window in days, default and maximum buckets
+    VITALS_TREND_DAYS = int(os.environ.get('VITALS_TREND_DAYS', 30))
+    VITALS_TREND_POINTS = int(os.environ.get('VITALS_TREND_POINTS', 200))
+    VITALS_TREND_MAX_POINTS = int(os.environ.get('VITALS_TREND_MAX_POINTS', 1000))
+    
+    # Encode JSON responses with orjson when it is installed (serializers.py)
+    FAST_JSON = os.environ.get('FAST_JSON', 'true').lower() == 'true'
+    
+    # Most readings accepted in one POST /api/vitals/batch
+    VITALS_BATCH_MAX = int(os.environ.get('VITALS_BATCH_MAX', 1000))
+    
+    # Streaming exports: rows fetched per server-side cursor batch
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+    
+    # Bulk import: rows per committed batch
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+    
+    # Queue SSE streams: seconds between keep-alive comments, and how often
+    # the SQLite fallback polls for new events
+    QUEUE_EVENTS_HEARTBEAT = int(os.environ.get('QUEUE_EVENTS_HEARTBEAT', 15))
+    QUEUE_EVENTS_POLL_INTERVAL = float(os.environ.get('QUEUE_EVENTS_POLL_INTERVAL', 1.0))
+    
+    # Queue SSE streams held open at once per worker process (beyond it the
+    # endpoint answers 503 with Retry-After), and seconds before a stream
+    # ends and the browser reconnects. The default gevent worker raises the
+    # cap to 500 (gunicorn.conf.py). Under the gthread worker each stream
+    # holds one of GUNICORN_THREADS request threads, so the cap stays at 2:
+    # with 4 workers that is 8 queue screens across the hospital before the
+    # rest get 503.
+    QUEUE_EVENTS_MAX_STREAMS = int(os.environ.get('QUEUE_EVENTS_MAX_STREAMS', 2))
+    QUEUE_EVENTS_MAX_AGE = int(os.environ.get('QUEUE_EVENTS_MAX_AGE', 300))
+    QUEUE_EVENTS_RETRY_AFTER = int(os.environ.get('QUEUE_EVENTS_RETRY_AFTER', 5))
+    
+    # Add an X-SQL-Count header (statements run per request) to every response
+    SQL_COUNT_HEADER = os.environ.get('SQL_COUNT_HEADER', 'false').lower() == 'true'
+    
+    # Password hashing: werkzeug method and cost for new hashes (a stored
+    # hash is upgraded on its next successful login only if this is
+    # stronger; the default matches the existing hashes), hashing processes
+    # per web process (0 hashes inline), hashes admitted at once per web
+    # process, seconds to wait for a slot before answering 503, and the
+    # Retry-After sent with that 503
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 1))
+    PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', 2))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2))
+    PASSWORD_HASH_RETRY_AFTER = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', 1))
+    
+    # Bearer token Prometheus sends to scrape /metrics (admins can also view
+    # it from a logged-in session)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Slow-query log: statements taking at least SLOW_QUERY_THRESHOLD_MS (0
+    # turns the log off) are appended as JSON lines to SLOW_QUERY_LOG (relative
+    # to this directory), rotated at SLOW_QUERY_LOG_MAX_BYTES keeping
+    # SLOW_QUERY_LOG_BACKUPS old files. /api/admin/slow-queries summarizes
+    # the newest SLOW_QUERY_SUMMARY_MAX_BYTES of it.
+    # Bound parameters hold patient data; SLOW_QUERY_LOG_PARAMS=false leaves
+    # them out. On Postgres this fraction of slow SELECTs is re-run under
+    # EXPLAIN (ANALYZE, BUFFERS) to log the plan.
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', 'logs/slow_queries.log')
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024))
+    SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', 5))
+    SLOW_QUERY_SUMMARY_MAX_BYTES = int(os.environ.get('SLOW_QUERY_SUMMARY_MAX_BYTES', 2 * 1024 * 1024))
+    SLOW_QUERY_LOG_PARAMS = os.environ.get('SLOW_QUERY_LOG_PARAMS', 'true').lower() == 'true'
+    SLOW_QUERY_EXPLAIN_SAMPLE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE', 0.1))
+    
+    # Rows deleted per committed batch when purging a user's history
+    PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE', 1000))
+    
+    # Monthly partitions (Postgres, see partitions.py): months created ahead
+    # of the current one, seconds between checks in each web process, and
+    # the schema detached partitions are moved to
+    PARTITION_MONTHS_AHEAD = int(os.environ.get('PARTITION_MONTHS_AHEAD', 3))
+    PARTITION_CHECK_INTERVAL = int(os.environ.get('PARTITION_CHECK_INTERVAL', 24 * 3600))
+    PARTITION_ARCHIVE_SCHEMA = os.environ.get('PARTITION_ARCHIVE_SCHEMA', 'archive')
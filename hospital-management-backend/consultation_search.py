@@ -0,0 +1,92 @@
+import re
+
+from sqlalchemy import DDL, Float, cast, event, func, literal_column, select, text
+
+from extensions import db
+from models import Consultation
+
+# Full-text search over consultation symptoms, diagnosis, prescription and
+# notes, built by hand-written DDL like patient_search.py; migrations/env.py
+# keeps autogenerate from dropping it.
+SEARCH_COLUMNS = ('search_vector',)
+SEARCH_INDEXES = ('ix_consultation_search',)
+SEARCH_TABLES = ('consultation_fts',)
+
+# Postgres: a stored generated tsvector, so every write keeps it current,
+# weighted diagnosis first and notes last, with a GIN index. Both cascade to
+# the monthly partitions.
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(diagnosis, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(symptoms, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(prescription, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(notes, '')), 'C')"
+)
+POSTGRESQL_DDL = [
+    'ALTER TABLE consultation ADD COLUMN IF NOT EXISTS search_vector tsvector '
+    f'GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED',
+    'CREATE INDEX IF NOT EXISTS ix_consultation_search ON consultation USING gin (search_vector)',
+]
+
+# SQLite: an external-content FTS5 table over consultation with Porter
+# stemming, kept in sync by triggers. A batch migration that rebuilds the
+# consultation table drops the triggers with it; recreate them afterwards.
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS consultation_fts USING fts5(
+        symptoms, diagnosis, prescription, notes,
+        content='consultation', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS consultation_fts_insert AFTER INSERT ON consultation BEGIN
+        INSERT INTO consultation_fts(rowid, symptoms, diagnosis, prescription, notes)
+        VALUES (new.id, new.symptoms, new.diagnosis, new.prescription, new.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS consultation_fts_delete AFTER DELETE ON consultation BEGIN
+        INSERT INTO consultation_fts(consultation_fts, rowid, symptoms, diagnosis, prescription, notes)
+        VALUES ('delete', old.id, old.symptoms, old.diagnosis, old.prescription, old.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS consultation_fts_update
+    AFTER UPDATE OF symptoms, diagnosis, prescription, notes ON consultation BEGIN
+        INSERT INTO consultation_fts(consultation_fts, rowid, symptoms, diagnosis, prescription, notes)
+        VALUES ('delete', old.id, old.symptoms, old.diagnosis, old.prescription, old.notes);
+        INSERT INTO consultation_fts(rowid, symptoms, diagnosis, prescription, notes)
+        VALUES (new.id, new.symptoms, new.diagnosis, new.prescription, new.notes);
+    END""",
+]
+
+# bm25 weights for symptoms, diagnosis, prescription, notes (as the
+# Postgres weights: diagnosis first, notes last)
+BM25 = 'bm25(consultation_fts, 2.0, 4.0, 2.0, 1.0)'
+
+for statement in POSTGRESQL_DDL:
+    event.listen(Consultation.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+for statement in SQLITE_DDL:
+    event.listen(Consultation.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(
+    Consultation.__table__, 'before_drop',
+    DDL('DROP TABLE IF EXISTS consultation_fts').execute_if(dialect='sqlite')
+)
+
+
+def match_consultations(query, term):
+    # Narrows a query over Consultation to rows matching the search term.
+    # Returns (query, rank) where a higher rank is a better match, or
+    # (None, None) when the term has no words.
+    words = re.findall(r'\w+', term)
+    if not words:
+        return None, None
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # websearch syntax: words are ANDed, "quoted phrases", or, -excluded
+        tsquery = func.websearch_to_tsquery(literal_column("'english'"), term)
+        vector = literal_column('consultation.search_vector')
+        # float8, so the rank round-trips exactly through a page cursor
+        rank = cast(func.ts_rank_cd(vector, tsquery), Float)
+        return query.filter(vector.op('@@')(tsquery)), rank
+
+    match = ' '.join('"%s"' % word for word in words)
+    matches = select(
+        literal_column('rowid').label('id'),
+        literal_column(f'-{BM25}').label('rank')
+    ).select_from(text('consultation_fts')).where(
+        text('consultation_fts MATCH :match').bindparams(match=match)
+    ).subquery()
+    return query.join(matches, matches.c.id == Consultation.id), matches.c.rank
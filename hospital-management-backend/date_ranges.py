@@ -0,0 +1,35 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import and_
+
+
+def parse_date_range(args):
+    # startDate/endDate query parameters (YYYY-MM-DD), defaulting to today
+    start_date = args.get('startDate')
+    end_date = args.get('endDate')
+
+    if not start_date or not end_date:
+        today = date.today()
+        return today, today
+
+    return (
+        datetime.strptime(start_date, '%Y-%m-%d').date(),
+        datetime.strptime(end_date, '%Y-%m-%d').date()
+    )
+
+
+def day_bounds(start_date, end_date=None):
+    # Inclusive day range -> half-open [start 00:00, day after end 00:00)
+    end_date = end_date or start_date
+    return (
+        datetime.combine(start_date, time.min),
+        datetime.combine(end_date + timedelta(days=1), time.min)
+    )
+
+
+def within_days(column, start_date, end_date=None):
+    # Sargable replacement for func.date(column) BETWEEN start AND end: the
+    # column is compared as-is, so an index on it (or partition bounds) can
+    # be used.
+    lower, upper = day_bounds(start_date, end_date)
+    return and_(column >= lower, column < upper)
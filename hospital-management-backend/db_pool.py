@@ -0,0 +1,65 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+
+class InstrumentedQueuePool(QueuePool):
+    # QueuePool that records how long checkouts wait for a connection, so
+    # pool sizing can be checked against real traffic (see pool_stats()).
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+    def recreate(self):
+        # Keep the counters across dispose() / recreate()
+        pool = super().recreate()
+        pool._checkouts = self._checkouts
+        pool._timeouts = self._timeouts
+        pool._wait_total = self._wait_total
+        pool._wait_max = self._wait_max
+        return pool
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'size': self.size(),
+                'max_overflow': self._max_overflow,
+                'checked_out': self.checkedout(),
+                'checked_in': self.checkedin(),
+                'overflow': max(self.overflow(), 0),
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'wait_seconds_total': round(self._wait_total, 6),
+                'wait_seconds_max': round(self._wait_max, 6),
+                'wait_seconds_avg': round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0
+            }
+
+
+def pool_stats(engine):
+    # Statistics for this process's pool; every gunicorn worker has its own
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+    return {'pool': type(pool).__name__, 'status': pool.status()}
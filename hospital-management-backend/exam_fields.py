@@ -0,0 +1,116 @@
+import json
+import re
+
+from flask import abort, jsonify, make_response
+from sqlalchemy import DDL, Numeric, and_, cast, event, func, literal_column, or_
+from sqlalchemy.dialects.postgresql import JSONB
+
+from extensions import db
+from models import Consultation
+
+# Consultation.tests holds the exam form as JSON (JSONB on Postgres, JSON
+# text queried with JSON1 on SQLite): flat keys such as od_pressure,
+# od_cornea or right_external_ear, as the exam room sends them.
+#
+# Measurements listed in NUMERIC_EXAM_KEYS are stored as JSON numbers and
+# have an expression index each (migration 7952ead1fbe3), so range filters
+# on them are index scans; on Postgres any key = value filter is answered
+# by the GIN index on the whole document.
+NUMERIC_EXAM_KEYS = ('od_pressure', 'os_pressure')
+
+# Indexes created by the migration rather than the models
+EXAM_INDEXES = ('ix_consultation_tests',) + tuple(f'ix_consultation_exam_{key}' for key in NUMERIC_EXAM_KEYS)
+
+_NUMBER = re.compile(r'^\s*-?\d+(\.\d+)?\s*$')
+_CONDITION = re.compile(r'^([a-z][a-z0-9_]*)\s*(>=|<=|>|<|=)\s*(.*)$')
+
+
+def _bad_request(message):
+    abort(make_response(jsonify({'error': message}), 400))
+
+
+def normalize_exam(value):
+    # Exam data as sent by the client (a JSON string or an object) -> what is
+    # stored: None for nothing, numbers for numeric keys, and text that isn't
+    # JSON kept as a plain JSON string
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+    if isinstance(value, dict):
+        for key in NUMERIC_EXAM_KEYS:
+            if isinstance(value.get(key), str) and _NUMBER.match(value[key]):
+                number = float(value[key])
+                value[key] = int(number) if number.is_integer() else number
+    return value
+
+
+def exam_text(value):
+    # Stored exam data -> the JSON string clients have always been sent
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+# The indexed expression for a numeric key, per dialect: the value when it
+# is a JSON number, else NULL. Queries must use it verbatim (the key inlined,
+# not bound) for the planner to match the index.
+EXAM_NUMBER_SQL = {
+    'postgresql': "CASE WHEN jsonb_typeof({tests} -> '{key}') = 'number' "
+                  "THEN ({tests} ->> '{key}')::numeric END",
+    'sqlite': "CASE WHEN json_type({tests}, '$.{key}') IN ('integer', 'real') "
+              "THEN json_extract({tests}, '$.{key}') END"
+}
+
+
+# Same indexes as the migration, for databases built by db.create_all()
+event.listen(Consultation.__table__, 'after_create', DDL(
+    'CREATE INDEX IF NOT EXISTS ix_consultation_tests ON consultation USING gin (tests jsonb_path_ops)'
+).execute_if(dialect='postgresql'))
+for _dialect, _sql in EXAM_NUMBER_SQL.items():
+    for _key in NUMERIC_EXAM_KEYS:
+        event.listen(Consultation.__table__, 'after_create', DDL(
+            f'CREATE INDEX IF NOT EXISTS ix_consultation_exam_{_key} ON consultation '
+            f"(({_sql.format(tests='tests', key=_key)}))"
+        ).execute_if(dialect=_dialect))
+
+
+def exam_number(key):
+    dialect = db.session.get_bind().dialect.name
+    return literal_column(EXAM_NUMBER_SQL[dialect].format(tests='consultation.tests', key=key), Numeric())
+
+
+def _condition(text):
+    match = _CONDITION.match(text.strip())
+    if not match:
+        _bad_request(f'Invalid exam filter {text!r}: use key=value, key>number, key<=number ...')
+    key, op, raw = match.groups()
+    raw = raw.strip()
+
+    if key in NUMERIC_EXAM_KEYS and _NUMBER.match(raw):
+        value = exam_number(key)
+        number = float(raw)
+        return {
+            '=': value == number,
+            '>': value > number,
+            '>=': value >= number,
+            '<': value < number,
+            '<=': value <= number
+        }[op]
+    if op != '=':
+        _bad_request(f'{key} can only be compared with =; ranges work on: ' + ', '.join(NUMERIC_EXAM_KEYS))
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Containment, answered by the GIN index
+        return Consultation.tests.op('@>')(cast(json.dumps({key: raw}), JSONB))
+    return func.json_extract(Consultation.tests, f'$.{key}') == raw
+
+
+def exam_filter(values):
+    # ?exam= values -> one condition, all of them ANDed. Each value is a
+    # condition such as od_pressure>21 or od_cornea=Opacity; alternatives
+    # separated by | are ORed (od_pressure>21|os_pressure>21).
+    return and_(*[or_(*[_condition(part) for part in value.split('|')]) for value in values])
@@ -0,0 +1,83 @@
+# Gunicorn settings, read with `gunicorn -c gunicorn.conf.py run:app`.
+#
+# GUNICORN_WORKER_CLASS picks the serving mode:
+#   gevent (default)   up to GUNICORN_WORKER_CONNECTIONS requests per worker;
+#                      the worker monkeypatches the standard library and
+#                      psycopg2 is made cooperative below, so a request
+#                      waiting on Postgres (a slow report, an SSE stream)
+#                      no longer holds a thread. The Flask app is unchanged.
+#   gthread            GUNICORN_THREADS requests per worker at a time, and
+#                      the default when gevent is not installed. Each open
+#                      queue SSE stream holds one of those threads, so only
+#                      QUEUE_EVENTS_MAX_STREAMS per worker are allowed (2,
+#                      so 8 screens with 4 workers); beyond that the stream
+#                      endpoint answers 503 with Retry-After.
+#
+# In gevent mode far more requests can want a connection at once than the
+# pool holds; they wait up to DB_POOL_TIMEOUT. Raise DB_POOL_SIZE within
+# max_connections, or put PgBouncer in front (DB_POOL_MODE=pgbouncer).
+import importlib.util
+import os
+import shutil
+import signal
+
+# Workers share Prometheus samples through files in this directory (see
+# metrics.py). It must be set before any worker imports prometheus_client,
+# and is emptied when gunicorn starts so old worker files don't linger.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/hms-prometheus')
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+worker_class = os.environ.get(
+    'GUNICORN_WORKER_CLASS', 'gevent' if importlib.util.find_spec('gevent') else 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = 2
+
+# Each queue SSE stream holds a gthread request thread; gevent greenlets are
+# cheap, so that mode can keep far more streams open per worker
+# (QUEUE_EVENTS_MAX_STREAMS, see config.py)
+if worker_class == 'gevent':
+    os.environ.setdefault('QUEUE_EVENTS_MAX_STREAMS', '500')
+
+
+def on_starting(server):
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    _close_streams_on_exit()
+    if worker_class != 'gevent':
+        return
+    # psycopg2 blocks in C; its wait callback lets other greenlets run
+    # while a query is in flight
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        worker.log.warning('psycogreen is not installed; Postgres queries will block the gevent loop')
+        return
+    patch_psycopg()
+
+
+def _close_streams_on_exit():
+    # On a graceful stop (SIGTERM) gunicorn waits for in-flight requests;
+    # end the open queue SSE streams so they don't hold it until the timeout
+    handle_exit = signal.getsignal(signal.SIGTERM)
+
+    def close_streams_and_exit(sig, frame):
+        from queue_events import close_streams
+        close_streams()
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, close_streams_and_exit)
@@ -0,0 +1,89 @@
+import hmac
+import os
+import time
+
+from flask import Response, current_app, g, jsonify, request, session
+
+from sql_stats import request_sql_count, request_sql_time
+
+# prometheus_client is optional: without it requests are not instrumented
+# and /metrics answers 503. Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set in
+# gunicorn.conf.py) makes every worker write its samples to shared files so
+# a scrape of any worker sees the totals for all of them.
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+        generate_latest, multiprocess
+    )
+except ImportError:
+    Counter = None
+
+if Counter is not None:
+    REQUEST_LATENCY = Histogram(
+        'http_request_duration_seconds', 'Time to produce a response, by endpoint',
+        ['endpoint', 'method'],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    )
+    REQUESTS = Counter(
+        'http_requests_total', 'Responses by endpoint and status code',
+        ['endpoint', 'method', 'status']
+    )
+    SQL_STATEMENTS = Histogram(
+        'http_request_sql_statements', 'SQL statements run per request',
+        ['endpoint'],
+        buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+    )
+    SQL_SECONDS = Histogram(
+        'http_request_sql_seconds', 'Time spent in SQL per request',
+        ['endpoint'],
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+    )
+
+
+def _registry():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def _authorized():
+    # Scrapers send METRICS_TOKEN as a bearer token; admins can look too
+    token = current_app.config['METRICS_TOKEN']
+    header = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(header, f'Bearer {token}'):
+        return True
+    return session.get('role') == 'admin'
+
+
+def metrics():
+    if not _authorized():
+        return jsonify({'error': 'Unauthorized'}), 403
+    if Counter is None:
+        return jsonify({'error': 'prometheus_client is not installed'}), 503
+    return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    app.add_url_rule('/metrics', 'metrics', metrics)
+    if Counter is None:
+        return
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is None or request.endpoint == 'metrics':
+            return response
+        # Unmatched URLs share one label so scanners can't blow up the
+        # series count
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+        SQL_STATEMENTS.labels(endpoint).observe(request_sql_count())
+        SQL_SECONDS.labels(endpoint).observe(request_sql_time())
+        return response
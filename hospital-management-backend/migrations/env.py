@@ -51,6 +51,31 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # Search and exam indexes, FTS tables and the tsvector column are
+    # created by hand-written DDL, not the models; don't let autogenerate
+    # drop them. The same goes for monthly partitions, and for billing's
+    # consultation key, which Postgres can't have once consultation is
+    # partitioned (see partitions.py).
+    import consultation_search
+    import patient_search
+    from partitions import is_partition
+    from exam_fields import EXAM_INDEXES
+    indexes = patient_search.SEARCH_INDEXES + consultation_search.SEARCH_INDEXES + EXAM_INDEXES
+    tables = patient_search.SEARCH_TABLES + consultation_search.SEARCH_TABLES
+    if reflected and compare_to is None:
+        if type_ == 'index' and name in indexes:
+            return False
+        if type_ == 'table' and (name.startswith(tables) or is_partition(name)):
+            return False
+        if type_ == 'column' and name in consultation_search.SEARCH_COLUMNS:
+            return False
+    if type_ == 'foreign_key_constraint' and not reflected and compare_to is None:
+        if object.referred_table.name == 'consultation' and context.get_bind().dialect.name == 'postgresql':
+            return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +90,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -97,9 +123,17 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        if connection.dialect.name == 'sqlite':
+            # Batch migrations rebuild SQLite tables by copy, drop and
+            # rename; with foreign keys on, dropping a parent would cascade
+            # into its children. The pragma only applies outside a
+            # transaction, hence the commit.
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.commit()
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
+            include_object=include_object,
             **conf_args
         )
 
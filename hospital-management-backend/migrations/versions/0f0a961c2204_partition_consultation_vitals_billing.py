@@ -0,0 +1,187 @@
+"""Partition consultation, vital_signs and billing by month (Postgres)
+
+Revision ID: 0f0a961c2204
+Revises: f43967110a8d
+Create Date: 2026-10-18 16:04:27.918254
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0f0a961c2204'
+down_revision = 'f43967110a8d'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+# created_at for rows with nothing to date them by: sorts them last and
+# keeps them out of every dashboard range (as in c62c4f77d118), and on
+# Postgres they sit in the default partition
+UNKNOWN_CREATED_AT = '1970-01-01 00:00:00'
+
+# Table -> (foreign keys as (column, referred table), indexes as (name, columns))
+TABLES = {
+    'consultation': (
+        [('patient_id', 'patient'), ('doctor_id', 'user')],
+        [('ix_consultation_patient_created', 'patient_id, created_at'),
+         ('ix_consultation_doctor_created', 'doctor_id, created_at')]
+    ),
+    'vital_signs': (
+        [('patient_id', 'patient'), ('recorded_by', 'user')],
+        [('ix_vital_signs_patient_created', 'patient_id, created_at')]
+    ),
+    'billing': (
+        [('patient_id', 'patient')],
+        [('ix_billing_created_status', 'created_at, status'),
+         ('ix_billing_patient', 'patient_id'),
+         ('ix_billing_consultation', 'consultation_id')]
+    ),
+}
+
+
+def _add_months(month, months):
+    years, index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def _rebuild(table, partitioned):
+    # Copy into a new table (partitioned or plain), swap it in, then restore
+    # the sequence, keys and indexes under their usual names
+    foreign_keys, indexes = TABLES[table]
+    new = f'{table}_rebuild'
+    bind = op.get_bind()
+    sequence = bind.execute(sa.text(f"SELECT pg_get_serial_sequence('\"{table}\"', 'id')")).scalar()
+
+    if partitioned:
+        op.execute(f'CREATE TABLE "{new}" (LIKE "{table}" INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+        oldest = bind.execute(sa.text(
+            f'SELECT min(created_at) FROM "{table}" WHERE created_at > :unknown'
+        ), {'unknown': UNKNOWN_CREATED_AT}).scalar()
+        month = (oldest.date() if oldest else date.today()).replace(day=1)
+        last = _add_months(date.today().replace(day=1), MONTHS_AHEAD)
+        while month <= last:
+            following = _add_months(month, 1)
+            op.execute(f'CREATE TABLE "{table}_{month:%Y_%m}" PARTITION OF "{new}" '
+                       f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')")
+            month = following
+        op.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{new}" DEFAULT')
+    else:
+        op.execute(f'CREATE TABLE "{new}" (LIKE "{table}" INCLUDING DEFAULTS)')
+
+    op.execute(f'INSERT INTO "{new}" SELECT * FROM "{table}"')
+    op.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{new}".id')
+    op.execute(f'DROP TABLE "{table}"')
+    op.execute(f'ALTER TABLE "{new}" RENAME TO "{table}"')
+
+    key = 'id, created_at' if partitioned else 'id'
+    op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY ({key})')
+    for column, referred in foreign_keys:
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{column}_fkey" '
+                   f'FOREIGN KEY ({column}) REFERENCES "{referred}" (id) ON DELETE CASCADE')
+    for name, columns in indexes:
+        op.execute(f'CREATE INDEX "{name}" ON "{table}" ({columns})')
+
+
+def _backfill_created_at(dialect):
+    # Rows imported without a timestamp are dated from the visit they
+    # belong to rather than stamped with today, which would count them in
+    # today's dashboards and daily_stats:
+    #   - consultations get their bill's date, else the start of the
+    #     patient's latest past appointment with the same doctor
+    #   - bills get their consultation's date
+    #   - vitals get the patient's latest consultation, else latest past
+    #     appointment
+    # and UNKNOWN_CREATED_AT when there is none.
+    if dialect == 'postgresql':
+        scheduled, now = 'appointment.date + appointment.time', "now() AT TIME ZONE 'utc'"
+    else:
+        scheduled, now = "datetime(appointment.date || ' ' || appointment.time)", "datetime('now')"
+
+    op.execute(f"""
+        UPDATE consultation SET created_at = COALESCE(
+            (SELECT MIN(billing.created_at) FROM billing WHERE billing.consultation_id = consultation.id),
+            (SELECT MAX({scheduled}) FROM appointment
+             WHERE appointment.patient_id = consultation.patient_id
+               AND appointment.doctor_id = consultation.doctor_id AND {scheduled} <= {now}),
+            '{UNKNOWN_CREATED_AT}')
+        WHERE created_at IS NULL
+    """)
+    op.execute(f"""
+        UPDATE billing SET created_at = COALESCE(
+            (SELECT consultation.created_at FROM consultation WHERE consultation.id = billing.consultation_id),
+            '{UNKNOWN_CREATED_AT}')
+        WHERE created_at IS NULL
+    """)
+    op.execute(f"""
+        UPDATE vital_signs SET created_at = COALESCE(
+            (SELECT MAX(consultation.created_at) FROM consultation
+             WHERE consultation.patient_id = vital_signs.patient_id AND consultation.created_at > '{UNKNOWN_CREATED_AT}'),
+            (SELECT MAX({scheduled}) FROM appointment
+             WHERE appointment.patient_id = vital_signs.patient_id AND {scheduled} <= {now}),
+            '{UNKNOWN_CREATED_AT}')
+        WHERE created_at IS NULL
+    """)
+
+
+def upgrade():
+    # Postgres: each table is rebuilt range-partitioned on created_at, one
+    # partition per month from its oldest row to MONTHS_AHEAD months ahead
+    # plus a default one, the rows copied across in one INSERT ... SELECT.
+    # Run it in a maintenance window: the tables are locked while they copy.
+    # Later months are created by partitions.py.
+    #
+    # Every unique constraint must include the partition key, so the primary
+    # keys become (id, created_at), and billing.consultation_id can no longer
+    # reference consultation: a trigger deletes a consultation's bills
+    # instead. SQLite only gets created_at NOT NULL.
+    dialect = op.get_bind().dialect.name
+    _backfill_created_at(dialect)
+    if dialect != 'postgresql':
+        for table in TABLES:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+        return
+
+    op.execute('ALTER TABLE billing DROP CONSTRAINT billing_consultation_id_fkey')
+    for table in TABLES:
+        op.execute(f'ALTER TABLE "{table}" ALTER COLUMN created_at SET NOT NULL')
+        _rebuild(table, partitioned=True)
+
+    # A row moving between partitions (an UPDATE of created_at, or
+    # partitions.py moving rows out of the default partition) is deleted
+    # and re-inserted, firing this trigger too; the bills only go when the
+    # consultation id no longer exists anywhere.
+    op.execute("""
+        CREATE FUNCTION billing_delete_with_consultation() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM billing WHERE consultation_id = OLD.id
+                AND NOT EXISTS (SELECT 1 FROM consultation WHERE id = OLD.id);
+            RETURN OLD;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER consultation_delete_billing AFTER DELETE ON consultation
+        FOR EACH ROW EXECUTE FUNCTION billing_delete_with_consultation()
+    """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        for table in TABLES:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+        return
+
+    op.execute('DROP TRIGGER consultation_delete_billing ON consultation')
+    op.execute('DROP FUNCTION billing_delete_with_consultation()')
+    for table in TABLES:
+        _rebuild(table, partitioned=False)
+        op.execute(f'ALTER TABLE "{table}" ALTER COLUMN created_at DROP NOT NULL')
+    op.execute('ALTER TABLE billing ADD CONSTRAINT billing_consultation_id_fkey '
+               'FOREIGN KEY (consultation_id) REFERENCES consultation (id) ON DELETE CASCADE')
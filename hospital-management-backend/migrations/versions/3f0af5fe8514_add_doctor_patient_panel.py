@@ -0,0 +1,52 @@
+"""Add doctor_patient panel table
+
+Revision ID: 3f0af5fe8514
+Revises: 9983bd9d369f
+Create Date: 2026-10-18 10:03:47.552914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f0af5fe8514'
+down_revision = '9983bd9d369f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('doctor_patient',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('last_visit', sa.DateTime(), nullable=True),
+    sa.Column('consultation_count', sa.Integer(), nullable=False),
+    sa.Column('appointment_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['doctor_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['patient.id'], ),
+    sa.PrimaryKeyConstraint('doctor_id', 'patient_id')
+    )
+
+    # Backfill from existing history (same as `flask rebuild-doctor-patients`)
+    op.execute("""
+        INSERT INTO doctor_patient
+            (doctor_id, patient_id, last_visit, consultation_count, appointment_count)
+        SELECT doctor_id, patient_id, MAX(last_visit), SUM(consultation_count), SUM(appointment_count)
+        FROM (
+            SELECT doctor_id, patient_id, MAX(created_at) AS last_visit,
+                   COUNT(*) AS consultation_count, 0 AS appointment_count
+            FROM consultation GROUP BY doctor_id, patient_id
+            UNION ALL
+            SELECT doctor_id, patient_id, CAST(NULL AS TIMESTAMP), 0, COUNT(*)
+            FROM appointment GROUP BY doctor_id, patient_id
+            UNION ALL
+            SELECT DISTINCT doctor_id, patient_id, CAST(NULL AS TIMESTAMP), 0, 0
+            FROM queue
+        ) AS links
+        GROUP BY doctor_id, patient_id
+    """)
+
+
+def downgrade():
+    op.drop_table('doctor_patient')
@@ -0,0 +1,67 @@
+"""Add daily_stats rollup table
+
+Revision ID: 403987b6e178
+Revises: 3f0af5fe8514
+Create Date: 2026-10-18 11:26:15.204371
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '403987b6e178'
+down_revision = '3f0af5fe8514'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('department', sa.String(length=20), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('registrations', sa.Integer(), nullable=False),
+    sa.Column('appointments', sa.Integer(), nullable=False),
+    sa.Column('consultations', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'department', 'doctor_id')
+    )
+    op.create_index('ix_daily_stats_doctor_day', 'daily_stats', ['doctor_id', 'day'], unique=False)
+
+    # Backfill from existing history (same as `flask rebuild-daily-stats`)
+    op.execute("""
+        INSERT INTO daily_stats
+            (day, department, doctor_id, registrations, appointments, consultations, revenue)
+        SELECT day, department, doctor_id,
+               SUM(registrations), SUM(appointments), SUM(consultations), SUM(revenue)
+        FROM (
+            SELECT DATE(p.created_at) AS day, COALESCE(p.department, '') AS department,
+                   0 AS doctor_id, COUNT(*) AS registrations, 0 AS appointments,
+                   0 AS consultations, 0 AS revenue
+            FROM patient p
+            GROUP BY DATE(p.created_at), p.department
+            UNION ALL
+            SELECT a.date, COALESCE(u.department, ''), a.doctor_id, 0, COUNT(*), 0, 0
+            FROM appointment a JOIN "user" u ON a.doctor_id = u.id
+            GROUP BY a.date, u.department, a.doctor_id
+            UNION ALL
+            SELECT DATE(c.created_at), COALESCE(u.department, ''), c.doctor_id, 0, 0, COUNT(*), 0
+            FROM consultation c JOIN "user" u ON c.doctor_id = u.id
+            GROUP BY DATE(c.created_at), u.department, c.doctor_id
+            UNION ALL
+            SELECT DATE(b.created_at), COALESCE(u.department, ''), c.doctor_id, 0, 0, 0, SUM(b.amount)
+            FROM billing b
+            JOIN consultation c ON b.consultation_id = c.id
+            JOIN "user" u ON c.doctor_id = u.id
+            WHERE b.status = 'paid'
+            GROUP BY DATE(b.created_at), u.department, c.doctor_id
+        ) AS facts
+        WHERE day IS NOT NULL
+        GROUP BY day, department, doctor_id
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_daily_stats_doctor_day', table_name='daily_stats')
+    op.drop_table('daily_stats')
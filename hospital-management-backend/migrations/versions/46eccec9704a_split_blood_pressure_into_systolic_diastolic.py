@@ -0,0 +1,68 @@
+"""Split blood pressure into systolic and diastolic columns
+
+Revision ID: 46eccec9704a
+Revises: 0f0a961c2204
+Create Date: 2026-10-18 16:52:40.615093
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '46eccec9704a'
+down_revision = '0f0a961c2204'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+# Same rules as vital_trends.parse_blood_pressure when this was written
+BLOOD_PRESSURE = re.compile(r'^\s*(\d{2,3})\s*/\s*(\d{2,3})\b')
+
+
+def _parse(text):
+    match = BLOOD_PRESSURE.match(text or '')
+    if not match:
+        return None, None
+    systolic, diastolic = int(match.group(1)), int(match.group(2))
+    if not (50 <= systolic <= 300 and 20 <= diastolic <= 200 and systolic > diastolic):
+        return None, None
+    return systolic, diastolic
+
+
+def upgrade():
+    # On Postgres the columns are added to the partitioned parent and every
+    # partition picks them up
+    op.add_column('vital_signs', sa.Column('systolic', sa.Integer(), nullable=True))
+    op.add_column('vital_signs', sa.Column('diastolic', sa.Integer(), nullable=True))
+
+    # Parse the existing readings in id order, BATCH_SIZE at a time;
+    # unreadable ones stay NULL
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            'SELECT id, blood_pressure FROM vital_signs '
+            'WHERE id > :last_id AND blood_pressure IS NOT NULL ORDER BY id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).all()
+        if not rows:
+            break
+        updates = []
+        for id_, text in rows:
+            systolic, diastolic = _parse(text)
+            if systolic is not None:
+                updates.append({'id': id_, 'systolic': systolic, 'diastolic': diastolic})
+        if updates:
+            bind.execute(sa.text(
+                'UPDATE vital_signs SET systolic = :systolic, diastolic = :diastolic WHERE id = :id'
+            ), updates)
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('vital_signs') as batch_op:
+        batch_op.drop_column('diastolic')
+        batch_op.drop_column('systolic')
@@ -0,0 +1,41 @@
+"""Order the queue by priority: call-next index, non-null priority
+
+Revision ID: 592332a938a1
+Revises: 8b7f05d363b2
+Create Date: 2026-10-18 13:31:02.664517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '592332a938a1'
+down_revision = '8b7f05d363b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NULLs would sort ahead of every real priority under ORDER BY ... DESC
+    op.execute("UPDATE queue SET priority = 0 WHERE priority IS NULL")
+    op.execute("UPDATE queue SET status = 'waiting' WHERE status IS NULL")
+    with op.batch_alter_table('queue') as batch_op:
+        batch_op.alter_column('priority', existing_type=sa.Integer(),
+                              nullable=False, server_default='0')
+
+    # Call next: a doctor's waiting entries by priority, then arrival. The
+    # (doctor_id, status) prefix also serves everything the old index did.
+    op.drop_index('ix_queue_doctor_status_created', table_name='queue')
+    op.create_index('ix_queue_doctor_status_priority_created', 'queue',
+                    ['doctor_id', 'status', sa.text('priority DESC'), 'created_at'],
+                    unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_queue_doctor_status_priority_created', table_name='queue')
+    op.create_index('ix_queue_doctor_status_created', 'queue',
+                    ['doctor_id', 'status', 'created_at'], unique=False)
+    with op.batch_alter_table('queue') as batch_op:
+        batch_op.alter_column('priority', existing_type=sa.Integer(),
+                              nullable=True, server_default=None)
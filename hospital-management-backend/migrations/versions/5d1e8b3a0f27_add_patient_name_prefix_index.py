@@ -0,0 +1,29 @@
+"""Add a lower(name) index for patient search prefix matches
+
+Revision ID: 5d1e8b3a0f27
+Revises: c62c4f77d118
+Create Date: 2026-10-18 21:05:12.604113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1e8b3a0f27'
+down_revision = 'c62c4f77d118'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Same index db.create_all() builds (see patient_search.py)
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE INDEX ix_patient_name_prefix ON patient ((lower(name) COLLATE "C"))')
+    elif dialect == 'sqlite':
+        op.execute('CREATE INDEX ix_patient_name_prefix ON patient (lower(name))')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_patient_name_prefix')
@@ -0,0 +1,25 @@
+"""Add patient created_at index for date-range filters
+
+Revision ID: 637d28474b6d
+Revises: 403987b6e178
+Create Date: 2026-10-18 12:40:51.873006
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '637d28474b6d'
+down_revision = '403987b6e178'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Registrations per date range (receptionist dashboards)
+    op.create_index('ix_patient_created', 'patient', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_patient_created', table_name='patient')
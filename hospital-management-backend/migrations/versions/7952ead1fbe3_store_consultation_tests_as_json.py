@@ -0,0 +1,104 @@
+"""Store consultation tests as JSON with indexed exam fields
+
+Revision ID: 7952ead1fbe3
+Revises: 46eccec9704a
+Create Date: 2026-10-18 17:31:08.442719
+
+"""
+import json
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7952ead1fbe3'
+down_revision = '46eccec9704a'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+# As in exam_fields.py when this was written
+NUMERIC_EXAM_KEYS = ('od_pressure', 'os_pressure')
+NUMBER = re.compile(r'^\s*-?\d+(\.\d+)?\s*$')
+EXAM_NUMBER_SQL = {
+    'postgresql': "CASE WHEN jsonb_typeof({tests} -> '{key}') = 'number' "
+                  "THEN ({tests} ->> '{key}')::numeric END",
+    'sqlite': "CASE WHEN json_type({tests}, '$.{key}') IN ('integer', 'real') "
+              "THEN json_extract({tests}, '$.{key}') END"
+}
+
+
+def _normalize(text):
+    # Stored text -> valid JSON text: '' becomes NULL, anything that isn't
+    # JSON becomes a JSON string, numeric exam keys become numbers
+    if text is None or text == '':
+        return None
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return json.dumps(text)
+    if not isinstance(value, dict):
+        return text
+    changed = False
+    for key in NUMERIC_EXAM_KEYS:
+        if isinstance(value.get(key), str) and NUMBER.match(value[key]):
+            number = float(value[key])
+            value[key] = int(number) if number.is_integer() else number
+            changed = True
+    return json.dumps(value) if changed else text
+
+
+def _normalize_rows():
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            'SELECT id, tests FROM consultation WHERE id > :last_id ORDER BY id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).all()
+        if not rows:
+            break
+        updates = []
+        for id_, text in rows:
+            normalized = _normalize(text)
+            if normalized != text:
+                updates.append({'id': id_, 'tests': normalized})
+        if updates:
+            bind.execute(sa.text('UPDATE consultation SET tests = :tests WHERE id = :id'), updates)
+        last_id = rows[-1].id
+
+
+def upgrade():
+    # Every stored value is made valid JSON first, in batches, so the type
+    # change can't fail half way. On Postgres the column becomes JSONB with a
+    # GIN index (jsonb_path_ops: containment only, and smaller) for key = value
+    # lookups; on both databases each numeric exam key gets an expression
+    # index for range filters. Indexes on the partitioned consultation table
+    # cascade to every partition.
+    _normalize_rows()
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('ALTER TABLE consultation ALTER COLUMN tests TYPE JSONB USING tests::jsonb')
+        op.execute('CREATE INDEX ix_consultation_tests ON consultation USING gin (tests jsonb_path_ops)')
+    else:
+        with op.batch_alter_table('consultation') as batch_op:
+            batch_op.alter_column('tests', existing_type=sa.Text(), type_=sa.JSON())
+
+    for key in NUMERIC_EXAM_KEYS:
+        expression = EXAM_NUMBER_SQL[dialect].format(tests='tests', key=key)
+        op.execute(f'CREATE INDEX ix_consultation_exam_{key} ON consultation (({expression}))')
+
+
+def downgrade():
+    for key in NUMERIC_EXAM_KEYS:
+        op.execute(f'DROP INDEX ix_consultation_exam_{key}')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX ix_consultation_tests')
+        op.execute('ALTER TABLE consultation ALTER COLUMN tests TYPE TEXT USING tests::text')
+    else:
+        with op.batch_alter_table('consultation') as batch_op:
+            batch_op.alter_column('tests', existing_type=sa.JSON(), type_=sa.Text())
@@ -0,0 +1,32 @@
+"""Add queue_event feed for queue server-sent events
+
+Revision ID: 8b7f05d363b2
+Revises: 637d28474b6d
+Create Date: 2026-10-18 13:05:27.418230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b7f05d363b2'
+down_revision = '637d28474b6d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Only written when the database has no LISTEN/NOTIFY (SQLite)
+    op.create_table('queue_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_queue_event_created_at', 'queue_event', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_queue_event_created_at', table_name='queue_event')
+    op.drop_table('queue_event')
@@ -0,0 +1,63 @@
+"""Add consultation full-text search (tsvector on Postgres, FTS5 on SQLite)
+
+Revision ID: 982035947f3a
+Revises: 7952ead1fbe3
+Create Date: 2026-10-18 18:12:53.306218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '982035947f3a'
+down_revision = '7952ead1fbe3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Same structures db.create_all() builds (see consultation_search.py).
+    # On Postgres adding the generated column rewrites every consultation
+    # partition; run it in a maintenance window on a large table.
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("""ALTER TABLE consultation ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(diagnosis, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(symptoms, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(prescription, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(notes, '')), 'C')
+        ) STORED""")
+        op.execute('CREATE INDEX ix_consultation_search ON consultation USING gin (search_vector)')
+    elif dialect == 'sqlite':
+        op.execute("""CREATE VIRTUAL TABLE consultation_fts USING fts5(
+            symptoms, diagnosis, prescription, notes,
+            content='consultation', content_rowid='id', tokenize='porter unicode61'
+        )""")
+        op.execute("""CREATE TRIGGER consultation_fts_insert AFTER INSERT ON consultation BEGIN
+            INSERT INTO consultation_fts(rowid, symptoms, diagnosis, prescription, notes)
+            VALUES (new.id, new.symptoms, new.diagnosis, new.prescription, new.notes);
+        END""")
+        op.execute("""CREATE TRIGGER consultation_fts_delete AFTER DELETE ON consultation BEGIN
+            INSERT INTO consultation_fts(consultation_fts, rowid, symptoms, diagnosis, prescription, notes)
+            VALUES ('delete', old.id, old.symptoms, old.diagnosis, old.prescription, old.notes);
+        END""")
+        op.execute("""CREATE TRIGGER consultation_fts_update
+        AFTER UPDATE OF symptoms, diagnosis, prescription, notes ON consultation BEGIN
+            INSERT INTO consultation_fts(consultation_fts, rowid, symptoms, diagnosis, prescription, notes)
+            VALUES ('delete', old.id, old.symptoms, old.diagnosis, old.prescription, old.notes);
+            INSERT INTO consultation_fts(rowid, symptoms, diagnosis, prescription, notes)
+            VALUES (new.id, new.symptoms, new.diagnosis, new.prescription, new.notes);
+        END""")
+        op.execute("INSERT INTO consultation_fts(consultation_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_consultation_search')
+        op.execute('ALTER TABLE consultation DROP COLUMN IF EXISTS search_vector')
+    elif dialect == 'sqlite':
+        for trigger in ('consultation_fts_insert', 'consultation_fts_delete', 'consultation_fts_update'):
+            op.execute('DROP TRIGGER IF EXISTS %s' % trigger)
+        op.execute('DROP TABLE IF EXISTS consultation_fts')
@@ -0,0 +1,50 @@
+"""Add composite indexes for hot filters
+
+Revision ID: 9983bd9d369f
+Revises: adbedf76691f
+Create Date: 2026-10-18 09:12:04.118230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9983bd9d369f'
+down_revision = 'adbedf76691f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Doctor queue: filtered by doctor and status, ordered by arrival
+    op.create_index('ix_queue_doctor_status_created', 'queue',
+                    ['doctor_id', 'status', 'created_at'], unique=False)
+    # Doctor dashboard and appointment lists
+    op.create_index('ix_appointment_doctor_date', 'appointment',
+                    ['doctor_id', 'date'], unique=False)
+    # Patient history / last session lookups
+    op.create_index('ix_consultation_patient_created', 'consultation',
+                    ['patient_id', 'created_at'], unique=False)
+    # Doctor dashboard consultation counts and my-patients
+    op.create_index('ix_consultation_doctor_created', 'consultation',
+                    ['doctor_id', 'created_at'], unique=False)
+    # Revenue and billing summaries by date range
+    op.create_index('ix_billing_created_status', 'billing',
+                    ['created_at', 'status'], unique=False)
+    op.create_index('ix_billing_patient', 'billing', ['patient_id'], unique=False)
+    op.create_index('ix_billing_consultation', 'billing', ['consultation_id'], unique=False)
+    # Vitals history for a patient
+    op.create_index('ix_vital_signs_patient_created', 'vital_signs',
+                    ['patient_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_vital_signs_patient_created', table_name='vital_signs')
+    op.drop_index('ix_billing_consultation', table_name='billing')
+    op.drop_index('ix_billing_patient', table_name='billing')
+    op.drop_index('ix_billing_created_status', table_name='billing')
+    op.drop_index('ix_consultation_doctor_created', table_name='consultation')
+    op.drop_index('ix_consultation_patient_created', table_name='consultation')
+    op.drop_index('ix_appointment_doctor_date', table_name='appointment')
+    op.drop_index('ix_queue_doctor_status_created', table_name='queue')
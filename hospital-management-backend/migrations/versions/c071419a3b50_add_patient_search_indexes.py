@@ -0,0 +1,55 @@
+"""Add patient search indexes (trigram on Postgres, FTS5 on SQLite)
+
+Revision ID: c071419a3b50
+Revises: 592332a938a1
+Create Date: 2026-10-18 14:02:45.190374
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c071419a3b50'
+down_revision = '592332a938a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Exact-name lookups from the booking endpoints
+    op.create_index('ix_patient_name', 'patient', ['name'], unique=False)
+
+    # Same structures db.create_all() builds (see patient_search.py)
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX ix_patient_name_trgm ON patient USING gin (lower(name) gin_trgm_ops)')
+        op.execute('CREATE INDEX ix_patient_phone_trgm ON patient USING gin (phone gin_trgm_ops)')
+    elif dialect == 'sqlite':
+        op.execute("""CREATE VIRTUAL TABLE patient_fts USING fts5(
+            name, phone, content='patient', content_rowid='id', prefix='1 2 3'
+        )""")
+        op.execute("""CREATE TRIGGER patient_fts_insert AFTER INSERT ON patient BEGIN
+            INSERT INTO patient_fts(rowid, name, phone) VALUES (new.id, new.name, new.phone);
+        END""")
+        op.execute("""CREATE TRIGGER patient_fts_delete AFTER DELETE ON patient BEGIN
+            INSERT INTO patient_fts(patient_fts, rowid, name, phone) VALUES ('delete', old.id, old.name, old.phone);
+        END""")
+        op.execute("""CREATE TRIGGER patient_fts_update AFTER UPDATE OF name, phone ON patient BEGIN
+            INSERT INTO patient_fts(patient_fts, rowid, name, phone) VALUES ('delete', old.id, old.name, old.phone);
+            INSERT INTO patient_fts(rowid, name, phone) VALUES (new.id, new.name, new.phone);
+        END""")
+        op.execute("INSERT INTO patient_fts(patient_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_patient_phone_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_patient_name_trgm')
+    elif dialect == 'sqlite':
+        for trigger in ('patient_fts_insert', 'patient_fts_delete', 'patient_fts_update'):
+            op.execute('DROP TRIGGER IF EXISTS %s' % trigger)
+        op.execute('DROP TABLE IF EXISTS patient_fts')
+    op.drop_index('ix_patient_name', table_name='patient')
@@ -0,0 +1,82 @@
+"""Backfill and require created_at on patient and appointment
+
+Revision ID: c62c4f77d118
+Revises: 982035947f3a
+Create Date: 2026-10-18 18:56:17.317640
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c62c4f77d118'
+down_revision = '982035947f3a'
+branch_labels = None
+depends_on = None
+
+
+# Patient rows carry the FTS5 triggers from c071419a3b50; SQLite's batch
+# table copy drops them, so they are recreated after it
+PATIENT_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS patient_fts_insert AFTER INSERT ON patient BEGIN
+        INSERT INTO patient_fts(rowid, name, phone) VALUES (new.id, new.name, new.phone);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_fts_delete AFTER DELETE ON patient BEGIN
+        INSERT INTO patient_fts(patient_fts, rowid, name, phone) VALUES ('delete', old.id, old.name, old.phone);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_fts_update AFTER UPDATE OF name, phone ON patient BEGIN
+        INSERT INTO patient_fts(patient_fts, rowid, name, phone) VALUES ('delete', old.id, old.name, old.phone);
+        INSERT INTO patient_fts(rowid, name, phone) VALUES (new.id, new.name, new.phone);
+    END""",
+]
+
+
+def _set_nullable(table, nullable):
+    dialect = op.get_bind().dialect.name
+    with op.batch_alter_table(table) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=nullable)
+    if dialect == 'sqlite' and table == 'patient':
+        for statement in PATIENT_FTS_TRIGGERS:
+            op.execute(statement)
+
+
+def upgrade():
+    # Keyset pages compare (created_at, id), which a NULL created_at never
+    # satisfies: such rows dropped out of every page after the first.
+    #
+    # Rows imported without a timestamp are backfilled rather than stamped
+    # with today, which would count them in today's dashboards:
+    #   - appointments get when they were booked for, or now if that is
+    #     still ahead
+    #   - patients get their earliest recorded activity, or 1970-01-01 when
+    #     there is none (sorts them last, outside any dashboard range)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""
+            UPDATE appointment SET created_at = LEAST(date + time, now() AT TIME ZONE 'utc')
+            WHERE created_at IS NULL
+        """)
+    else:
+        op.execute("""
+            UPDATE appointment SET created_at = MIN(datetime(date || ' ' || time), datetime('now'))
+            WHERE created_at IS NULL
+        """)
+    op.execute("""
+        UPDATE patient SET created_at = COALESCE((
+            SELECT MIN(activity.created_at) FROM (
+                SELECT patient_id, created_at FROM appointment
+                UNION ALL SELECT patient_id, created_at FROM consultation
+                UNION ALL SELECT patient_id, created_at FROM vital_signs
+                UNION ALL SELECT patient_id, created_at FROM queue
+            ) AS activity WHERE activity.patient_id = patient.id
+        ), '1970-01-01 00:00:00')
+        WHERE created_at IS NULL
+    """)
+
+    for table in ('appointment', 'patient'):
+        _set_nullable(table, False)
+
+
+def downgrade():
+    for table in ('appointment', 'patient'):
+        _set_nullable(table, True)
@@ -0,0 +1,66 @@
+"""Cascade deletes from patients, users and consultations
+
+Revision ID: f43967110a8d
+Revises: c071419a3b50
+Create Date: 2026-10-18 15:12:09.381526
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f43967110a8d'
+down_revision = 'c071419a3b50'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table) for every key that now cascades
+FOREIGN_KEYS = [
+    ('appointment', 'patient_id', 'patient'),
+    ('appointment', 'doctor_id', 'user'),
+    ('consultation', 'patient_id', 'patient'),
+    ('consultation', 'doctor_id', 'user'),
+    ('billing', 'consultation_id', 'consultation'),
+    ('billing', 'patient_id', 'patient'),
+    ('vital_signs', 'patient_id', 'patient'),
+    ('vital_signs', 'recorded_by', 'user'),
+    ('queue', 'patient_id', 'patient'),
+    ('queue', 'doctor_id', 'user'),
+    ('doctor_patient', 'doctor_id', 'user'),
+    ('doctor_patient', 'patient_id', 'patient'),
+]
+
+# Postgres named the original (unnamed) constraints <table>_<column>_fkey;
+# SQLite kept no names, so the rebuild names reflected keys the same way
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+
+
+def _replace_foreign_keys(ondelete):
+    tables = dict.fromkeys(table for table, _, _ in FOREIGN_KEYS)
+    # SQLite rebuilds each table; its batch copy would drop the queue
+    # index's DESC column, so that index is recreated afterwards. Postgres
+    # alters the constraints in place and keeps the index.
+    rebuilds_queue = op.get_bind().dialect.name == 'sqlite'
+    for table in tables:
+        if table == 'queue' and rebuilds_queue:
+            op.drop_index('ix_queue_doctor_status_priority_created', table_name='queue')
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for name, column, referred in FOREIGN_KEYS:
+                if name != table:
+                    continue
+                batch_op.drop_constraint(f'{table}_{column}_fkey', type_='foreignkey')
+                batch_op.create_foreign_key(f'{table}_{column}_fkey', referred,
+                                            [column], ['id'], ondelete=ondelete)
+        if table == 'queue' and rebuilds_queue:
+            op.create_index('ix_queue_doctor_status_priority_created', 'queue',
+                            ['doctor_id', 'status', sa.text('priority DESC'), 'created_at'],
+                            unique=False)
+
+
+def upgrade():
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    _replace_foreign_keys(None)
@@ -1,6 +1,7 @@
 from extensions import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects.postgresql import JSONB
+from passwords import hash_password, verify_password
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -14,10 +15,10 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
 class Patient(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -27,68 +28,149 @@ class Patient(db.Model):
     phone = db.Column(db.String(20), nullable=False)
     address = db.Column(db.Text)
     department = db.Column(db.String(20), nullable=False)  # eye, ent, skin
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # keyset pagination key
+
+    __table_args__ = (
+        db.Index('ix_patient_created', 'created_at'),
+        # Exact-name lookups from the booking endpoints; fuzzy search indexes
+        # live in patient_search.py
+        db.Index('ix_patient_name', 'name'),
+    )
 
 class VitalSigns(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id', ondelete='CASCADE'), nullable=False)
     blood_pressure = db.Column(db.String(20))
+    # Parsed from blood_pressure (vital_trends.parse_blood_pressure)
+    systolic = db.Column(db.Integer)
+    diastolic = db.Column(db.Integer)
     heart_rate = db.Column(db.Integer)
     temperature = db.Column(db.Float)
     weight = db.Column(db.Float)
     height = db.Column(db.Float)
     oxygen_saturation = db.Column(db.Integer)
-    recorded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    recorded_by = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # partition key on Postgres
     
-    patient = db.relationship('Patient', backref='vital_signs')
-    recorder = db.relationship('User', backref='recorded_vitals')
+    patient = db.relationship('Patient', backref=db.backref('vital_signs', passive_deletes=True))
+    # Every vitals listing shows who recorded the reading
+    recorder = db.relationship('User', backref=db.backref('recorded_vitals', passive_deletes=True), lazy='joined')
+
+    __table_args__ = (
+        db.Index('ix_vital_signs_patient_created', 'patient_id', 'created_at'),
+    )
 
 class Appointment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id', ondelete='CASCADE'), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     date = db.Column(db.Date, nullable=False)
     time = db.Column(db.Time, nullable=False)
     status = db.Column(db.String(20), default='scheduled')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # keyset pagination key
     
-    patient = db.relationship('Patient', backref='appointments')
-    doctor = db.relationship('User', backref='appointments')
+    patient = db.relationship('Patient', backref=db.backref('appointments', passive_deletes=True))
+    doctor = db.relationship('User', backref=db.backref('appointments', passive_deletes=True))
+
+    __table_args__ = (
+        db.Index('ix_appointment_doctor_date', 'doctor_id', 'date'),
+    )
 
 class Consultation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id', ondelete='CASCADE'), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     symptoms = db.Column(db.Text)
     diagnosis = db.Column(db.Text, nullable=False)
     prescription = db.Column(db.Text)
-    tests = db.Column(db.Text)  # JSON string for test results
+    tests = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'))  # exam form, see exam_fields.py
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # partition key on Postgres
     
-    patient = db.relationship('Patient', backref='consultations')
-    doctor = db.relationship('User', backref='consultations')
+    patient = db.relationship('Patient', backref=db.backref('consultations', passive_deletes=True))
+    doctor = db.relationship('User', backref=db.backref('consultations', passive_deletes=True))
+
+    __table_args__ = (
+        db.Index('ix_consultation_patient_created', 'patient_id', 'created_at'),
+        db.Index('ix_consultation_doctor_created', 'doctor_id', 'created_at'),
+    )
 
 class Billing(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    consultation_id = db.Column(db.Integer, db.ForeignKey('consultation.id'), nullable=False)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    consultation_id = db.Column(db.Integer, db.ForeignKey('consultation.id', ondelete='CASCADE'), nullable=False)  # enforced by trigger on Postgres (partitions.py)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id', ondelete='CASCADE'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default='pending')  # pending, paid
     payment_method = db.Column(db.String(20))  # cash, mpesa, card
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # partition key on Postgres
     
-    consultation = db.relationship('Consultation', backref='billing')
-    patient = db.relationship('Patient', backref='bills')
+    consultation = db.relationship('Consultation', backref=db.backref('billing', passive_deletes=True))
+    patient = db.relationship('Patient', backref=db.backref('bills', passive_deletes=True))
+
+    __table_args__ = (
+        db.Index('ix_billing_created_status', 'created_at', 'status'),
+        db.Index('ix_billing_patient', 'patient_id'),
+        db.Index('ix_billing_consultation', 'consultation_id'),
+    )
 
 class Queue(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id', ondelete='CASCADE'), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     status = db.Column(db.String(20), default='waiting')  # waiting, in_progress, done
-    priority = db.Column(db.Integer, default=0)  # 1 for appointments, 0 for walk-ins
+    priority = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # 1 for appointments, 0 for walk-ins
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    patient = db.relationship('Patient', backref='queue_entries')
-    doctor = db.relationship('User', backref='queue_entries')
\ No newline at end of file
+    # Queue screens show both names for every entry; load them in the same
+    # SELECT instead of one lazy load per row
+    patient = db.relationship('Patient', backref=db.backref('queue_entries', passive_deletes=True), lazy='joined', innerjoin=True)
+    doctor = db.relationship('User', backref=db.backref('queue_entries', passive_deletes=True), lazy='joined', innerjoin=True)
+
+    __table_args__ = (
+        # Serves "call next": a doctor's waiting entries, highest priority
+        # first, then by arrival
+        db.Index('ix_queue_doctor_status_priority_created',
+                 doctor_id, status, priority.desc(), created_at),
+    )
+
+class DoctorPatient(db.Model):
+    # Denormalized doctor panel, kept current by the consultation, appointment
+    # and queue write paths (see rollups.py). Rebuild with
+    # `flask rebuild-doctor-patients`.
+    __tablename__ = 'doctor_patient'
+
+    doctor_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id', ondelete='CASCADE'), primary_key=True)
+    last_visit = db.Column(db.DateTime)  # last consultation with this doctor
+    consultation_count = db.Column(db.Integer, nullable=False, default=0)
+    appointment_count = db.Column(db.Integer, nullable=False, default=0)
+
+    patient = db.relationship('Patient')
+
+class DailyStats(db.Model):
+    # Per-day activity counts, kept current by the write endpoints (see
+    # rollups.py). doctor_id is 0 for facts that are not tied to a doctor,
+    # such as registrations. Rebuild with `flask rebuild-daily-stats`.
+    __tablename__ = 'daily_stats'
+
+    day = db.Column(db.Date, primary_key=True)
+    department = db.Column(db.String(20), primary_key=True)
+    doctor_id = db.Column(db.Integer, primary_key=True)
+    registrations = db.Column(db.Integer, nullable=False, default=0)
+    appointments = db.Column(db.Integer, nullable=False, default=0)  # by scheduled date
+    consultations = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)  # paid bills, by billing date
+
+    __table_args__ = (
+        db.Index('ix_daily_stats_doctor_day', 'doctor_id', 'day'),
+    )
+
+class QueueEvent(db.Model):
+    # Queue change feed for the SSE endpoints when the database cannot
+    # LISTEN/NOTIFY (SQLite). Rows are pruned by the listener after a few
+    # minutes; unused on Postgres. See queue_events.py.
+    __tablename__ = 'queue_event'
+
+    id = db.Column(db.Integer, primary_key=True)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,183 @@
+import base64
+import json
+from datetime import date, datetime, time
+
+from flask import abort, current_app, jsonify, make_response
+from sqlalchemy import literal, tuple_
+
+from date_ranges import day_bounds
+from extensions import db
+
+
+def _bad_request(message):
+    abort(make_response(jsonify({'error': message}), 400))
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        _bad_request(f'{name} must be YYYY-MM-DD')
+
+
+def _parse_int(value, name):
+    try:
+        return int(value)
+    except ValueError:
+        _bad_request(f'{name} must be an integer')
+
+
+def _age_band(args):
+    # ?age_band=18-35 or open-ended ?age_band=65-, or explicit ?min_age= /
+    # ?max_age=. 65+ is accepted too: sent unencoded, the '+' arrives as a
+    # space.
+    min_age = args.get('min_age')
+    max_age = args.get('max_age')
+    band = args.get('age_band')
+
+    if band:
+        band = band.replace(' ', '+')
+        if band.endswith('+'):
+            min_age, max_age = band[:-1], None
+        elif '-' in band:
+            min_age, max_age = band.split('-', 1)
+        else:
+            _bad_request('age_band must look like 18-35 or 65-')
+
+    return (
+        _parse_int(min_age, 'min_age') if min_age not in (None, '') else None,
+        _parse_int(max_age, 'max_age') if max_age not in (None, '') else None
+    )
+
+
+def filter_list_query(query, args, department=None, status=None, date_column=None,
+                      gender=None, age=None):
+    # Server-side list filters. Each keyword names the column a filter
+    # applies to for this endpoint; filters without a column are ignored.
+    if department is not None and args.get('department'):
+        query = query.filter(department == args['department'])
+
+    if status is not None and args.get('status'):
+        query = query.filter(status == args['status'])
+
+    if gender is not None and args.get('gender'):
+        query = query.filter(gender == args['gender'])
+
+    if age is not None:
+        min_age, max_age = _age_band(args)
+        if min_age is not None:
+            query = query.filter(age >= min_age)
+        if max_age is not None:
+            query = query.filter(age <= max_age)
+
+    if date_column is not None and (args.get('from') or args.get('to')):
+        start = _parse_date(args['from'], 'from') if args.get('from') else None
+        end = _parse_date(args['to'], 'to') if args.get('to') else None
+        if isinstance(date_column.type, db.DateTime):
+            # Half-open timestamp bounds so an index on the column is used
+            if start:
+                query = query.filter(date_column >= day_bounds(start)[0])
+            if end:
+                query = query.filter(date_column < day_bounds(end)[1])
+        else:
+            if start:
+                query = query.filter(date_column >= start)
+            if end:
+                query = query.filter(date_column <= end)
+
+    return query
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return ['datetime', value.isoformat()]
+    if isinstance(value, date):
+        return ['date', value.isoformat()]
+    if isinstance(value, time):
+        return ['time', value.isoformat()]
+    return [None, value]
+
+
+def _decode_value(pair):
+    kind, value = pair
+    if kind == 'datetime':
+        return datetime.fromisoformat(value)
+    if kind == 'date':
+        return date.fromisoformat(value)
+    if kind == 'time':
+        return time.fromisoformat(value)
+    return value
+
+
+def encode_cursor(values):
+    payload = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return [_decode_value(pair) for pair in json.loads(base64.urlsafe_b64decode(padded))]
+    except (ValueError, TypeError):
+        _bad_request('Invalid cursor')
+
+
+def keyset_page(query, args, sort_options, default_sort):
+    # Cursor (keyset) pagination with a stable order.
+    #
+    # sort_options maps a ?sort= name to the columns to order by; the last
+    # column must be unique (normally the primary key) so the order is
+    # total, and none may be nullable: a NULL key never compares past the
+    # cursor, so its row would silently drop out. A leading '-' sorts
+    # descending. The next page starts strictly
+    # after the last row's key, so it costs an index range scan however deep
+    # the client pages. Returns (rows, next_cursor or None).
+    #
+    # Paging is opt-in: a request with neither ?limit= nor ?cursor= gets
+    # every row, in the same order, as the list endpoints returned before
+    # they were paged. ?cursor= without ?limit= pages by PAGE_SIZE.
+    sort = args.get('sort') or default_sort
+    descending = sort.startswith('-')
+    columns = sort_options.get(sort.lstrip('-'))
+    if columns is None:
+        _bad_request('sort must be one of: ' + ', '.join(sorted(sort_options)))
+
+    paged = bool(args.get('limit') or args.get('cursor'))
+    if paged:
+        limit = args.get('limit')
+        limit = _parse_int(limit, 'limit') if limit else current_app.config['PAGE_SIZE']
+        limit = max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+
+    if args.get('cursor'):
+        values = decode_cursor(args['cursor'])
+        if len(values) != len(columns):
+            _bad_request('Invalid cursor')
+        key = tuple_(*columns)
+        after = tuple_(*[literal(v, column.type) for v, column in zip(values, columns)])
+        query = query.filter(key < after if descending else key > after)
+
+    entities = len(query.column_descriptions)
+    query = query.add_columns(*columns).order_by(
+        *[column.desc() if descending else column.asc() for column in columns]
+    )
+
+    rows = query.limit(limit + 1).all() if paged else query.all()
+    next_cursor = None
+    if paged and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][entities:])
+
+    # Sort keys ride along as extra trailing columns; named access to the
+    # original entities (row.Appointment, ...) is unaffected
+    if entities == 1:
+        return [row[0] for row in rows], next_cursor
+    return rows, next_cursor
+
+
+def page_response(items, next_cursor):
+    # Pages are plain JSON arrays, the same shape as the unpaged lists; the
+    # cursor for the next page travels in a header.
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
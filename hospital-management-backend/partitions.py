@@ -0,0 +1,190 @@
+import re
+import threading
+import time
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from extensions import db
+
+# consultation, vital_signs and billing only grow, and are read by recent
+# created_at. On Postgres they are range-partitioned by calendar month of
+# created_at (migration 0f0a961c2204), one table per month named
+# <table>_YYYY_MM plus <table>_default for anything outside them:
+#   - date-bounded queries only scan the months they cover, as long as they
+#     compare created_at itself (date_ranges.within_days does)
+#   - partitions for the coming months are created ahead of time, by every
+#     web process once a day and by `flask create-partitions`
+#   - old months are detached into an archive schema with
+#     `flask detach-partitions`, a catalog change instead of a DELETE
+# SQLite keeps plain tables and everything here is a no-op.
+#
+# Postgres can't point a foreign key at a partitioned table by id alone, so
+# billing.consultation_id has no constraint there; a trigger on consultation
+# deletes the bills instead (same effect as ON DELETE CASCADE).
+PARTITIONED_TABLES = ('consultation', 'vital_signs', 'billing')
+
+_PARTITION_NAME = re.compile(r'(%s)_(\d{4}_\d{2}|default)$' % '|'.join(PARTITIONED_TABLES))
+
+# pg_try_advisory_xact_lock key serializing partition maintenance
+_LOCK_KEY = 0x70617274
+
+
+def is_partition(name):
+    return bool(_PARTITION_NAME.match(name))
+
+
+def add_months(month, months):
+    years, index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_{month:%Y_%m}'
+
+
+def _current_month():
+    # created_at is stored in UTC
+    return datetime.utcnow().date().replace(day=1)
+
+
+def _is_partitioned(connection, table):
+    return connection.execute(text(
+        'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)'
+    ), {'table': table}).first() is not None
+
+
+def _exists(connection, name):
+    return connection.execute(text('SELECT to_regclass(:name)'), {'name': name}).scalar() is not None
+
+
+def _create_partition(connection, table, month):
+    name = partition_name(table, month)
+    if _exists(connection, name):
+        return False
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    in_month = f"created_at >= '{month.isoformat()}' AND created_at < '{add_months(month, 1).isoformat()}'"
+    default = f'{table}_default'
+
+    if _exists(connection, default) and connection.execute(
+        text(f'SELECT 1 FROM "{default}" WHERE {in_month} LIMIT 1')
+    ).first():
+        # Rows for this month already went to the default partition, and a
+        # partition can't be created over them: move them across (generated
+        # columns such as consultation.search_vector are recomputed). They
+        # are inserted before they are deleted, so the consultation delete
+        # trigger sees they still exist and leaves their bills alone.
+        columns = connection.execute(text(
+            "SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) FROM pg_attribute "
+            "WHERE attrelid = to_regclass(:table) AND attnum > 0 AND NOT attisdropped AND attgenerated = ''"
+        ), {'table': table}).scalar()
+        connection.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{default}"'))
+        connection.execute(text(f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES {bounds}'))
+        connection.execute(text(
+            f'INSERT INTO "{table}" ({columns}) SELECT {columns} FROM "{default}" WHERE {in_month}'
+        ))
+        connection.execute(text(f'DELETE FROM "{default}" WHERE {in_month}'))
+        connection.execute(text(f'ALTER TABLE "{table}" ATTACH PARTITION "{default}" DEFAULT'))
+    else:
+        connection.execute(text(f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES {bounds}'))
+    return True
+
+
+def ensure_partitions(months_ahead):
+    # Creates the partitions for this month and the next months_ahead.
+    # Every web process calls this; concurrent callers skip rather than wait.
+    created = []
+    with db.engine.begin() as connection:
+        if connection.dialect.name != 'postgresql':
+            return created
+        if not connection.execute(text('SELECT pg_try_advisory_xact_lock(:key)'),
+                                  {'key': _LOCK_KEY}).scalar():
+            return created
+        this_month = _current_month()
+        for table in PARTITIONED_TABLES:
+            if not _is_partitioned(connection, table):
+                continue
+            for offset in range(months_ahead + 1):
+                month = add_months(this_month, offset)
+                if _create_partition(connection, table, month):
+                    created.append(partition_name(table, month))
+    return created
+
+
+def list_partitions():
+    # (table, partition, bounds, bytes) for every partition
+    with db.engine.connect() as connection:
+        if connection.dialect.name != 'postgresql':
+            return []
+        return connection.execute(text(
+            'SELECT parent.relname, child.relname, '
+            'pg_get_expr(child.relpartbound, child.oid), pg_total_relation_size(child.oid) '
+            'FROM pg_inherits '
+            'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE parent.relname = ANY(:tables) AND parent.relnamespace = to_regnamespace(current_schema()) '
+            'ORDER BY parent.relname, child.relname'
+        ), {'tables': list(PARTITIONED_TABLES)}).all()
+
+
+def detach_partitions(before, schema, tablespace=None, lock_timeout='5s'):
+    # Detaches every monthly partition wholly before `before` (a month
+    # start) and moves it into `schema` as an ordinary table: nothing is
+    # deleted or rewritten, and the rows can then be dumped (pg_dump -t) and
+    # dropped, or kept there. With a tablespace the archived tables are also
+    # moved onto it, which does rewrite them, off the live tables' locks.
+    #
+    # Detaching takes a brief exclusive lock on the parent table; the lock
+    # timeout makes it give up instead of queueing the app behind a long
+    # query. daily_stats keeps the archived months' totals, but a later
+    # `flask rebuild-daily-stats` would drop them.
+    detached = []
+    with db.engine.begin() as connection:
+        if connection.dialect.name != 'postgresql':
+            return detached
+        connection.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+        connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        for table, name, _, _ in list_partitions():
+            suffix = name[len(table) + 1:]
+            if suffix == 'default':
+                continue
+            if date(int(suffix[:4]), int(suffix[5:]), 1) >= before:
+                continue
+            connection.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+            connection.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{schema}"'))
+            detached.append(name)
+
+    if tablespace:
+        for name in detached:
+            with db.engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE "{schema}"."{name}" SET TABLESPACE "{tablespace}"'))
+    return detached
+
+
+def init_partitions(app):
+    months_ahead = app.config['PARTITION_MONTHS_AHEAD']
+    interval = app.config['PARTITION_CHECK_INTERVAL']
+    database_url = app.config['SQLALCHEMY_DATABASE_URI']
+    if months_ahead <= 0 or not database_url or make_url(database_url).get_backend_name() != 'postgresql':
+        return
+    started = threading.Event()
+
+    def maintain():
+        while True:
+            with app.app_context():
+                try:
+                    created = ensure_partitions(months_ahead)
+                    if created:
+                        app.logger.info('Created partitions %s', ', '.join(created))
+                except Exception:
+                    app.logger.exception('Creating partitions failed')
+            time.sleep(interval)
+
+    # Started by the first request rather than here, so CLI commands
+    # (flask db upgrade included) never run it
+    @app.before_request
+    def start_partition_maintenance():
+        if not started.is_set():
+            started.set()
+            threading.Thread(target=maintain, name='partition-maintenance', daemon=True).start()
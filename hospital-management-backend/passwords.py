@@ -0,0 +1,130 @@
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from flask import current_app, has_request_context, jsonify
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Password hashing is deliberately slow CPU work. Running it inline holds a
+# worker thread (and the GIL) for the whole hash, so a login burst starves
+# every other endpoint. Hashes run in a small process pool instead, and each
+# web process admits at most PASSWORD_HASH_CONCURRENCY of them at a time;
+# beyond that, callers get PasswordHashingBusy (503) rather than queueing.
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+class PasswordHashingBusy(Exception):
+    pass
+
+
+def _new_executor(config):
+    # spawn, not fork: the web process has threads running
+    return ProcessPoolExecutor(
+        max_workers=config['PASSWORD_HASH_WORKERS'],
+        mp_context=multiprocessing.get_context('spawn')
+    )
+
+
+def _pool():
+    global _executor, _slots
+    with _lock:
+        if _slots is None:
+            config = current_app.config
+            _slots = threading.BoundedSemaphore(config['PASSWORD_HASH_CONCURRENCY'])
+            if config['PASSWORD_HASH_WORKERS'] > 0:
+                _executor = _new_executor(config)
+    return _executor, _slots
+
+
+def _replace_pool(broken):
+    # A hashing process died (e.g. OOM-killed) and the pool refuses all
+    # further work; swap in a new one unless another thread already has
+    global _executor
+    with _lock:
+        if _executor is broken:
+            broken.shutdown(wait=False)
+            _executor = _new_executor(current_app.config)
+        return _executor
+
+
+def _run(fn, *args):
+    if not has_request_context():
+        # CLI commands and seeding scripts hash inline; only web requests
+        # compete with each other for the pool
+        return fn(*args)
+
+    executor, slots = _pool()
+    if not slots.acquire(timeout=current_app.config['PASSWORD_HASH_QUEUE_TIMEOUT']):
+        raise PasswordHashingBusy()
+    try:
+        if executor is None:
+            return fn(*args)
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            return _replace_pool(executor).submit(fn, *args).result()
+    finally:
+        slots.release()
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def verify_password(pwhash, password):
+    return _run(check_password_hash, pwhash, password)
+
+
+# Memory-hard scrypt beats iterated pbkdf2; anything else (Werkzeug's
+# legacy salted digests) is weaker than both
+_METHOD_STRENGTH = {'pbkdf2': 1, 'scrypt': 2}
+
+
+@lru_cache(maxsize=None)
+def _with_parameters(method):
+    # The method as Werkzeug stores it, with any parameters the setting
+    # leaves out filled in ('scrypt' -> scrypt:32768:8:1). Hashes once.
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def _cost(parts):
+    # Comparable cost parameters, or None if they can't be read
+    try:
+        if parts[0] == 'scrypt':
+            return tuple(int(value) for value in parts[1:4])
+        return hashlib.new(parts[1]).digest_size, int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(pwhash):
+    # True only when PASSWORD_HASH_METHOD is stronger than the stored hash:
+    # a stronger method, or the same method with no parameter lower and one
+    # higher. A weaker or mixed setting never rewrites stored hashes.
+    stored = pwhash.split('$', 1)[0].split(':')
+    configured = _with_parameters(current_app.config['PASSWORD_HASH_METHOD']).split(':')
+    stored_strength = _METHOD_STRENGTH.get(stored[0], 0)
+    configured_strength = _METHOD_STRENGTH.get(configured[0], 0)
+    if stored_strength != configured_strength or not stored_strength:
+        return configured_strength > stored_strength
+
+    stored_cost, configured_cost = _cost(stored), _cost(configured)
+    if stored_cost is None:
+        return True
+    return configured_cost != stored_cost and all(
+        new >= old for new, old in zip(configured_cost, stored_cost)
+    )
+
+
+def init_passwords(app):
+    @app.errorhandler(PasswordHashingBusy)
+    def hashing_busy(error):
+        response = jsonify({'error': 'Too many logins in progress, please retry'})
+        response.headers['Retry-After'] = str(app.config['PASSWORD_HASH_RETRY_AFTER'])
+        return response, 503
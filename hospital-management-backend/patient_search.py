@@ -0,0 +1,132 @@
+import re
+
+from sqlalchemy import DDL, event, func, literal_column, or_, select, text
+
+from extensions import db
+from models import Patient
+
+# Search structures created by hand-written DDL rather than the models.
+# migrations/env.py keeps autogenerate from dropping them.
+SEARCH_INDEXES = ('ix_patient_name_prefix', 'ix_patient_name_trgm', 'ix_patient_phone_trgm')
+SEARCH_TABLES = ('patient_fts',)
+
+# Both: a b-tree on lower(name) returns name prefix matches already in
+# order, reading only the rows it returns. On Postgres it is built in the C
+# collation, where a prefix is a contiguous, bytewise range.
+#
+# Postgres: trigram GIN indexes serve substring and similarity matches on
+# name and phone.
+POSTGRESQL_DDL = [
+    'CREATE INDEX IF NOT EXISTS ix_patient_name_prefix ON patient ((lower(name) COLLATE "C"))',
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS ix_patient_name_trgm ON patient USING gin (lower(name) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_patient_phone_trgm ON patient USING gin (phone gin_trgm_ops)',
+]
+
+# SQLite: an external-content FTS5 table over patient, kept in sync by
+# triggers, with prefix indexes for typeahead.
+SQLITE_DDL = [
+    'CREATE INDEX IF NOT EXISTS ix_patient_name_prefix ON patient (lower(name))',
+    """CREATE VIRTUAL TABLE IF NOT EXISTS patient_fts USING fts5(
+        name, phone, content='patient', content_rowid='id', prefix='1 2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS patient_fts_insert AFTER INSERT ON patient BEGIN
+        INSERT INTO patient_fts(rowid, name, phone) VALUES (new.id, new.name, new.phone);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_fts_delete AFTER DELETE ON patient BEGIN
+        INSERT INTO patient_fts(patient_fts, rowid, name, phone) VALUES ('delete', old.id, old.name, old.phone);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_fts_update AFTER UPDATE OF name, phone ON patient BEGIN
+        INSERT INTO patient_fts(patient_fts, rowid, name, phone) VALUES ('delete', old.id, old.name, old.phone);
+        INSERT INTO patient_fts(rowid, name, phone) VALUES (new.id, new.name, new.phone);
+    END""",
+]
+
+for statement in POSTGRESQL_DDL:
+    event.listen(Patient.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+for statement in SQLITE_DDL:
+    event.listen(Patient.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(
+    Patient.__table__, 'before_drop',
+    DDL('DROP TABLE IF EXISTS patient_fts').execute_if(dialect='sqlite')
+)
+
+
+# Matches beyond the name prefix (a surname, part of a name, a misspelling,
+# a phone number) are only looked for in terms of this many characters, and
+# only this many of them are ranked: a short term matches a large part of
+# the table, and ranking all of it is what makes typeahead slow.
+FUZZY_MIN_LENGTH = 3
+FUZZY_CANDIDATES = 200
+
+
+def _prefix_key():
+    name = func.lower(Patient.name)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return name.collate('C')
+    return name
+
+
+def _prefix_matches(term, limit):
+    # Names starting with the term, in name order, straight off
+    # ix_patient_name_prefix: the range [term, term with its last character
+    # incremented) holds exactly the names with that prefix
+    key = _prefix_key()
+    upper = term[:-1] + chr(ord(term[-1]) + 1)
+    return db.session.query(Patient).filter(key >= term, key < upper)\
+        .order_by(key, Patient.id).limit(limit).all()
+
+
+def _postgresql_fuzzy(term, limit, exclude):
+    name = func.lower(Patient.name)
+    digits = re.sub(r'\D', '', term)
+
+    matches = [name.contains(term, autoescape=True), name.op('%')(term)]
+    if len(digits) >= FUZZY_MIN_LENGTH:
+        matches.append(Patient.phone.contains(digits, autoescape=True))
+
+    candidates = select(Patient.id).where(or_(*matches), Patient.id.notin_(exclude))\
+        .limit(FUZZY_CANDIDATES).subquery()
+    rank = func.greatest(
+        func.similarity(name, term),
+        func.similarity(Patient.phone, digits or term)
+    )
+    return db.session.query(Patient).join(candidates, candidates.c.id == Patient.id)\
+        .order_by(rank.desc(), Patient.name, Patient.id).limit(limit).all()
+
+
+def _sqlite_fuzzy(term, limit, exclude):
+    # Every word of the query is a prefix match against name or phone
+    words = re.findall(r'\w+', term)
+    if not words:
+        return []
+    match = ' '.join('"%s"*' % word for word in words)
+
+    candidates = select(
+        literal_column('rowid').label('id'),
+        literal_column('bm25(patient_fts)').label('rank')
+    ).select_from(text('patient_fts')).where(
+        text('patient_fts MATCH :match').bindparams(match=match),
+        literal_column('rowid').notin_(exclude)
+    ).limit(FUZZY_CANDIDATES).subquery()
+
+    return db.session.query(Patient).join(candidates, candidates.c.id == Patient.id)\
+        .order_by(candidates.c.rank, Patient.name, Patient.id).limit(limit).all()
+
+
+def search_patients(term, limit):
+    # At most `limit` patients for a typeahead: names starting with the term
+    # first, all of them and in name order. Terms of FUZZY_MIN_LENGTH or
+    # more are then topped up with the best ranked of up to
+    # FUZZY_CANDIDATES other matches on name and phone.
+    term = term.strip().lower()
+    if not term:
+        return []
+    patients = _prefix_matches(term, limit)
+    if len(patients) == limit or len(term) < FUZZY_MIN_LENGTH:
+        return patients
+
+    exclude = [patient.id for patient in patients]
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return patients + _postgresql_fuzzy(term, limit - len(patients), exclude)
+    return patients + _sqlite_fuzzy(term, limit - len(patients), exclude)
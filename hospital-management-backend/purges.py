@@ -0,0 +1,54 @@
+from flask import current_app
+from sqlalchemy import delete, select
+
+from extensions import db
+from models import Appointment, Consultation, DailyStats, Patient, User, VitalSigns
+from rollups import retract_daily_stats
+
+# Deleting a patient or user cascades in the database (ON DELETE CASCADE) to
+# everything that references them, billing via consultations included.
+#
+# A doctor with years of history can own hundreds of thousands of rows, and
+# one cascading DELETE would hold all their row locks (and hold up the queue
+# and dashboards touching them) until it finished. Their history is removed
+# first in PURGE_BATCH_SIZE chunks, each committed on its own, so no lock is
+# held for longer than one chunk. A purge that fails part way leaves the user
+# in place with less history; running it again finishes the job.
+
+
+def _delete_in_batches(model, column, value, batch_size):
+    deleted = 0
+    while True:
+        batch = select(model.id).where(column == value).limit(batch_size).scalar_subquery()
+        result = db.session.execute(
+            delete(model).where(model.id.in_(batch)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+def purge_user(user_id, batch_size=None):
+    batch_size = batch_size or current_app.config['PURGE_BATCH_SIZE']
+    deleted = {
+        'consultations': _delete_in_batches(Consultation, Consultation.doctor_id, user_id, batch_size),
+        'appointments': _delete_in_batches(Appointment, Appointment.doctor_id, user_id, batch_size),
+        'vital_signs': _delete_in_batches(VitalSigns, VitalSigns.recorded_by, user_id, batch_size)
+    }
+
+    # What is left (queue entries, the panel, rows written since the batches
+    # ran) goes with the user
+    DailyStats.query.filter_by(doctor_id=user_id).delete()
+    db.session.execute(delete(User).where(User.id == user_id))
+    db.session.commit()
+    return deleted
+
+
+def purge_patient(patient_id):
+    # One patient's history is small enough for a single transaction, which
+    # keeps the daily statistics exact
+    retract_daily_stats(patient_id=patient_id)
+    db.session.execute(delete(Patient).where(Patient.id == patient_id))
+    db.session.commit()
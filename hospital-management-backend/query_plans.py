@@ -0,0 +1,215 @@
+import json
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import Executable, ClauseElement
+
+from extensions import db
+from partitions import is_partition
+from models import Consultation, Patient, User
+from sql_stats import count_queries
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+def _compile_explained(element, compiler, **kw):
+    sql = compiler.process(element.stmt, **kw)
+    # The plan rows are not the statement's rows: drop its result columns,
+    # or a one-column statement's type (a Float sum, say) is applied to the
+    # plan column by position
+    compiler._result_columns = []
+    return sql
+
+
+@compiles(Explain)
+def _explain_default(element, compiler, **kw):
+    return 'EXPLAIN QUERY PLAN ' + _compile_explained(element, compiler, **kw)
+
+
+@compiles(Explain, 'postgresql')
+def _explain_postgresql(element, compiler, **kw):
+    return 'EXPLAIN (FORMAT JSON) ' + _compile_explained(element, compiler, **kw)
+
+
+# The routes every screen load runs, keyed by endpoint: (role, path, tables
+# whose rows must be found through an index, tables a single day's range
+# must read one partition of on Postgres). check_query_plans() requests each
+# one and checks the plan of every SELECT it runs, so the check always
+# covers the statements the routes issue. {patient_id} and {today} are
+# filled in from the database being checked.
+HOT_ROUTES = [
+    ('doctor.get_queue', 'doctor', '/api/doctor/queue', ('queue',), ()),
+    ('doctor.dashboard', 'doctor', '/api/doctor/dashboard', ('appointment', 'daily_stats'), ()),
+    ('doctor.my_patients', 'doctor', '/api/doctor/my-patients', ('doctor_patient',), ()),
+    ('doctor.get_appointments', 'doctor', '/api/doctor/appointments', ('appointment',), ()),
+    ('doctor.patient_history', 'doctor', '/api/doctor/patient-history/{patient_id}', ('consultation',), ()),
+    ('doctor.exam_search', 'doctor', '/api/doctor/exam-search?exam=od_pressure%3E21', ('consultation',), ()),
+    ('doctor.consultation_search', 'doctor', '/api/doctor/consultation-search?q=glaucoma', ('consultation',), ()),
+    ('receptionist.get_patients', 'receptionist', '/api/receptionist/patients', ('consultation',), ()),
+    ('receptionist.dashboard_summary', 'receptionist', '/api/receptionist/dashboard-summary',
+     ('patient', 'billing'), ('billing',)),
+    ('receptionist.search_patients', 'receptionist', '/api/receptionist/patients/search?q=ach', ('patient',), ()),
+    ('receptionist.get_patient_details', 'receptionist', '/api/receptionist/patient-details/{patient_id}',
+     ('consultation', 'billing'), ()),
+    ('admin.dashboard_summary', 'admin', '/api/admin/dashboard-summary', ('daily_stats',), ()),
+    ('admin.get_patient_details', 'admin', '/api/admin/patient-details/{patient_id}', ('billing',), ()),
+    ('vitals.get_patient_vitals', 'doctor', '/api/vitals/patient/{patient_id}', ('vital_signs',), ()),
+    ('vitals.get_vitals_trend', 'doctor',
+     '/api/vitals/trend/{patient_id}?start={today}T00:00:00&end={today}T12:00:00',
+     ('vital_signs',), ('vital_signs',)),
+]
+
+
+def write_path_queries(doctor_id):
+    # Lookups made by write endpoints, which the check can't request, built
+    # with the routes' own helpers: (endpoint, indexed tables, statement)
+    from routes.doctor_routes import first_waiting, next_in_line
+    from routes.receptionist_routes import patients_named
+
+    return [
+        ('doctor.call_next', ('queue',), first_waiting(next_in_line(doctor_id)).statement),
+        ('receptionist.create_appointment', ('patient',), patients_named('name').limit(2).statement),
+    ]
+
+
+def _sample_users():
+    # The first user of each role, or None
+    return {role: User.query.filter_by(role=role).order_by(User.id).first()
+            for role in ('admin', 'receptionist', 'doctor')}
+
+
+def _sample_patient_id():
+    # The patient with the most consultations, so the per-patient routes
+    # get past their lookups and run their list queries
+    return db.session.scalar(
+        select(Consultation.patient_id).group_by(Consultation.patient_id)
+        .order_by(func.count().desc(), Consultation.patient_id).limit(1)
+    ) or db.session.scalar(select(func.min(Patient.id))) or 0
+
+
+def _route_statements(app, role, user, path):
+    # Requests `path` with `user`'s session; returns the status and the
+    # (statement, parameters) of every SELECT the route ran
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user.id if user else 0
+        session['role'] = role
+        session['department'] = user.department if user else None
+    with count_queries() as queries:
+        response = client.get(path)
+    return response.status_code, [
+        (statement, parameters)
+        for statement, parameters in zip(queries.statements, queries.parameters)
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH'))
+    ]
+
+
+def _explain(connection, dialect, statement, parameters):
+    # `statement` is either a SQL string as the route sent it, with its
+    # parameters, or a statement object (parameters None)
+    if parameters is None:
+        return connection.execute(Explain(statement)).fetchall()
+    prefix = 'EXPLAIN (FORMAT JSON) ' if dialect == 'postgresql' else 'EXPLAIN QUERY PLAN '
+    return connection.exec_driver_sql(prefix + statement, parameters).fetchall()
+
+
+def _postgresql_scans(plan, table):
+    # (node type, relation) for every scan of the table or, when it is
+    # partitioned, of one of its partitions
+    found = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        relation = node.get('Relation Name')
+        if relation == table or (relation and relation.startswith(table + '_') and is_partition(relation)):
+            found.append((node['Node Type'], relation))
+        stack.extend(node.get('Plans', []))
+    return found
+
+
+def _postgresql_seq_scans(plan, table):
+    return ['Seq Scan on %s' % relation
+            for node_type, relation in _postgresql_scans(plan, table) if node_type == 'Seq Scan']
+
+
+def _postgresql_unpruned(plan, table):
+    partitions = {relation for _, relation in _postgresql_scans(plan, table) if relation != table}
+    if len(partitions) > 1:
+        return ['scans %d partitions of %s' % (len(partitions), table)]
+    return []
+
+
+def _sqlite_seq_scans(rows, table):
+    # "SCAN queue" is a full table scan, "SEARCH queue USING INDEX ..." and
+    # "SCAN queue USING INDEX ..." are both served by an index.
+    found = []
+    for row in rows:
+        detail = row[-1]
+        if detail.strip() in ('SCAN %s' % table, 'SCAN TABLE %s' % table):
+            found.append(detail)
+    return found
+
+
+def _plan_failures(rows, dialect, indexed, single_partition):
+    # (table, detail) for every problem in one statement's plan
+    failures = []
+    if dialect == 'postgresql':
+        plan = rows[0][0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        for table in indexed:
+            failures += [(table, detail) for detail in _postgresql_seq_scans(plan[0]['Plan'], table)]
+        for table in single_partition:
+            failures += [(table, detail) for detail in _postgresql_unpruned(plan[0]['Plan'], table)]
+    else:
+        for table in indexed:
+            failures += [(table, detail) for detail in _sqlite_seq_scans(rows, table)]
+    return failures
+
+
+def check_query_plans():
+    # Returns a list of (endpoint, table, plan detail) for every hot route
+    # statement that reads one of its indexed tables with a sequential scan,
+    # or on Postgres reads more than one partition for a single day's range.
+    # On Postgres sequential scans are disabled for the check so the answer
+    # does not depend on table sizes: the planner only picks one if no index
+    # can serve the filter. Run it against a database with data in it: a
+    # route that finds no patient stops before its list queries.
+    app = current_app._get_current_object()
+    users = _sample_users()
+    values = {'patient_id': _sample_patient_id(), 'today': date.today().isoformat()}
+
+    failures = []
+    statements = []
+    for endpoint, role, path, indexed, single_partition in HOT_ROUTES:
+        status, executed = _route_statements(app, role, users[role], path.format(**values))
+        if status >= 500:
+            failures.append((endpoint, '-', 'HTTP %d' % status))
+        statements += [(endpoint, indexed, single_partition, statement, parameters)
+                       for statement, parameters in executed]
+    doctor_id = users['doctor'].id if users['doctor'] else 0
+    statements += [(endpoint, indexed, (), statement, None)
+                   for endpoint, indexed, statement in write_path_queries(doctor_id)]
+
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+
+    if dialect == 'postgresql':
+        connection.execute(text('SET LOCAL enable_seqscan = off'))
+
+    try:
+        for endpoint, indexed, single_partition, statement, parameters in statements:
+            rows = _explain(connection, dialect, statement, parameters)
+            for table, detail in _plan_failures(rows, dialect, indexed, single_partition):
+                failures.append((endpoint, table, detail))
+    finally:
+        db.session.rollback()
+
+    return failures
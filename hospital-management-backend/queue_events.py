@@ -0,0 +1,192 @@
+import json
+import queue
+import select as selectors
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Response, current_app, jsonify, stream_with_context
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+
+from extensions import db
+from models import QueueEvent
+
+# Postgres NOTIFY channel carrying queue changes between gunicorn workers
+CHANNEL = 'queue_events'
+
+# Event types pushed to the doctor and receptionist screens
+EVENT_TYPES = ('added', 'started', 'removed', 'completed')
+
+
+def publish(event_type, doctor_id, patient_id, queue_ids, **extra):
+    # Runs inside the caller's transaction, so listeners only hear about a
+    # change once it has been committed (NOTIFY is delivered on commit, and
+    # the SQLite fallback row only becomes visible on commit).
+    payload = json.dumps({
+        'type': event_type,
+        'doctor_id': doctor_id,
+        'patient_id': patient_id,
+        'queue_ids': list(queue_ids),
+        **extra
+    })
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(select(func.pg_notify(CHANNEL, payload)))
+    else:
+        db.session.add(QueueEvent(payload=payload))
+
+
+class _Broker:
+    # One listener thread per worker process fans events out to the
+    # in-process SSE subscribers.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.thread = None
+        self.closing = threading.Event()
+
+    def subscribe(self, app):
+        # None when this worker already serves QUEUE_EVENTS_MAX_STREAMS
+        events = queue.Queue(maxsize=1000)
+        with self.lock:
+            if len(self.subscribers) >= app.config['QUEUE_EVENTS_MAX_STREAMS']:
+                return None
+            self.subscribers.add(events)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self._run, args=(app,), name='queue-events', daemon=True
+                )
+                self.thread.start()
+        return events
+
+    def unsubscribe(self, events):
+        with self.lock:
+            self.subscribers.discard(events)
+
+    def _dispatch(self, payload):
+        event = json.loads(payload)
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for events in subscribers:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                # A stalled client must not hold up everyone else
+                pass
+
+    def _run(self, app):
+        with app.app_context():
+            while True:
+                try:
+                    if db.engine.dialect.name == 'postgresql':
+                        self._listen_postgresql(app)
+                    else:
+                        self._poll_table(app)
+                except Exception:
+                    app.logger.exception('Queue event listener failed; restarting')
+                    time.sleep(1)
+
+    def _listen_postgresql(self, app):
+        # A dedicated connection outside the pool, parked on LISTEN. LISTEN
+        # needs a session-level connection, which PgBouncer in transaction
+        # mode cannot give, hence LISTEN_DATABASE_URL.
+        engine = db.engine
+        url = make_url(app.config['LISTEN_DATABASE_URL']) if app.config['LISTEN_DATABASE_URL'] else engine.url
+        cargs, cparams = engine.dialect.create_connect_args(url)
+        connection = engine.dialect.connect(*cargs, **cparams)
+        try:
+            connection.autocommit = True
+            cursor = connection.cursor()
+            cursor.execute(f'LISTEN {CHANNEL}')
+            while True:
+                if selectors.select([connection], [], [], 5) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    self._dispatch(connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
+    def _poll_table(self, app):
+        # SQLite fallback: workers share the database file, so new
+        # queue_event rows are visible to every worker's poller.
+        interval = app.config['QUEUE_EVENTS_POLL_INTERVAL']
+        last_id = db.session.query(func.max(QueueEvent.id)).scalar() or 0
+        db.session.remove()
+        polls = 0
+
+        while True:
+            time.sleep(interval)
+            rows = db.session.query(QueueEvent.id, QueueEvent.payload)\
+                .filter(QueueEvent.id > last_id)\
+                .order_by(QueueEvent.id).all()
+            for event_id, payload in rows:
+                self._dispatch(payload)
+                last_id = event_id
+
+            polls += 1
+            if polls % 600 == 0:
+                cutoff = datetime.utcnow() - timedelta(minutes=10)
+                QueueEvent.query.filter(QueueEvent.created_at < cutoff).delete()
+                db.session.commit()
+            db.session.remove()
+
+
+_broker = _Broker()
+
+
+def close_streams():
+    # Called when the worker is told to shut down (gunicorn.conf.py): open
+    # streams end now instead of holding the graceful
+    # restart until it times out. Clients reconnect to the new worker.
+    _broker.closing.set()
+    with _broker.lock:
+        subscribers = list(_broker.subscribers)
+    for events in subscribers:
+        try:
+            events.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+def event_stream(doctor_id=None):
+    # text/event-stream response; doctor screens only see their own queue.
+    # Under the gthread worker every open stream holds a request thread, so
+    # each worker serves at most QUEUE_EVENTS_MAX_STREAMS of them, and each
+    # ends after QUEUE_EVENTS_MAX_AGE seconds; the browser's EventSource
+    # reconnects after the `retry` delay, possibly to a less busy worker.
+    app = current_app._get_current_object()
+    heartbeat = app.config['QUEUE_EVENTS_HEARTBEAT']
+    events = _broker.subscribe(app)
+    if events is None:
+        response = jsonify({'error': 'Too many open queue streams, please retry'})
+        response.headers['Retry-After'] = str(app.config['QUEUE_EVENTS_RETRY_AFTER'])
+        return response, 503
+    ends_at = time.monotonic() + app.config['QUEUE_EVENTS_MAX_AGE']
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            while not _broker.closing.is_set():
+                remaining = ends_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = events.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if event is None:
+                    break
+                if doctor_id is not None and event['doctor_id'] != doctor_id:
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            _broker.unsubscribe(events)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,260 @@
+from datetime import date
+
+from sqlalchemy import DateTime, case, cast, func, literal, null, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models import Appointment, Billing, Consultation, DailyStats, DoctorPatient, Patient, Queue, User
+
+
+def _upsert(model, keys, increments=None, latest=None):
+    # INSERT ... ON CONFLICT DO UPDATE so concurrent workers never race on
+    # creating the same rollup row. `increments` are added to the stored
+    # counters, `latest` columns keep the most recent non-null value.
+    increments = increments or {}
+    latest = latest or {}
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        insert = postgresql.insert
+    elif dialect == 'sqlite':
+        insert = sqlite.insert
+    else:
+        raise NotImplementedError(f'Rollups are not supported on {dialect}')
+
+    stmt = insert(table).values(**keys, **increments, **latest)
+
+    set_ = {}
+    for name in increments:
+        set_[name] = table.c[name] + stmt.excluded[name]
+    for name in latest:
+        current, new = table.c[name], stmt.excluded[name]
+        set_[name] = case(
+            (current.is_(None), new),
+            (new > current, new),
+            else_=current
+        )
+
+    if set_:
+        stmt = stmt.on_conflict_do_update(index_elements=list(keys), set_=set_)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(keys))
+
+    db.session.execute(stmt)
+
+
+def record_panel_visit(doctor_id, patient_id, consultations=0, appointments=0, visited_at=None):
+    # Called from the consultation, appointment and queue write paths inside
+    # their own transaction.
+    _upsert(
+        DoctorPatient,
+        {'doctor_id': doctor_id, 'patient_id': patient_id},
+        increments={
+            'consultation_count': consultations,
+            'appointment_count': appointments
+        },
+        latest={'last_visit': visited_at}
+    )
+
+
+def _panel_select(doctor_id=None, patient_id=None):
+    # One row per (doctor, patient) pair linked through a consultation,
+    # appointment or queue entry, with the same values the write paths keep.
+    # Postgres types a bare NULL in a UNION as text, hence the cast.
+    no_visit = cast(null(), DateTime)
+
+    def scoped(stmt, model):
+        if doctor_id is not None:
+            stmt = stmt.where(model.doctor_id == doctor_id)
+        if patient_id is not None:
+            stmt = stmt.where(model.patient_id == patient_id)
+        return stmt
+
+    consultations = scoped(select(
+        Consultation.doctor_id,
+        Consultation.patient_id,
+        func.max(Consultation.created_at).label('last_visit'),
+        func.count().label('consultation_count'),
+        literal(0).label('appointment_count')
+    ).group_by(Consultation.doctor_id, Consultation.patient_id), Consultation)
+
+    appointments = scoped(select(
+        Appointment.doctor_id,
+        Appointment.patient_id,
+        no_visit.label('last_visit'),
+        literal(0).label('consultation_count'),
+        func.count().label('appointment_count')
+    ).group_by(Appointment.doctor_id, Appointment.patient_id), Appointment)
+
+    queue = scoped(select(
+        Queue.doctor_id,
+        Queue.patient_id,
+        no_visit.label('last_visit'),
+        literal(0).label('consultation_count'),
+        literal(0).label('appointment_count')
+    ).distinct(), Queue)
+
+    sources = union_all(consultations, appointments, queue).subquery()
+    return select(
+        sources.c.doctor_id,
+        sources.c.patient_id,
+        func.max(sources.c.last_visit),
+        func.sum(sources.c.consultation_count),
+        func.sum(sources.c.appointment_count)
+    ).group_by(sources.c.doctor_id, sources.c.patient_id)
+
+
+def _insert_panel_rows(stmt):
+    db.session.execute(DoctorPatient.__table__.insert().from_select(
+        ['doctor_id', 'patient_id', 'last_visit', 'consultation_count', 'appointment_count'],
+        stmt
+    ))
+
+
+def refresh_panel(doctor_id, patient_id):
+    # Recompute one panel row from the source tables after a delete, which
+    # can move last_visit backwards and cannot be applied incrementally.
+    DoctorPatient.query.filter_by(doctor_id=doctor_id, patient_id=patient_id).delete()
+    _insert_panel_rows(_panel_select(doctor_id, patient_id))
+
+
+def rebuild_doctor_patients():
+    DoctorPatient.query.delete()
+    _insert_panel_rows(_panel_select())
+    db.session.commit()
+    return DoctorPatient.query.count()
+
+
+STAT_COLUMNS = ('registrations', 'appointments', 'consultations', 'revenue')
+
+
+def record_daily_stats(day, department, doctor_id=0, **deltas):
+    # Add (or, with negative values, remove) activity for one day. Keyword
+    # arguments are the STAT_COLUMNS to change.
+    _upsert(
+        DailyStats,
+        {'day': day, 'department': department or '', 'doctor_id': doctor_id or 0},
+        increments={name: deltas.get(name, 0) for name in STAT_COLUMNS}
+    )
+
+
+def move_daily_stats(doctor_id, department):
+    # A doctor's appointments, consultations and revenue are counted under
+    # their department: when it changes, move their rows to the new one.
+    department = department or ''
+    moved = DailyStats.query.filter(
+        DailyStats.doctor_id == doctor_id,
+        DailyStats.department != department
+    )
+    for row in moved.all():
+        record_daily_stats(row.day, department, doctor_id, **{
+            name: getattr(row, name) for name in STAT_COLUMNS
+        })
+    moved.delete(synchronize_session=False)
+
+
+def _daily_stats_select(patient_id=None, doctor_id=None, consultation_id=None):
+    # The same per-day facts the write paths record, computed from the
+    # source tables. Scoping by patient or consultation is used to retract
+    # facts before a delete.
+    zero = literal(0)
+    sources = []
+
+    if doctor_id is None and consultation_id is None:
+        registrations = select(
+            func.date(Patient.created_at).label('day'),
+            func.coalesce(Patient.department, '').label('department'),
+            zero.label('doctor_id'),
+            func.count().label('registrations'),
+            zero.label('appointments'),
+            zero.label('consultations'),
+            zero.label('revenue')
+        ).group_by(func.date(Patient.created_at), Patient.department)
+        if patient_id is not None:
+            registrations = registrations.where(Patient.id == patient_id)
+        sources.append(registrations)
+
+    if consultation_id is None:
+        appointments = select(
+            Appointment.date.label('day'),
+            func.coalesce(User.department, '').label('department'),
+            Appointment.doctor_id,
+            zero.label('registrations'),
+            func.count().label('appointments'),
+            zero.label('consultations'),
+            zero.label('revenue')
+        ).join(User, Appointment.doctor_id == User.id)\
+            .group_by(Appointment.date, User.department, Appointment.doctor_id)
+        if patient_id is not None:
+            appointments = appointments.where(Appointment.patient_id == patient_id)
+        if doctor_id is not None:
+            appointments = appointments.where(Appointment.doctor_id == doctor_id)
+        sources.append(appointments)
+
+    consultations = select(
+        func.date(Consultation.created_at).label('day'),
+        func.coalesce(User.department, '').label('department'),
+        Consultation.doctor_id,
+        zero.label('registrations'),
+        zero.label('appointments'),
+        func.count().label('consultations'),
+        zero.label('revenue')
+    ).join(User, Consultation.doctor_id == User.id)\
+        .group_by(func.date(Consultation.created_at), User.department, Consultation.doctor_id)
+
+    revenue = select(
+        func.date(Billing.created_at).label('day'),
+        func.coalesce(User.department, '').label('department'),
+        Consultation.doctor_id,
+        zero.label('registrations'),
+        zero.label('appointments'),
+        zero.label('consultations'),
+        func.sum(Billing.amount).label('revenue')
+    ).join(Consultation, Billing.consultation_id == Consultation.id)\
+        .join(User, Consultation.doctor_id == User.id)\
+        .where(Billing.status == 'paid')\
+        .group_by(func.date(Billing.created_at), User.department, Consultation.doctor_id)
+
+    if patient_id is not None:
+        consultations = consultations.where(Consultation.patient_id == patient_id)
+        revenue = revenue.where(Billing.patient_id == patient_id)
+    if doctor_id is not None:
+        consultations = consultations.where(Consultation.doctor_id == doctor_id)
+        revenue = revenue.where(Consultation.doctor_id == doctor_id)
+    if consultation_id is not None:
+        consultations = consultations.where(Consultation.id == consultation_id)
+        revenue = revenue.where(Billing.consultation_id == consultation_id)
+    sources.extend([consultations, revenue])
+
+    facts = union_all(*sources).subquery()
+    return select(
+        facts.c.day,
+        facts.c.department,
+        facts.c.doctor_id,
+        *[func.sum(facts.c[name]) for name in STAT_COLUMNS]
+    ).where(facts.c.day.isnot(None)).group_by(facts.c.day, facts.c.department, facts.c.doctor_id)
+
+
+def retract_daily_stats(patient_id=None, consultation_id=None):
+    # Must run before the rows are deleted.
+    rows = db.session.execute(_daily_stats_select(
+        patient_id=patient_id,
+        consultation_id=consultation_id
+    )).all()
+    for day, department, doctor_id, *values in rows:
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        record_daily_stats(day, department, doctor_id, **{
+            name: -(value or 0) for name, value in zip(STAT_COLUMNS, values)
+        })
+
+
+def rebuild_daily_stats():
+    DailyStats.query.delete()
+    db.session.execute(DailyStats.__table__.insert().from_select(
+        ['day', 'department', 'doctor_id', *STAT_COLUMNS],
+        _daily_stats_select()
+    ))
+    db.session.commit()
+    return DailyStats.query.count()
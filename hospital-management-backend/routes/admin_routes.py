@@ -1,10 +1,26 @@
-from flask import Blueprint, request, jsonify, session
-from models import User, Patient, Appointment, Consultation, Billing, VitalSigns, Queue
+from flask import Blueprint, request, jsonify, session, current_app
+from models import User, Patient, Appointment, Consultation, Billing, DailyStats
 from extensions import db
+from date_ranges import parse_date_range
+from pagination import filter_list_query, keyset_page, page_response
+from rollups import move_daily_stats, refresh_panel, record_daily_stats, retract_daily_stats
+from db_pool import pool_stats
+from purges import purge_patient, purge_user
+from slow_queries import SUMMARY_SORTS, slow_query_summary
+from serializers import APPOINTMENT, BILLING, PATIENT
 from datetime import datetime, date
+import os
 
 admin_bp = Blueprint('admin', __name__)
 
+# List rows as this blueprint returns them
+APPOINTMENT_LIST = APPOINTMENT.prefixed('Appointment').extend(
+    patient_name='Patient.name', doctor_name='User.name', department='User.department'
+)
+BILLING_LIST = BILLING.prefixed('Billing').extend(
+    patient_name='Patient.name', doctor_name='User.name', department='User.department'
+)
+
 @admin_bp.route('/dashboard-summary')
 def dashboard_summary():
     if session.get('role') != 'admin':
@@ -12,17 +28,8 @@ def dashboard_summary():
     
     from datetime import timedelta
     
-    # Get date parameters
-    start_date = request.args.get('startDate')
-    end_date = request.args.get('endDate')
-    
-    # Default to today if no dates provided
-    if not start_date or not end_date:
-        today = date.today()
-        start_date = end_date = today
-    else:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    # Get date parameters (default to today)
+    start_date, end_date = parse_date_range(request.args)
     
     # Get statistics
     total_doctors = User.query.filter_by(role='doctor').count()
@@ -30,40 +37,31 @@ def dashboard_summary():
     total_patients = Patient.query.count()
     
     # Calculate revenue for date range
-    revenue = db.session.query(db.func.sum(Billing.amount)).filter(
-        db.func.date(Billing.created_at) >= start_date,
-        db.func.date(Billing.created_at) <= end_date,
-        Billing.status == 'paid'
+    revenue = db.session.query(db.func.sum(DailyStats.revenue)).filter(
+        DailyStats.day >= start_date,
+        DailyStats.day <= end_date
     ).scalar() or 0
     
     # Get patient flow data with real-time statistics (last 7 days from today)
-    patient_flow = []
+    # New registrations, scheduled appointments and completed consultations
+    # per day, read from the daily_stats rollup in one query
     today = date.today()
+    week_start = today - timedelta(days=6)
+    
+    daily_activity = dict(db.session.query(
+        DailyStats.day,
+        db.func.sum(DailyStats.registrations + DailyStats.appointments + DailyStats.consultations)
+    ).filter(
+        DailyStats.day >= week_start,
+        DailyStats.day <= today
+    ).group_by(DailyStats.day).all())
     
+    patient_flow = []
     for i in range(7):
-        flow_date = today - timedelta(days=6-i)
-        
-        # Count new patient registrations for this specific date
-        new_patients = Patient.query.filter(
-            db.func.date(Patient.created_at) == flow_date
-        ).count()
-        
-        # Count appointments scheduled for this date
-        appointments = Appointment.query.filter(
-            Appointment.date == flow_date
-        ).count()
-        
-        # Count consultations completed on this date
-        consultations = Consultation.query.filter(
-            db.func.date(Consultation.created_at) == flow_date
-        ).count()
-        
-        # Total patient activity for the day
-        total_activity = new_patients + appointments + consultations
-        
+        flow_date = week_start + timedelta(days=i)
         patient_flow.append({
             'day': flow_date.strftime('%a'),
-            'patients': total_activity
+            'patients': int(daily_activity.get(flow_date) or 0)
         })
     
     # Get recent appointments (last 5 appointments)
@@ -124,6 +122,37 @@ def hospital_overview():
         } for dept in dept_stats]
     })
 
+@admin_bp.route('/pool-stats')
+def get_pool_stats():
+    if session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    # Connection pool of the worker process that served this request
+    return jsonify({
+        'pid': os.getpid(),
+        'mode': os.environ.get('DB_POOL_MODE', 'app'),
+        **pool_stats(db.engine)
+    })
+
+@admin_bp.route('/slow-queries')
+def get_slow_queries():
+    if session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    # Worst statements in the newest part of the slow-query log (all
+    # workers, rotated files included), ranked by total, max, count or avg
+    # time
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    sort = request.args.get('sort', 'total')
+    if sort not in SUMMARY_SORTS:
+        return jsonify({'error': f'sort must be one of {", ".join(SUMMARY_SORTS)}'}), 400
+    
+    return jsonify({
+        'threshold_ms': current_app.config['SLOW_QUERY_THRESHOLD_MS'],
+        'queries': slow_query_summary(current_app.config['SLOW_QUERY_LOG'], limit, sort,
+                                      current_app.config['SLOW_QUERY_SUMMARY_MAX_BYTES'])
+    })
+
 @admin_bp.route('/all-staff')
 def get_all_staff():
     if session.get('role') != 'admin':
@@ -259,59 +288,70 @@ def get_all_patients():
     if session.get('role') != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    patients = Patient.query.all()
+    query = filter_list_query(
+        Patient.query, request.args,
+        department=Patient.department,
+        date_column=Patient.created_at,
+        gender=Patient.gender,
+        age=Patient.age
+    )
+    patients, next_cursor = keyset_page(query, request.args, {
+        'id': (Patient.id,),
+        'name': (Patient.name, Patient.id),
+        'age': (Patient.age, Patient.id),
+        'created_at': (Patient.created_at, Patient.id)
+    }, default_sort='id')
     
-    return jsonify([{
-        'id': patient.id,
-        'name': patient.name,
-        'age': patient.age,
-        'gender': patient.gender,
-        'phone': patient.phone,
-        'department': patient.department,
-        'created_at': patient.created_at.isoformat()
-    } for patient in patients])
+    return page_response(PATIENT.many(patients), next_cursor)
 
 @admin_bp.route('/appointments')
 def get_all_appointments():
     if session.get('role') != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    appointments = db.session.query(Appointment, Patient, User)\
+    query = db.session.query(Appointment, Patient, User)\
         .join(Patient, Appointment.patient_id == Patient.id)\
-        .join(User, Appointment.doctor_id == User.id)\
-        .all()
+        .join(User, Appointment.doctor_id == User.id)
+    query = filter_list_query(
+        query, request.args,
+        department=User.department,
+        status=Appointment.status,
+        date_column=Appointment.date,
+        gender=Patient.gender,
+        age=Patient.age
+    )
+    appointments, next_cursor = keyset_page(query, request.args, {
+        'id': (Appointment.id,),
+        'date': (Appointment.date, Appointment.time, Appointment.id),
+        'created_at': (Appointment.created_at, Appointment.id)
+    }, default_sort='id')
     
-    return jsonify([{
-        'id': apt.Appointment.id,
-        'patient_name': apt.Patient.name,
-        'doctor_name': apt.User.name,
-        'department': apt.User.department,
-        'date': apt.Appointment.date.isoformat(),
-        'time': apt.Appointment.time.isoformat(),
-        'status': apt.Appointment.status
-    } for apt in appointments])
+    return page_response(APPOINTMENT_LIST.many(appointments), next_cursor)
 
 @admin_bp.route('/billing-overview')
 def billing_overview():
     if session.get('role') != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    billing_records = db.session.query(Billing, Patient, User)\
+    query = db.session.query(Billing, Patient, User)\
         .join(Patient, Billing.patient_id == Patient.id)\
         .join(Consultation, Billing.consultation_id == Consultation.id)\
-        .join(User, Consultation.doctor_id == User.id)\
-        .all()
+        .join(User, Consultation.doctor_id == User.id)
+    query = filter_list_query(
+        query, request.args,
+        department=User.department,
+        status=Billing.status,
+        date_column=Billing.created_at,
+        gender=Patient.gender,
+        age=Patient.age
+    )
+    billing_records, next_cursor = keyset_page(query, request.args, {
+        'id': (Billing.id,),
+        'created_at': (Billing.created_at, Billing.id),
+        'amount': (Billing.amount, Billing.id)
+    }, default_sort='id')
     
-    return jsonify([{
-        'id': record.Billing.id,
-        'patient_name': record.Patient.name,
-        'doctor_name': record.User.name,
-        'department': record.User.department,
-        'amount': float(record.Billing.amount),
-        'status': record.Billing.status,
-        'payment_method': record.Billing.payment_method,
-        'created_at': record.Billing.created_at.isoformat()
-    } for record in billing_records])
+    return page_response(BILLING_LIST.many(billing_records), next_cursor)
 
 
 
@@ -328,27 +368,9 @@ def delete_user(user_id):
         if user.role == 'admin':
             return jsonify({'error': 'Cannot delete admin user'}), 400
 
-        # Check for related records that would prevent deletion
-        # Delete related appointments
-        Appointment.query.filter_by(doctor_id=user_id).delete()
-
-        # Delete related consultations and their billing
-        consultations = Consultation.query.filter_by(doctor_id=user_id).all()
-        for consultation in consultations:
-            # Delete billing records for this consultation
-            Billing.query.filter_by(consultation_id=consultation.id).delete()
-            # Delete the consultation itself
-            db.session.delete(consultation)
-
-        # Delete related vital signs records
-        VitalSigns.query.filter_by(recorded_by=user_id).delete()
-
-        # Delete related queue entries
-        Queue.query.filter_by(doctor_id=user_id).delete()
-
-        # Finally delete the user
-        db.session.delete(user)
-        db.session.commit()
+        # History goes in committed batches, then the user; the database
+        # cascades the rest
+        purge_user(user_id)
 
         return jsonify({'success': True, 'message': 'User deleted successfully'})
     except Exception as e:
@@ -363,6 +385,10 @@ def update_user(user_id):
     user = User.query.get_or_404(user_id)
     data = request.json
     
+    # Move the doctor's activity to the new department in the daily statistics
+    if user.role == 'doctor' and (data.get('department') or '') != (user.department or ''):
+        move_daily_stats(user.id, data.get('department'))
+
     user.name = data['name']
     user.email = data['email']
     user.department = data.get('department')
@@ -385,6 +411,12 @@ def update_patient(patient_id):
     patient = Patient.query.get_or_404(patient_id)
     data = request.json
     
+    # Move the registration to the new department in the daily statistics
+    if data['department'] != patient.department:
+        registered = patient.created_at.date()
+        record_daily_stats(registered, patient.department, registrations=-1)
+        record_daily_stats(registered, data['department'], registrations=1)
+    
     patient.name = data['name']
     patient.age = data['age']
     patient.gender = data['gender']
@@ -401,11 +433,12 @@ def delete_consultation(consultation_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     consultation = Consultation.query.get_or_404(consultation_id)
+    retract_daily_stats(consultation_id=consultation_id)
     
-    # Delete related billing records first
-    Billing.query.filter_by(consultation_id=consultation_id).delete()
-    
+    # Billing records go with it (ON DELETE CASCADE)
     db.session.delete(consultation)
+    db.session.flush()
+    refresh_panel(consultation.doctor_id, consultation.patient_id)
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Consultation deleted successfully'})
@@ -415,21 +448,11 @@ def delete_patient(patient_id):
     if session.get('role') != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    patient = Patient.query.get_or_404(patient_id)
+    Patient.query.get_or_404(patient_id)
     
-    # Delete related records first
-    VitalSigns.query.filter_by(patient_id=patient_id).delete()
-    Appointment.query.filter_by(patient_id=patient_id).delete()
-    Queue.query.filter_by(patient_id=patient_id).delete()
-    
-    # Delete consultations and billing
-    consultations = Consultation.query.filter_by(patient_id=patient_id).all()
-    for consultation in consultations:
-        Billing.query.filter_by(consultation_id=consultation.id).delete()
-    Consultation.query.filter_by(patient_id=patient_id).delete()
-    
-    db.session.delete(patient)
-    db.session.commit()
+    # Vitals, appointments, queue entries, panel rows, consultations and
+    # their billing go with the patient (ON DELETE CASCADE)
+    purge_patient(patient_id)
     
     return jsonify({'success': True, 'message': 'Patient deleted successfully'})
 
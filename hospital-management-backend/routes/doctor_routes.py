@@ -1,6 +1,13 @@
-from flask import Blueprint, request, jsonify, session
-from models import Patient, Appointment, Consultation, Billing, Queue, User
+from flask import Blueprint, request, jsonify, session, current_app
+from models import Patient, Appointment, Consultation, Billing, Queue, User, DoctorPatient, DailyStats
 from extensions import db
+from date_ranges import parse_date_range
+from pagination import filter_list_query, keyset_page, page_response
+from exam_fields import exam_filter, exam_text, normalize_exam
+from consultation_search import match_consultations
+from rollups import record_panel_visit, record_daily_stats
+from queue_events import publish, event_stream
+from sqlalchemy.orm import joinedload, lazyload
 from datetime import datetime, date, timedelta
 import json
 
@@ -15,17 +22,8 @@ def dashboard():
     if not doctor_id:
         return jsonify({'error': 'No user session'}), 403
     
-    # Get date parameters
-    start_date = request.args.get('startDate')
-    end_date = request.args.get('endDate')
-    
-    # Default to today if no dates provided
-    if not start_date or not end_date:
-        today = date.today()
-        start_date = end_date = today
-    else:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    # Get date parameters (default to today)
+    start_date, end_date = parse_date_range(request.args)
     
     try:
         # Get doctor info
@@ -47,37 +45,35 @@ def dashboard():
         total_patients = Patient.query.filter_by(department=doctor.department).count()
         
         # Get completed consultations in date range
-        completed_consultations = Consultation.query.filter(
-            Consultation.doctor_id == doctor_id,
-            db.func.date(Consultation.created_at) >= start_date,
-            db.func.date(Consultation.created_at) <= end_date
-        ).count()
+        completed_consultations = db.session.query(
+            db.func.sum(DailyStats.consultations)
+        ).filter(
+            DailyStats.doctor_id == doctor_id,
+            DailyStats.day >= start_date,
+            DailyStats.day <= end_date
+        ).scalar() or 0
         
-        # Get consultation data with real-time statistics (last 7 days from end_date)
-        consultation_data = []
+        # Get consultation data with real-time statistics (last 7 days from today)
+        # Completed consultations plus scheduled appointments per day, read
+        # from the daily_stats rollup in one query
         today = date.today()
+        week_start = today - timedelta(days=6)
         
+        daily_activity = dict(db.session.query(
+            DailyStats.day,
+            db.func.sum(DailyStats.consultations + DailyStats.appointments)
+        ).filter(
+            DailyStats.doctor_id == doctor_id,
+            DailyStats.day >= week_start,
+            DailyStats.day <= today
+        ).group_by(DailyStats.day).all())
+        
+        consultation_data = []
         for i in range(7):
-            chart_date = today - timedelta(days=6-i)
-            
-            # Count completed consultations for this specific date
-            consultations = Consultation.query.filter(
-                Consultation.doctor_id == doctor_id,
-                db.func.date(Consultation.created_at) == chart_date
-            ).count()
-            
-            # Count appointments scheduled for this date
-            appointments = Appointment.query.filter(
-                Appointment.doctor_id == doctor_id,
-                Appointment.date == chart_date
-            ).count()
-            
-            # Total doctor activity for the day
-            total_activity = consultations + appointments
-            
+            chart_date = week_start + timedelta(days=i)
             consultation_data.append({
                 'day': chart_date.strftime('%a'),
-                'consultations': total_activity
+                'consultations': int(daily_activity.get(chart_date) or 0)
             })
         
         return jsonify({
@@ -88,8 +84,8 @@ def dashboard():
             'consultationData': consultation_data,
             'department': doctor.department
         })
-    except Exception as e:
-        print(f"Dashboard error: {str(e)}")
+    except Exception:
+        current_app.logger.exception("Dashboard error for doctor %s", doctor_id)
         return jsonify({
             'todayAppointments': 0,
             'totalPatients': 0,
@@ -99,17 +95,39 @@ def dashboard():
             'department': 'general'
         }), 200
 
-@doctor_bp.route('/start-consultation/<int:queue_id>', methods=['POST'])
-def start_consultation(queue_id):
-    if session.get('role') != 'doctor':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
-    queue_entry = Queue.query.get_or_404(queue_id)
-    queue_entry.status = 'in_progress'
-    db.session.commit()
-    
+def next_in_line(doctor_id):
+    # A doctor's queue, highest priority and longest waiting first
+    return Queue.query.filter_by(doctor_id=doctor_id)\
+        .order_by(Queue.priority.desc(), Queue.created_at)
+
+def first_waiting(query):
+    # The first waiting entry matched by `query`, locked. Lock the queue row
+    # only: the eager-loaded patient and doctor rows stay out of the FOR UPDATE
+    return query.filter(Queue.status == 'waiting').options(lazyload('*'))\
+        .with_for_update(skip_locked=True, of=Queue).limit(1)
+
+def _claim_queue_entry(query):
+    # Flip the first waiting entry matched by `query` to in_progress.
+    # Postgres: FOR UPDATE SKIP LOCKED makes concurrent callers take
+    # different rows instead of queueing behind each other. The conditional
+    # UPDATE is what guarantees a single winner where row locks do not exist
+    # (SQLite); a caller that loses the race looks again.
+    for _ in range(5):
+        entry = first_waiting(query).first()
+        if entry is None:
+            return None
+        claimed = Queue.query.filter_by(id=entry.id, status='waiting')\
+            .update({'status': 'in_progress'}, synchronize_session='evaluate')
+        if claimed:
+            publish('started', entry.doctor_id, entry.patient_id, [entry.id])
+            return entry
+        db.session.rollback()
+    return None
+
+def _consultation_started(queue_entry):
     return jsonify({
         'success': True,
+        'queue_id': queue_entry.id,
         'patient': {
             'id': queue_entry.patient.id,
             'name': queue_entry.patient.name,
@@ -119,6 +137,36 @@ def start_consultation(queue_id):
         }
     })
 
+@doctor_bp.route('/start-consultation/<int:queue_id>', methods=['POST'])
+def start_consultation(queue_id):
+    if session.get('role') != 'doctor':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    queue_entry = _claim_queue_entry(Queue.query.filter_by(
+        id=queue_id,
+        doctor_id=session['user_id']
+    ))
+    if queue_entry is None:
+        if not Queue.query.filter_by(id=queue_id, doctor_id=session['user_id']).count():
+            return jsonify({'error': 'Queue entry not found'}), 404
+        return jsonify({'error': 'Patient is no longer waiting'}), 409
+    db.session.commit()
+    
+    return _consultation_started(queue_entry)
+
+@doctor_bp.route('/call-next', methods=['POST'])
+def call_next():
+    # Start a consultation with the highest-priority, longest-waiting patient
+    if session.get('role') != 'doctor':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    queue_entry = _claim_queue_entry(next_in_line(session['user_id']))
+    if queue_entry is None:
+        return jsonify({'error': 'No patients waiting'}), 404
+    db.session.commit()
+    
+    return _consultation_started(queue_entry)
+
 @doctor_bp.route('/save-consultation', methods=['POST'])
 def save_consultation():
     if session.get('role') != 'doctor':
@@ -136,12 +184,16 @@ def save_consultation():
             symptoms=data.get('symptoms', ''),
             diagnosis=data.get('diagnosis', ''),
             prescription=data.get('prescription', ''),
-            tests=data.get('exam_data', ''),  # Store exam data in tests field
+            tests=normalize_exam(data.get('exam_data')),  # Store exam data in tests field
             notes=data.get('notes', '')
         )
         db.session.add(consultation)
         db.session.flush()
         
+        record_panel_visit(doctor_id, patient_id, consultations=1, visited_at=consultation.created_at)
+        doctor = User.query.get(doctor_id)
+        record_daily_stats(consultation.created_at.date(), doctor.department, doctor_id, consultations=1)
+        
         # Create billing record
         if data.get('amount'):
             billing = Billing(
@@ -154,10 +206,14 @@ def save_consultation():
             db.session.add(billing)
         
         # Delete ALL queue entries for this patient with this doctor
-        Queue.query.filter_by(
+        queue_entries = Queue.query.filter_by(
             patient_id=patient_id,
             doctor_id=doctor_id
-        ).delete()
+        )
+        queue_ids = [q.id for q in queue_entries.with_entities(Queue.id)]
+        queue_entries.delete()
+        if queue_ids:
+            publish('completed', doctor_id, patient_id, queue_ids)
         
         # Mark appointments as completed
         Appointment.query.filter_by(
@@ -206,7 +262,7 @@ def patient_history(patient_id):
             'symptoms': record.Consultation.symptoms,
             'diagnosis': record.Consultation.diagnosis,
             'prescription': record.Consultation.prescription,
-            'tests': record.Consultation.tests,
+            'tests': exam_text(record.Consultation.tests),
             'notes': record.Consultation.notes,
             'amount': float(record.Billing.amount) if record.Billing else 0,
             'doctor_name': record.Consultation.doctor.name,
@@ -215,6 +271,83 @@ def patient_history(patient_id):
         } for record in consultations]
     })
 
+@doctor_bp.route('/exam-search')
+def exam_search():
+    if session.get('role') not in ['doctor', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    # Consultations whose exam matches every ?exam= condition, e.g.
+    # ?department=eye&exam=od_pressure>21|os_pressure>21 (see exam_fields.py)
+    conditions = request.args.getlist('exam')
+    if not conditions:
+        return jsonify({'error': 'Give at least one exam condition, e.g. exam=od_pressure>21'}), 400
+    
+    query = db.session.query(Consultation, Patient)\
+        .join(Patient, Consultation.patient_id == Patient.id)\
+        .filter(exam_filter(conditions))
+    query = filter_list_query(
+        query, request.args,
+        department=Patient.department,
+        date_column=Consultation.created_at
+    )
+    records, next_cursor = keyset_page(query, request.args, {
+        'created_at': (Consultation.created_at, Consultation.id)
+    }, default_sort='-created_at')
+    
+    return page_response([{
+        'id': record.Consultation.id,
+        'patient_id': record.Patient.id,
+        'patient_name': record.Patient.name,
+        'department': record.Patient.department,
+        'doctor_id': record.Consultation.doctor_id,
+        'diagnosis': record.Consultation.diagnosis,
+        'exam': record.Consultation.tests,
+        'created_at': record.Consultation.created_at.isoformat()
+    } for record in records], next_cursor)
+
+@doctor_bp.route('/consultation-search')
+def consultation_search():
+    if session.get('role') not in ['doctor', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    # Past cases by symptom, diagnosis, drug or note text, best match first
+    # (?sort=-created_at for newest first). Doctors search their own
+    # department; admins all of them, or one with ?department=
+    query = db.session.query(Consultation, Patient.name.label('patient_name'),
+                             User.name.label('doctor_name'), User.department)\
+        .join(Patient, Consultation.patient_id == Patient.id)\
+        .join(User, Consultation.doctor_id == User.id)
+    query, rank = match_consultations(query, request.args.get('q', ''))
+    if query is None:
+        return jsonify({'error': 'Give a search term with ?q='}), 400
+    
+    if session['role'] == 'doctor':
+        query = query.filter(User.department == session.get('department'))
+    query = filter_list_query(
+        query, request.args,
+        department=User.department,
+        date_column=Consultation.created_at
+    )
+    records, next_cursor = keyset_page(query.add_columns(rank.label('rank')), request.args, {
+        'rank': (rank, Consultation.id),
+        'created_at': (Consultation.created_at, Consultation.id)
+    }, default_sort='-rank')
+    
+    return page_response([{
+        'id': record.Consultation.id,
+        'patient_id': record.Consultation.patient_id,
+        'patient_name': record.patient_name,
+        'doctor_id': record.Consultation.doctor_id,
+        'doctor_name': record.doctor_name,
+        'department': record.department,
+        'symptoms': record.Consultation.symptoms,
+        'diagnosis': record.Consultation.diagnosis,
+        'prescription': record.Consultation.prescription,
+        'notes': record.Consultation.notes,
+        'rank': float(record.rank),
+        'created_at': record.Consultation.created_at.isoformat()
+    } for record in records], next_cursor)
+
 @doctor_bp.route('/my-patients')
 def my_patients():
     if session.get('role') != 'doctor':
@@ -222,42 +355,21 @@ def my_patients():
     
     doctor_id = session['user_id']
     
-    # Get all patients who have had consultations, appointments, or queue entries with this doctor
-    patient_ids = set()
-    
-    # From consultations
-    consultation_patients = db.session.query(Consultation.patient_id).filter_by(doctor_id=doctor_id).distinct().all()
-    patient_ids.update([p[0] for p in consultation_patients])
-    
-    # From appointments
-    appointment_patients = db.session.query(Appointment.patient_id).filter_by(doctor_id=doctor_id).distinct().all()
-    patient_ids.update([p[0] for p in appointment_patients])
+    # Panel rows are maintained by the consultation, appointment and queue
+    # write paths, so this is a single range read on (doctor_id, patient_id)
+    panel = db.session.query(DoctorPatient, Patient)\
+        .join(Patient, DoctorPatient.patient_id == Patient.id)\
+        .filter(DoctorPatient.doctor_id == doctor_id)\
+        .order_by(DoctorPatient.patient_id).all()
     
-    # From queue
-    queue_patients = db.session.query(Queue.patient_id).filter_by(doctor_id=doctor_id).distinct().all()
-    patient_ids.update([p[0] for p in queue_patients])
-    
-    # Get patient details
-    patients = Patient.query.filter(Patient.id.in_(patient_ids)).all() if patient_ids else []
-    
-    result = []
-    for p in patients:
-        # Get last consultation for this patient with this doctor
-        last_consultation = Consultation.query.filter_by(
-            patient_id=p.id,
-            doctor_id=doctor_id
-        ).order_by(Consultation.created_at.desc()).first()
-        
-        result.append({
-            'id': p.id,
-            'name': p.name,
-            'age': p.age,
-            'gender': p.gender,
-            'phone': p.phone,
-            'last_visit': last_consultation.created_at.isoformat() if last_consultation else None
-        })
-    
-    return jsonify(result)
+    return jsonify([{
+        'id': p.id,
+        'name': p.name,
+        'age': p.age,
+        'gender': p.gender,
+        'phone': p.phone,
+        'last_visit': entry.last_visit.isoformat() if entry.last_visit else None
+    } for entry, p in panel])
 
 @doctor_bp.route('/queue')
 def get_queue():
@@ -265,35 +377,57 @@ def get_queue():
         return jsonify({'error': 'Unauthorized'}), 403
     
     doctor_id = session['user_id']
-    queue = Queue.query.filter_by(
+    queue = Queue.query.options(joinedload(Queue.patient)).filter_by(
         doctor_id=doctor_id
-    ).order_by(Queue.created_at.asc()).all()
+    ).order_by(Queue.priority.desc(), Queue.created_at.asc()).all()
     
     return jsonify([{
         'id': q.id,
         'patient_id': q.patient_id,
         'patient_name': q.patient.name,
-        'status': q.status or 'waiting'
+        'status': q.status or 'waiting',
+        'priority': q.priority
     } for q in queue])
 
+@doctor_bp.route('/queue/stream')
+def queue_stream():
+    # Server-sent events for changes to this doctor's queue; clients refetch
+    # /queue (or patch it from the event) instead of polling
+    if session.get('role') != 'doctor':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    return event_stream(doctor_id=session['user_id'])
+
 @doctor_bp.route('/appointments')
 def get_appointments():
     if session.get('role') != 'doctor':
         return jsonify({'error': 'Unauthorized'}), 403
     
     doctor_id = session['user_id']
-    appointments = Appointment.query.filter_by(
-        doctor_id=doctor_id
-    ).all()
-    
-    return jsonify([{
-        'id': a.id,
-        'patient_id': a.patient_id,
-        'patient_name': a.patient.name,
-        'appointment_date': a.date.isoformat(),
-        'appointment_time': a.time.isoformat(),
-        'status': a.status
-    } for a in appointments])
+    query = db.session.query(Appointment, Patient)\
+        .join(Patient, Appointment.patient_id == Patient.id)\
+        .filter(Appointment.doctor_id == doctor_id)
+    query = filter_list_query(
+        query, request.args,
+        department=Patient.department,
+        status=Appointment.status,
+        date_column=Appointment.date,
+        gender=Patient.gender,
+        age=Patient.age
+    )
+    appointments, next_cursor = keyset_page(query, request.args, {
+        'id': (Appointment.id,),
+        'date': (Appointment.date, Appointment.time, Appointment.id)
+    }, default_sort='id')
+    
+    return page_response([{
+        'id': a.Appointment.id,
+        'patient_id': a.Appointment.patient_id,
+        'patient_name': a.Patient.name,
+        'appointment_date': a.Appointment.date.isoformat(),
+        'appointment_time': a.Appointment.time.isoformat(),
+        'status': a.Appointment.status
+    } for a in appointments], next_cursor)
 
 @doctor_bp.route('/patient-details/<int:patient_id>')
 def get_patient_details(patient_id):
@@ -327,7 +461,8 @@ def update_consultation(consultation_id):
     consultation.symptoms = data.get('symptoms', consultation.symptoms)
     consultation.diagnosis = data.get('diagnosis', consultation.diagnosis)
     consultation.prescription = data.get('prescription', consultation.prescription)
-    consultation.tests = data.get('exam_data', consultation.tests)
+    if 'exam_data' in data:
+        consultation.tests = normalize_exam(data['exam_data'])
     consultation.notes = data.get('notes', consultation.notes)
     
     db.session.commit()
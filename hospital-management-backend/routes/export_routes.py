@@ -0,0 +1,192 @@
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context, current_app
+from models import Patient, Appointment, Consultation, Billing, User, VitalSigns
+from extensions import db
+from pagination import filter_list_query
+from datetime import datetime, date, time
+import csv
+import io
+import json
+
+export_bp = Blueprint('export', __name__)
+
+# Formats a client can ask for with ?format=
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+def _export_value(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def _stream_export(query, name):
+    # Rows are read through a server-side cursor (yield_per streams results
+    # on Postgres) and written out one batch at a time, so worker memory
+    # stays flat whatever the export size.
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        return jsonify({'error': 'format must be one of: ' + ', '.join(FORMATS)}), 400
+
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+    columns = [column['name'] for column in query.column_descriptions]
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(columns)
+
+        for count, row in enumerate(query.yield_per(batch_size), 1):
+            values = [_export_value(value) for value in row]
+            if writer:
+                # JSON columns (consultation exams) go into one CSV cell as JSON
+                writer.writerow([json.dumps(value) if isinstance(value, (dict, list)) else value
+                                 for value in values])
+            else:
+                buffer.write(json.dumps(dict(zip(columns, values))))
+                buffer.write('\n')
+
+            if count % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue()
+
+    filename = f'{name}-{date.today().isoformat()}.{fmt}'
+    return Response(stream_with_context(generate()), mimetype=FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        # Let nginx pass chunks straight through instead of buffering them
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@export_bp.route('/billing')
+def export_billing():
+    if session.get('role') not in ['admin', 'receptionist']:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    query = db.session.query(
+        Billing.id,
+        Billing.consultation_id,
+        Billing.patient_id,
+        Patient.name.label('patient_name'),
+        User.name.label('doctor_name'),
+        User.department,
+        Billing.amount,
+        Billing.status,
+        Billing.payment_method,
+        Billing.created_at
+    ).join(Patient, Billing.patient_id == Patient.id)\
+        .join(Consultation, Billing.consultation_id == Consultation.id)\
+        .join(User, Consultation.doctor_id == User.id)
+    query = filter_list_query(
+        query, request.args,
+        department=User.department,
+        status=Billing.status,
+        date_column=Billing.created_at
+    )
+
+    return _stream_export(query.order_by(Billing.id), 'billing')
+
+
+@export_bp.route('/consultations')
+def export_consultations():
+    if session.get('role') not in ['admin', 'doctor']:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    query = db.session.query(
+        Consultation.id,
+        Consultation.patient_id,
+        Patient.name.label('patient_name'),
+        Consultation.doctor_id,
+        User.name.label('doctor_name'),
+        User.department,
+        Consultation.symptoms,
+        Consultation.diagnosis,
+        Consultation.prescription,
+        Consultation.tests,
+        Consultation.notes,
+        Consultation.created_at
+    ).join(Patient, Consultation.patient_id == Patient.id)\
+        .join(User, Consultation.doctor_id == User.id)
+
+    # Doctors export their own consultations only
+    if session['role'] == 'doctor':
+        query = query.filter(Consultation.doctor_id == session.get('user_id'))
+
+    query = filter_list_query(
+        query, request.args,
+        department=User.department,
+        date_column=Consultation.created_at
+    )
+
+    return _stream_export(query.order_by(Consultation.id), 'consultations')
+
+
+@export_bp.route('/appointments')
+def export_appointments():
+    if session.get('role') not in ['admin', 'receptionist', 'doctor']:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    query = db.session.query(
+        Appointment.id,
+        Appointment.patient_id,
+        Patient.name.label('patient_name'),
+        Appointment.doctor_id,
+        User.name.label('doctor_name'),
+        User.department,
+        Appointment.date,
+        Appointment.time,
+        Appointment.status,
+        Appointment.created_at
+    ).join(Patient, Appointment.patient_id == Patient.id)\
+        .join(User, Appointment.doctor_id == User.id)
+
+    if session['role'] == 'doctor':
+        query = query.filter(Appointment.doctor_id == session.get('user_id'))
+
+    query = filter_list_query(
+        query, request.args,
+        department=User.department,
+        status=Appointment.status,
+        date_column=Appointment.date
+    )
+
+    return _stream_export(query.order_by(Appointment.id), 'appointments')
+
+
+@export_bp.route('/vitals')
+def export_vitals():
+    if session.get('role') not in ['admin', 'receptionist', 'doctor']:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    query = db.session.query(
+        VitalSigns.id,
+        VitalSigns.patient_id,
+        Patient.name.label('patient_name'),
+        VitalSigns.blood_pressure,
+        VitalSigns.systolic,
+        VitalSigns.diastolic,
+        VitalSigns.heart_rate,
+        VitalSigns.temperature,
+        VitalSigns.weight,
+        VitalSigns.height,
+        VitalSigns.oxygen_saturation,
+        VitalSigns.recorded_by,
+        VitalSigns.created_at
+    ).join(Patient, VitalSigns.patient_id == Patient.id)
+
+    if request.args.get('patient_id'):
+        query = query.filter(VitalSigns.patient_id == request.args.get('patient_id', type=int))
+
+    query = filter_list_query(
+        query, request.args,
+        department=Patient.department,
+        date_column=VitalSigns.created_at
+    )
+
+    return _stream_export(query.order_by(VitalSigns.id), 'vitals')
@@ -1,55 +1,48 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, abort, make_response, current_app
 from models import Patient, Appointment, Billing, Queue, User
 from extensions import db
+from rollups import record_panel_visit, refresh_panel, record_daily_stats
+from date_ranges import parse_date_range, within_days
+from pagination import filter_list_query, keyset_page, page_response
+from queue_events import publish, event_stream
+from patient_search import search_patients
+from serializers import APPOINTMENT, BILLING, PATIENT, Schema
+from sqlalchemy.orm import joinedload
 from datetime import datetime, date
 
 receptionist_bp = Blueprint('receptionist', __name__)
 
+# List rows as this blueprint returns them
+PATIENT_LIST = PATIENT.prefixed('Patient').extend(last_session='last_session')
+BILLING_LIST = BILLING.prefixed('Billing').extend(patient_name='Patient.name', doctor_name='User.name')
+APPOINTMENT_LIST = Schema(
+    id='Appointment.id', patient_name='Patient.name', doctor_name='User.name',
+    department='Patient.department', appointment_date='Appointment.date',
+    appointment_time='Appointment.time', status='Appointment.status'
+)
+
 @receptionist_bp.route('/dashboard-summary')
 def dashboard_summary():
     if session.get('role') != 'receptionist':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    from datetime import timedelta
-    
-    # Get date parameters
-    start_date = request.args.get('startDate')
-    end_date = request.args.get('endDate')
-    
-    # Default to today if no dates provided
-    if not start_date or not end_date:
-        today = datetime.now().date()
-        start_date = end_date = today
-    else:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    # Get date parameters (default to today)
+    start_date, end_date = parse_date_range(request.args)
     
     # Get patients registered in date range
-    if start_date == end_date == date.today():
-        patients_registered = Patient.query.filter(
-            db.func.date(Patient.created_at) == date.today()
-        ).count()
-    else:
-        patients_registered = Patient.query.filter(
-            db.func.date(Patient.created_at) >= start_date,
-            db.func.date(Patient.created_at) <= end_date
-        ).count()
+    patients_registered = Patient.query.filter(
+        within_days(Patient.created_at, start_date, end_date)
+    ).count()
     
-    # Debug: also get total patients for comparison
-    total_patients = Patient.query.count()
-    print(f"Total patients in system: {total_patients}")
-    print(f"Patients registered for date range {start_date} to {end_date}: {patients_registered}")
+    current_app.logger.debug(
+        "Patients registered %s to %s: %s", start_date, end_date, patients_registered
+    )
     
     # Get appointments scheduled in date range
-    if start_date == end_date == date.today():
-        appointments_count = Appointment.query.filter(
-            Appointment.date == date.today()
-        ).count()
-    else:
-        appointments_count = Appointment.query.filter(
-            Appointment.date >= start_date,
-            Appointment.date <= end_date
-        ).count()
+    appointments_count = Appointment.query.filter(
+        Appointment.date >= start_date,
+        Appointment.date <= end_date
+    ).count()
     
     # Get current pending queue (all waiting patients regardless of date)
     pending_queue = Queue.query.filter_by(status='waiting').count()
@@ -61,7 +54,7 @@ def dashboard_summary():
         Billing.amount,
         Billing.status
     ).join(Patient, Billing.patient_id == Patient.id).filter(
-        db.func.date(Billing.created_at) == date.today()
+        within_days(Billing.created_at, date.today())
     ).order_by(
         Billing.created_at.desc()
     ).all()
@@ -87,7 +80,7 @@ def dashboard():
     if session.get('role') != 'receptionist':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    today_patients = Patient.query.filter(Patient.created_at >= datetime.now().date()).count()
+    today_patients = Patient.query.filter(within_days(Patient.created_at, date.today())).count()
     pending_bills = Billing.query.filter_by(status='pending').count()
     
     queue_length = Queue.query.filter_by(status='waiting').count()
@@ -114,10 +107,34 @@ def register_patient():
     )
     
     db.session.add(patient)
+    db.session.flush()
+    record_daily_stats(patient.created_at.date(), patient.department, registrations=1)
     db.session.commit()
     
     return jsonify({'success': True, 'patient_id': patient.id})
 
+def patients_named(name):
+    return Patient.query.filter_by(name=name)
+
+def _booking_parties(data):
+    # Booking endpoints take patient_id / doctor_id. Names are still accepted
+    # for older clients, but must identify exactly one person.
+    if data.get('patient_id'):
+        patient = Patient.query.get(data['patient_id'])
+    else:
+        patient = _only_match(patients_named(data.get('patientName')))
+    if data.get('doctor_id'):
+        doctor = User.query.filter_by(id=data['doctor_id'], role='doctor').first()
+    else:
+        doctor = _only_match(User.query.filter_by(name=data.get('doctorName'), role='doctor'))
+    return patient, doctor
+
+def _only_match(query):
+    matches = query.limit(2).all()
+    if len(matches) > 1:
+        abort(make_response(jsonify({'error': 'Name matches more than one record; pass an id instead'}), 400))
+    return matches[0] if matches else None
+
 @receptionist_bp.route('/create-appointment', methods=['POST'])
 def create_appointment():
     if session.get('role') != 'receptionist':
@@ -125,9 +142,7 @@ def create_appointment():
     
     data = request.json
     
-    # Find patient and doctor by name
-    patient = Patient.query.filter_by(name=data['patientName']).first()
-    doctor = User.query.filter_by(name=data['doctorName'], role='doctor').first()
+    patient, doctor = _booking_parties(data)
     
     if not patient or not doctor:
         return jsonify({'error': 'Patient or Doctor not found'}), 400
@@ -140,6 +155,8 @@ def create_appointment():
     )
     
     db.session.add(appointment)
+    record_panel_visit(doctor.id, patient.id, appointments=1)
+    record_daily_stats(appointment.date, doctor.department, doctor.id, appointments=1)
     db.session.commit()
     
     return jsonify({'success': True})
@@ -150,25 +167,18 @@ def get_patients():
         return jsonify({'error': 'Unauthorized'}), 403
     
     from models import Consultation
-    patients = Patient.query.all()
     
-    result = []
-    for p in patients:
-        last_consultation = Consultation.query.filter_by(patient_id=p.id)\
-            .order_by(Consultation.created_at.desc()).first()
-        
-        result.append({
-            'id': p.id,
-            'name': p.name,
-            'age': p.age,
-            'gender': p.gender,
-            'phone': p.phone,
-            'department': p.department,
-            'created_at': p.created_at.isoformat(),
-            'last_session': last_consultation.created_at.isoformat() if last_consultation else None
-        })
+    # Last consultation per patient in one grouped query instead of one per patient
+    last_sessions = db.session.query(
+        Consultation.patient_id,
+        db.func.max(Consultation.created_at).label('last_session')
+    ).group_by(Consultation.patient_id).subquery()
     
-    return jsonify(result)
+    patients = db.session.query(Patient, last_sessions.c.last_session)\
+        .outerjoin(last_sessions, last_sessions.c.patient_id == Patient.id)\
+        .order_by(Patient.id).all()
+    
+    return jsonify(PATIENT_LIST.many(patients))
 
 @receptionist_bp.route('/billing')
 def get_billing():
@@ -183,15 +193,7 @@ def get_billing():
             .join(User, Consultation.doctor_id == User.id)\
             .order_by(Billing.created_at.desc()).all()
         
-        return jsonify([{
-            'id': record.Billing.id,
-            'patient_name': record.Patient.name,
-            'doctor_name': record.User.name,
-            'amount': float(record.Billing.amount),
-            'status': record.Billing.status,
-            'payment_method': record.Billing.payment_method,
-            'created_at': record.Billing.created_at.isoformat()
-        } for record in bills])
+        return jsonify(BILLING_LIST.many(bills))
     except Exception as e:
         # Fallback to simple billing query if consultation join fails
         bills = Billing.query.order_by(Billing.created_at.desc()).all()
@@ -212,6 +214,9 @@ def mark_paid(bill_id):
     
     data = request.json
     bill = Billing.query.get_or_404(bill_id)
+    if bill.status != 'paid':
+        doctor = bill.consultation.doctor
+        record_daily_stats(bill.created_at.date(), doctor.department, doctor.id, revenue=bill.amount)
     bill.status = 'paid'
     bill.payment_method = data.get('payment_method', 'cash')
     
@@ -234,16 +239,24 @@ def get_appointments():
     if session.get('role') != 'receptionist':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    appointments = Appointment.query.all()
-    return jsonify([{
-        'id': a.id,
-        'patient_name': a.patient.name,
-        'doctor_name': a.doctor.name,
-        'department': a.patient.department,
-        'appointment_date': a.date.isoformat(),
-        'appointment_time': a.time.isoformat(),
-        'status': a.status
-    } for a in appointments])
+    query = db.session.query(Appointment, Patient, User)\
+        .join(Patient, Appointment.patient_id == Patient.id)\
+        .join(User, Appointment.doctor_id == User.id)
+    query = filter_list_query(
+        query, request.args,
+        department=Patient.department,
+        status=Appointment.status,
+        date_column=Appointment.date,
+        gender=Patient.gender,
+        age=Patient.age
+    )
+    appointments, next_cursor = keyset_page(query, request.args, {
+        'id': (Appointment.id,),
+        'date': (Appointment.date, Appointment.time, Appointment.id),
+        'created_at': (Appointment.created_at, Appointment.id)
+    }, default_sort='id')
+    
+    return page_response(APPOINTMENT_LIST.many(appointments), next_cursor)
 
 @receptionist_bp.route('/queue')
 def get_queue():
@@ -251,7 +264,8 @@ def get_queue():
         return jsonify({'error': 'Unauthorized'}), 403
     
     from models import Queue
-    queue = Queue.query.order_by(Queue.created_at).all()
+    queue = Queue.query.options(joinedload(Queue.patient), joinedload(Queue.doctor))\
+        .order_by(Queue.priority.desc(), Queue.created_at).all()
     result = []
     for q in queue:
         if q.patient and q.doctor:
@@ -260,10 +274,19 @@ def get_queue():
                 'patient_name': q.patient.name,
                 'doctor_name': q.doctor.name,
                 'department': q.doctor.department if q.doctor.department else q.patient.department,
-                'status': q.status
+                'status': q.status,
+                'priority': q.priority
             })
     return jsonify(result)
 
+@receptionist_bp.route('/queue/stream')
+def queue_stream():
+    # Server-sent events for every queue change, replacing /queue polling
+    if session.get('role') != 'receptionist':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    return event_stream()
+
 @receptionist_bp.route('/add-to-queue', methods=['POST'])
 def add_to_queue():
     if session.get('role') != 'receptionist':
@@ -272,32 +295,55 @@ def add_to_queue():
     data = request.json
     from models import Queue
     
-    # Find patient and doctor by name
-    patient = Patient.query.filter_by(name=data['patientName']).first()
-    doctor = User.query.filter_by(name=data['doctorName'], role='doctor').first()
+    patient, doctor = _booking_parties(data)
     
     if not patient or not doctor:
         return jsonify({'error': 'Patient or Doctor not found'}), 400
     
+    # Patients with an appointment today are seen ahead of walk-ins
+    has_appointment = Appointment.query.filter_by(
+        patient_id=patient.id,
+        doctor_id=doctor.id,
+        date=date.today(),
+        status='scheduled'
+    ).count() > 0
+    
     queue_entry = Queue(
         patient_id=patient.id,
         doctor_id=doctor.id,
-        priority=0,
+        priority=1 if has_appointment else 0,
         status='waiting'
     )
     
     db.session.add(queue_entry)
+    db.session.flush()
+    record_panel_visit(doctor.id, patient.id)
+    publish('added', doctor.id, patient.id, [queue_entry.id],
+            patient_name=patient.name, doctor_name=doctor.name)
     db.session.commit()
     
     return jsonify({'success': True})
 
-@receptionist_bp.route('/patient-names')
-def get_patient_names():
-    if session.get('role') != 'receptionist':
+@receptionist_bp.route('/patients/search')
+def search_patients_route():
+    # Typeahead: ranked prefix/fuzzy matches on name and phone
+    if session.get('role') not in ['receptionist', 'admin']:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    patients = Patient.query.all()
-    return jsonify([p.name for p in patients])
+    term = request.args.get('q', '')
+    if len(term.strip()) < 2:
+        return jsonify([])
+    
+    limit = request.args.get('limit', 10, type=int)
+    patients = search_patients(term, max(1, min(limit, 50)))
+    return jsonify([{
+        'id': p.id,
+        'name': p.name,
+        'phone': p.phone,
+        'age': p.age,
+        'gender': p.gender,
+        'department': p.department
+    } for p in patients])
 
 @receptionist_bp.route('/patient-details/<int:patient_id>')
 def get_patient_details(patient_id):
@@ -305,12 +351,15 @@ def get_patient_details(patient_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     from models import Consultation
-    patient = Patient.query.get_or_404(patient_id)
-    bills = Billing.query.filter_by(patient_id=patient_id).all()
     
-    # Get last consultation date
-    last_consultation = Consultation.query.filter_by(patient_id=patient_id)\
-        .order_by(Consultation.created_at.desc()).first()
+    # Patient and last consultation date in a single statement
+    last_session_query = db.session.query(db.func.max(Consultation.created_at))\
+        .filter(Consultation.patient_id == Patient.id)\
+        .correlate(Patient).scalar_subquery()
+    
+    patient, last_session = db.session.query(Patient, last_session_query)\
+        .filter(Patient.id == patient_id).first_or_404()
+    bills = Billing.query.filter_by(patient_id=patient_id).all()
     
     return jsonify({
         'id': patient.id,
@@ -320,7 +369,7 @@ def get_patient_details(patient_id):
         'phone': patient.phone,
         'address': patient.address,
         'department': patient.department,
-        'last_session': last_consultation.created_at.isoformat() if last_consultation else None,
+        'last_session': last_session.isoformat() if last_session else None,
         'bills': [{
             'amount': float(bill.amount),
             'status': bill.status,
@@ -342,21 +391,25 @@ def get_all_billing():
         return jsonify({'error': 'Unauthorized'}), 403
     
     from models import Consultation
-    bills = db.session.query(Billing, Patient, User)\
+    query = db.session.query(Billing, Patient, User)\
         .join(Patient, Billing.patient_id == Patient.id)\
         .join(Consultation, Billing.consultation_id == Consultation.id)\
-        .join(User, Consultation.doctor_id == User.id)\
-        .order_by(Billing.created_at.desc()).all()
+        .join(User, Consultation.doctor_id == User.id)
+    query = filter_list_query(
+        query, request.args,
+        department=Patient.department,
+        status=Billing.status,
+        date_column=Billing.created_at,
+        gender=Patient.gender,
+        age=Patient.age
+    )
+    bills, next_cursor = keyset_page(query, request.args, {
+        'id': (Billing.id,),
+        'created_at': (Billing.created_at, Billing.id),
+        'amount': (Billing.amount, Billing.id)
+    }, default_sort='-created_at')
     
-    return jsonify([{
-        'id': record.Billing.id,
-        'patient_name': record.Patient.name,
-        'doctor_name': record.User.name,
-        'amount': float(record.Billing.amount),
-        'status': record.Billing.status,
-        'payment_method': record.Billing.payment_method,
-        'created_at': record.Billing.created_at.isoformat()
-    } for record in bills])
+    return page_response(BILLING_LIST.many(bills), next_cursor)
 
 @receptionist_bp.route('/remove-from-queue/<int:queue_id>', methods=['DELETE'])
 def remove_from_queue(queue_id):
@@ -366,6 +419,9 @@ def remove_from_queue(queue_id):
     from models import Queue
     queue_entry = Queue.query.get_or_404(queue_id)
     db.session.delete(queue_entry)
+    db.session.flush()
+    refresh_panel(queue_entry.doctor_id, queue_entry.patient_id)
+    publish('removed', queue_entry.doctor_id, queue_entry.patient_id, [queue_entry.id])
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Patient removed from queue'})
@@ -376,7 +432,10 @@ def cancel_appointment(appointment_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     appointment = Appointment.query.get_or_404(appointment_id)
+    record_daily_stats(appointment.date, appointment.doctor.department, appointment.doctor_id, appointments=-1)
     db.session.delete(appointment)
+    db.session.flush()
+    refresh_panel(appointment.doctor_id, appointment.patient_id)
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Appointment cancelled'})
\ No newline at end of file
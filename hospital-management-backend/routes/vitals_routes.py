@@ -1,7 +1,11 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 from models import VitalSigns, Patient
 from extensions import db
-from datetime import datetime
+from pagination import filter_list_query, keyset_page, page_response
+from vital_trends import parse_blood_pressure, vitals_trend
+from vitals_ingest import ingest_readings
+from sqlalchemy.orm import joinedload
+from datetime import datetime, timedelta
 
 vitals_bp = Blueprint('vitals', __name__)
 
@@ -11,9 +15,12 @@ def record_vitals(patient_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     data = request.json
+    systolic, diastolic = parse_blood_pressure(data.get('blood_pressure'))
     vitals = VitalSigns(
         patient_id=patient_id,
         blood_pressure=data.get('blood_pressure'),
+        systolic=systolic,
+        diastolic=diastolic,
         heart_rate=data.get('heart_rate'),
         temperature=data.get('temperature'),
         weight=data.get('weight'),
@@ -27,16 +34,49 @@ def record_vitals(patient_id):
     
     return jsonify({'success': True})
 
+@vitals_bp.route('/batch', methods=['POST'])
+def record_vitals_batch():
+    # {"readings": [{"patient_id": 1, "heart_rate": 72, "recorded_at": ...}, ...]}
+    # from bedside monitors; see vitals_ingest.py. Invalid readings are
+    # reported per row and the rest are still stored.
+    if session.get('role') not in ['receptionist', 'doctor']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.get_json(silent=True)
+    readings = data.get('readings') if isinstance(data, dict) else None
+    if not isinstance(readings, list) or not readings:
+        return jsonify({'error': 'readings must be a non-empty list'}), 400
+    if len(readings) > current_app.config['VITALS_BATCH_MAX']:
+        return jsonify({'error': f"At most {current_app.config['VITALS_BATCH_MAX']} readings per request"}), 413
+    
+    results = ingest_readings(readings, session.get('user_id'))
+    accepted = sum(1 for result in results if 'id' in result)
+    
+    return jsonify({
+        'accepted': accepted,
+        'rejected': len(results) - accepted,
+        'results': results
+    })
+
 @vitals_bp.route('/patient/<int:patient_id>')
 def get_patient_vitals(patient_id):
     if session.get('role') not in ['receptionist', 'doctor', 'admin']:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    vitals = VitalSigns.query.filter_by(patient_id=patient_id).order_by(VitalSigns.created_at.desc()).all()
+    # Newest first, one page at a time (?from=&to= narrow it); charts
+    # over long stays use /trend instead
+    query = VitalSigns.query.options(joinedload(VitalSigns.recorder))\
+        .filter_by(patient_id=patient_id)
+    query = filter_list_query(query, request.args, date_column=VitalSigns.created_at)
+    vitals, next_cursor = keyset_page(query, request.args, {
+        'created_at': (VitalSigns.created_at, VitalSigns.id)
+    }, default_sort='-created_at')
     
-    return jsonify([{
+    return page_response([{
         'id': v.id,
         'blood_pressure': v.blood_pressure or 'N/A',
+        'systolic': v.systolic,
+        'diastolic': v.diastolic,
         'heart_rate': v.heart_rate,
         'temperature': v.temperature,
         'weight': v.weight,
@@ -44,14 +84,45 @@ def get_patient_vitals(patient_id):
         'oxygen_saturation': v.oxygen_saturation,
         'recorded_by': v.recorder.name if v.recorder else 'Unknown',
         'created_at': v.created_at.isoformat()
-    } for v in vitals])
+    } for v in vitals], next_cursor)
+
+@vitals_bp.route('/trend/<int:patient_id>')
+def get_vitals_trend(patient_id):
+    if session.get('role') not in ['receptionist', 'doctor', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    # ?start=&end= are ISO timestamps (UTC, end exclusive), defaulting to the
+    # last VITALS_TREND_DAYS days; ?points= is the most buckets to return
+    try:
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.utcnow()
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') \
+            else end - timedelta(days=current_app.config['VITALS_TREND_DAYS'])
+        points = int(request.args.get('points') or current_app.config['VITALS_TREND_POINTS'])
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO timestamps, points an integer'}), 400
+    if start.tzinfo or end.tzinfo:
+        return jsonify({'error': 'start and end must be UTC timestamps without an offset'}), 400
+    if start >= end:
+        return jsonify({'error': 'start must be before end'}), 400
+    points = max(1, min(points, current_app.config['VITALS_TREND_MAX_POINTS']))
+    
+    bucket_seconds, series = vitals_trend(patient_id, start, end, points)
+    
+    return jsonify({
+        'patient_id': patient_id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'bucket_seconds': bucket_seconds,
+        'points': series
+    })
 
 @vitals_bp.route('/latest/<int:patient_id>')
 def get_latest_vitals(patient_id):
     if session.get('role') not in ['receptionist', 'doctor', 'admin']:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    vitals = VitalSigns.query.filter_by(patient_id=patient_id).order_by(VitalSigns.created_at.desc()).first()
+    vitals = VitalSigns.query.options(joinedload(VitalSigns.recorder))\
+        .filter_by(patient_id=patient_id).order_by(VitalSigns.created_at.desc()).first()
     
     if not vitals:
         return jsonify({'vitals': None})
@@ -59,6 +130,8 @@ def get_latest_vitals(patient_id):
     return jsonify({
         'vitals': {
             'blood_pressure': vitals.blood_pressure,
+            'systolic': vitals.systolic,
+            'diastolic': vitals.diastolic,
             'heart_rate': vitals.heart_rate,
             'temperature': vitals.temperature,
             'weight': vitals.weight,
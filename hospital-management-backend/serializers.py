@@ -0,0 +1,103 @@
+import re
+from datetime import date, datetime, time
+from operator import attrgetter
+
+from flask.json.provider import DefaultJSONProvider
+
+# orjson is optional: with it responses are encoded by orjson, without it
+# by the standard library. Either way dates and times go out as ISO 8601, so
+# routes and schemas can hand over datetime objects as they come from the
+# database instead of calling .isoformat() on every row.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONProvider(DefaultJSONProvider):
+    # Standard library encoder; Flask's own default would send datetimes as
+    # HTTP dates
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (datetime, date, time)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+
+class ORJSONProvider(JSONProvider):
+    # Same output as JSONProvider, encoded by orjson straight to bytes.
+    # Datetimes, dates and times are native to orjson; anything it can't
+    # encode (Decimal, ...) falls back to JSONProvider.default.
+
+    def _option(self, indent=False, sort_keys=None):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        option = self._option(kwargs.get('indent'), kwargs.get('sort_keys'))
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default,
+                            option=self._option(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    if orjson is not None and app.config['FAST_JSON']:
+        app.json = ORJSONProvider(app)
+    else:
+        app.json = JSONProvider(app)
+
+
+_PATH = re.compile(r'^[A-Za-z_]\w*(\.[A-Za-z_]\w*)*$')
+
+
+class Schema:
+    # Output key -> attribute path on each row: 'name' on a model instance,
+    # 'Patient.name' on a row of several entities. All paths are read by one
+    # attrgetter, which fetches them in C, and zipped with the keys.
+    # Values are left as they are; the JSON provider encodes datetimes as
+    # ISO 8601.
+
+    def __init__(self, **fields):
+        for path in fields.values():
+            if not _PATH.match(path):
+                raise ValueError(f'Invalid attribute path {path!r}')
+        self.fields = fields
+        self.keys = tuple(fields)
+        get = attrgetter(*fields.values())
+        # attrgetter with a single path returns the value, not a 1-tuple
+        self._values = get if len(fields) > 1 else lambda row: (get(row),)
+
+    def serialize(self, row):
+        return dict(zip(self.keys, self._values(row)))
+
+    def extend(self, **fields):
+        return Schema(**{**self.fields, **fields})
+
+    def prefixed(self, entity):
+        # The same fields read from one entity of a multi-entity row
+        return Schema(**{key: f'{entity}.{path}' for key, path in self.fields.items()})
+
+    def many(self, rows):
+        keys, values = self.keys, self._values
+        return [dict(zip(keys, values(row))) for row in rows]
+
+
+# One schema per model with the fields its list endpoints return
+PATIENT = Schema(id='id', name='name', age='age', gender='gender', phone='phone',
+                 department='department', created_at='created_at')
+APPOINTMENT = Schema(id='id', date='date', time='time', status='status')
+BILLING = Schema(id='id', amount='amount', status='status', payment_method='payment_method',
+                 created_at='created_at')
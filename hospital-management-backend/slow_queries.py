@@ -0,0 +1,213 @@
+import glob
+import json
+import logging
+import os
+import random
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import current_app, has_app_context, has_request_context, request
+
+from sql_stats import on_statement_timed
+
+# Statements slower than SLOW_QUERY_THRESHOLD_MS are written as JSON lines
+# to SLOW_QUERY_LOG (rotated by size). On Postgres a sample of slow SELECTs
+# is re-run under EXPLAIN (ANALYZE, BUFFERS) and the plan logged with them.
+
+logger = logging.getLogger('slow_queries')
+logger.propagate = False
+
+# Non-transactional side effects that re-running a SELECT would repeat
+_EXPLAIN_SKIP = ('setval(', 'nextval(')
+
+SUMMARY_SORTS = ('total', 'max', 'count', 'avg')
+
+# (path, limit, sort, max_bytes) -> (log signature, summary)
+_summary_cache = {}
+
+
+def _json_value(value):
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = str(value)
+    return text if len(text) <= 200 else text[:200] + '...'
+
+
+def _json_params(parameters):
+    if isinstance(parameters, dict):
+        return {key: _json_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_json_value(value) for value in parameters]
+    return _json_value(parameters)
+
+
+def _explain(conn, statement, parameters):
+    # Runs inside the caller's transaction on a raw DBAPI cursor (so it is
+    # not itself timed), behind a savepoint that is always rolled back: the
+    # re-run leaves no trace, and a failing EXPLAIN can't abort the
+    # transaction.
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute('SAVEPOINT slow_query_explain')
+    except Exception as e:
+        # e.g. an autocommit connection, which has no transaction to nest in
+        cursor.close()
+        return {'error': str(e)}
+    try:
+        cursor.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + statement, parameters)
+        return cursor.fetchone()[0]
+    except Exception as e:
+        return {'error': str(e)}
+    finally:
+        cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+        cursor.close()
+
+
+def _should_explain(conn, statement, executemany, config):
+    if conn.dialect.name != 'postgresql' or executemany:
+        return False
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return False
+    if any(marker in statement for marker in _EXPLAIN_SKIP):
+        return False
+    return random.random() < config['SLOW_QUERY_EXPLAIN_SAMPLE']
+
+
+@on_statement_timed
+def _log_if_slow(conn, statement, parameters, executemany, elapsed):
+    elapsed_ms = elapsed * 1000
+    if not has_app_context() or not logger.handlers:
+        return
+    config = current_app.config
+    if elapsed_ms < config['SLOW_QUERY_THRESHOLD_MS']:
+        return
+
+    record = {
+        'time': datetime.utcnow().isoformat(),
+        'duration_ms': round(elapsed_ms, 3),
+        'statement': statement,
+        'params': _json_params(parameters) if config['SLOW_QUERY_LOG_PARAMS'] else None,
+        'executemany': executemany,
+        'endpoint': request.endpoint if has_request_context() else None,
+        'method': request.method if has_request_context() else None,
+        'path': request.path if has_request_context() else None,
+        'pid': os.getpid()
+    }
+    if _should_explain(conn, statement, executemany, config):
+        record['plan'] = _explain(conn, statement, parameters)
+    logger.warning(json.dumps(record, default=str))
+
+
+def init_slow_queries(app):
+    # A relative SLOW_QUERY_LOG is under the app's root, whatever directory
+    # the server was started from
+    path = app.config['SLOW_QUERY_LOG']
+    if path:
+        path = app.config['SLOW_QUERY_LOG'] = os.path.join(app.root_path, path)
+    if not path or app.config['SLOW_QUERY_THRESHOLD_MS'] <= 0 or logger.handlers:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=app.config['SLOW_QUERY_LOG_MAX_BYTES'],
+        backupCount=app.config['SLOW_QUERY_LOG_BACKUPS'],
+        delay=True
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+
+
+def _log_files(path):
+    # Current file first, then rotated ones newest to oldest (.1, .2, ...)
+    backups = [name for name in glob.glob(path + '.*') if name.rsplit('.', 1)[1].isdigit()]
+    return [path] + sorted(backups, key=lambda name: int(name.rsplit('.', 1)[1]))
+
+
+def _read_log(path, max_bytes):
+    # Records from the newest max_bytes of the log, oldest first: whole
+    # rotated files while they fit, then the tail of the next one
+    spans = []
+    for name in _log_files(path):
+        if max_bytes <= 0:
+            break
+        try:
+            size = os.path.getsize(name)
+        except FileNotFoundError:
+            continue
+        spans.append((name, max(0, size - max_bytes)))
+        max_bytes -= size
+
+    for name, offset in reversed(spans):
+        try:
+            with open(name, 'rb') as f:
+                f.seek(offset)
+                if offset:
+                    f.readline()  # partial line
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            continue
+
+
+def _log_signature(path):
+    # Changes whenever a record is appended or the log rotates
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def slow_query_summary(path, limit=20, sort='total', max_bytes=2 * 1024 * 1024):
+    # Slow statements in the newest max_bytes of the log grouped by SQL text
+    # (statements are parameterized, so one text is one query shape), worst
+    # first. The summary is cached until the log changes, so polling the
+    # admin page doesn't re-read the files.
+    key = (path, limit, sort, max_bytes)
+    signature = _log_signature(path)
+    cached = _summary_cache.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+    ranked = _summarize(_read_log(path, max_bytes), limit, sort)
+    _summary_cache[key] = (signature, ranked)
+    return ranked
+
+
+def _summarize(records, limit, sort):
+    groups = {}
+    for record in records:
+        group = groups.setdefault(record['statement'], {
+            'statement': record['statement'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'endpoints': set(),
+            'last_seen': None,
+            'slowest': None,
+            'plan': None
+        })
+        group['count'] += 1
+        group['total_ms'] += record['duration_ms']
+        if record['endpoint']:
+            group['endpoints'].add(record['endpoint'])
+        group['last_seen'] = record['time']
+        if record['duration_ms'] >= group['max_ms']:
+            group['max_ms'] = record['duration_ms']
+            group['slowest'] = {key: record[key] for key in ('time', 'params', 'endpoint', 'path')}
+        if record.get('plan') is not None:
+            group['plan'] = record['plan']
+
+    for group in groups.values():
+        group['avg_ms'] = group['total_ms'] / group['count']
+    key = {'total': 'total_ms', 'max': 'max_ms', 'count': 'count', 'avg': 'avg_ms'}[sort]
+    ranked = sorted(groups.values(), key=lambda group: group[key], reverse=True)[:limit]
+    for group in ranked:
+        group['total_ms'] = round(group['total_ms'], 3)
+        group['avg_ms'] = round(group['avg_ms'], 3)
+        group['endpoints'] = sorted(group['endpoints'])
+    return ranked
+
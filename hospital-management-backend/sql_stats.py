@@ -0,0 +1,89 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# count_queries() blocks active on the current thread
+_local = threading.local()
+
+# Functions called with (conn, statement, parameters, executemany, elapsed
+# seconds) after every statement, e.g. the slow-query log; one timer serves
+# them all
+_timed_listeners = []
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+        self.parameters = []
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.sql_count = g.get('sql_count', 0) + 1
+    for counter in getattr(_local, 'counters', ()):
+        counter.count += 1
+        counter.statements.append(statement)
+        counter.parameters.append(parameters)
+    conn.info.setdefault('sql_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _time_statement(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['sql_started'].pop()
+    if has_app_context():
+        g.sql_time = g.get('sql_time', 0.0) + elapsed
+    for listener in _timed_listeners:
+        listener(conn, statement, parameters, executemany, elapsed)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _drop_failed_statement(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('sql_started'):
+        context.connection.info['sql_started'].pop()
+
+
+def on_statement_timed(listener):
+    # Decorator registering a listener for every statement's duration
+    _timed_listeners.append(listener)
+    return listener
+
+
+@contextmanager
+def count_queries():
+    # Counts the SQL statements this thread runs inside the block, e.g.
+    #
+    #     with count_queries() as queries:
+    #         client.get('/api/doctor/queue')
+    #     assert queries.count <= 3, queries.statements
+    counter = QueryCounter()
+    counters = _local.__dict__.setdefault('counters', [])
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
+
+
+def request_sql_count():
+    # Statements run so far while handling the current request
+    return g.get('sql_count', 0)
+
+
+def request_sql_time():
+    # Seconds spent executing those statements
+    return g.get('sql_time', 0.0)
+
+
+def init_sql_stats(app):
+    @app.after_request
+    def add_sql_count_header(response):
+        if app.config['SQL_COUNT_HEADER']:
+            response.headers['X-SQL-Count'] = str(request_sql_count())
+        return response
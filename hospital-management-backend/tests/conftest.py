@@ -0,0 +1,74 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# config.py reads the environment when it is first imported: point it at a
+# scratch SQLite file (or TEST_DATABASE_URL, an empty Postgres database),
+# hash passwords inline and leave the slow-query log off
+_DB_DIR = tempfile.mkdtemp(prefix='hms-tests-')
+os.environ['DATABASE_URL'] = os.environ.get('TEST_DATABASE_URL') or \
+    'sqlite:///' + os.path.join(_DB_DIR, 'test.db')
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+os.environ['SLOW_QUERY_THRESHOLD_MS'] = '0'
+
+from flask_migrate import upgrade
+
+from app import create_app
+from extensions import db
+from models import User
+
+
+@pytest.fixture(scope='session')
+def app():
+    # Schema built the way production builds it, by running the migrations
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        upgrade(directory=os.path.join(BACKEND_DIR, 'migrations'))
+    yield app
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def database(app):
+    # Every test starts from empty tables
+    with app.app_context():
+        yield db
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+
+
+@pytest.fixture
+def users(database):
+    staff = {
+        'admin': User(name='Admin', email='admin@test', role='admin'),
+        'receptionist': User(name='Reception', email='reception@test', role='receptionist', department='reception'),
+        'doctor': User(name='Doctor', email='doctor@test', role='doctor', department='eye'),
+    }
+    for user in staff.values():
+        user.password_hash = 'unused'
+        database.session.add(user)
+    database.session.commit()
+    return staff
+
+
+@pytest.fixture
+def login(app, users):
+    # login('receptionist') -> test client with that user's session
+    def login(role):
+        user = users[role]
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user.id
+            session['role'] = user.role
+            session['department'] = user.department
+        return client
+    return login
@@ -0,0 +1,26 @@
+from datetime import date
+
+from models import DailyStats
+from rollups import record_daily_stats
+
+
+def test_department_change_moves_doctor_daily_stats(database, login, users):
+    doctor = users['doctor']
+    record_daily_stats(date(2026, 1, 5), 'eye', doctor.id, appointments=2, consultations=1, revenue=150)
+    record_daily_stats(date(2026, 1, 6), 'eye', doctor.id, consultations=3)
+    record_daily_stats(date(2026, 1, 5), 'eye', registrations=4)
+    database.session.commit()
+
+    response = login('admin').put(f'/api/admin/update-user/{doctor.id}', json={
+        'name': doctor.name, 'email': doctor.email, 'department': 'dental'
+    })
+
+    assert response.status_code == 200, response.get_json()
+    rows = {(row.day, row.department, row.doctor_id): (row.appointments, row.consultations, row.revenue)
+            for row in DailyStats.query.filter(DailyStats.doctor_id == doctor.id)}
+    assert rows == {
+        (date(2026, 1, 5), 'dental', doctor.id): (2, 1, 150),
+        (date(2026, 1, 6), 'dental', doctor.id): (0, 3, 0),
+    }
+    # Registrations are the patient's department, not the doctor's
+    assert database.session.get(DailyStats, (date(2026, 1, 5), 'eye', 0)).registrations == 4
@@ -0,0 +1,58 @@
+import pytest
+
+from models import Patient
+
+
+@pytest.mark.parametrize('query', ['age_band=65+', 'age_band=65%2B', 'age_band=65-', 'min_age=65'])
+def test_open_ended_age_band(database, login, query):
+    database.session.add_all(
+        Patient(name=f'Patient {age}', age=age, gender='male', phone='0700000000', department='eye')
+        for age in (30, 64, 65, 80)
+    )
+    database.session.commit()
+
+    response = login('admin').get('/api/admin/all-patients?' + query)
+
+    assert response.status_code == 200, response.get_json()
+    assert sorted(row['age'] for row in response.get_json()) == [65, 80]
+
+
+def test_created_at_pages_cover_every_row(database, login):
+    database.session.add_all(
+        Patient(name=f'Patient {n}', age=40, gender='male', phone='0700000000', department='eye')
+        for n in range(7)
+    )
+    database.session.commit()
+    client = login('admin')
+
+    seen, cursor = [], None
+    while True:
+        response = client.get('/api/admin/all-patients?sort=-created_at&limit=3'
+                              + (f'&cursor={cursor}' if cursor else ''))
+        seen += [row['id'] for row in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+
+    assert len(seen) == len(set(seen)) == 7
+
+
+def test_lists_are_whole_unless_paged(database, login, app):
+    # The frontend doesn't follow X-Next-Cursor, so a request without
+    # ?limit= or ?cursor= must get every row
+    app.config['PAGE_SIZE'] = 3
+    database.session.add_all(
+        Patient(name=f'Patient {n}', age=40, gender='male', phone='0700000000', department='eye')
+        for n in range(7)
+    )
+    database.session.commit()
+    client = login('admin')
+
+    whole = client.get('/api/admin/all-patients')
+    assert len(whole.get_json()) == 7
+    assert 'X-Next-Cursor' not in whole.headers
+
+    page = client.get('/api/admin/all-patients?limit=5')
+    assert len(page.get_json()) == 5
+    rest = client.get('/api/admin/all-patients?cursor=' + page.headers['X-Next-Cursor'])
+    assert len(rest.get_json()) == 2
@@ -0,0 +1,44 @@
+import os
+import signal
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import passwords
+
+
+@pytest.mark.parametrize('stored, configured, stale', [
+    ('scrypt:32768:8:1', 'scrypt', False),
+    ('scrypt:32768:8:1', 'scrypt:32768:8:1', False),
+    ('scrypt:32768:8:1', 'scrypt:65536:8:1', True),
+    ('scrypt:32768:8:1', 'scrypt:16384:8:1', False),
+    ('scrypt:32768:8:1', 'scrypt:65536:4:1', False),
+    ('scrypt:32768:8:1', 'pbkdf2:sha256', False),
+    ('pbkdf2:sha256:1000', 'scrypt:32768:8:1', True),
+    ('pbkdf2:sha256:1000', 'pbkdf2:sha256:2000', True),
+    ('pbkdf2:sha256:2000', 'pbkdf2:sha256:1000', False),
+])
+def test_needs_rehash_only_for_a_stronger_method(app, monkeypatch, stored, configured, stale):
+    stored = generate_password_hash('secret', stored)
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_METHOD', configured)
+    with app.test_request_context():
+        assert passwords.needs_rehash(stored) is stale
+
+
+def test_pool_is_replaced_after_a_worker_dies(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_WORKERS', 1)
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    monkeypatch.setattr(passwords, '_slots', None)
+    monkeypatch.setattr(passwords, '_executor', None)
+
+    with app.test_request_context():
+        assert passwords.verify_password(passwords.hash_password('secret'), 'secret')
+
+        # Simulate the OOM killer taking the hashing process
+        broken = passwords._executor
+        for pid in list(broken._processes):
+            os.kill(pid, signal.SIGKILL)
+
+        assert passwords.verify_password(passwords.hash_password('secret'), 'secret')
+        assert passwords._executor is not broken
+        passwords._executor.shutdown()
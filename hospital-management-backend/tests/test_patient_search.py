@@ -0,0 +1,38 @@
+from models import Patient
+from patient_search import search_patients
+
+
+def test_best_matches_found_among_many_hits(database):
+    # 600 patients match "mar" only inside their surname; the one whose
+    # name starts with it was registered last and must still rank first
+    database.session.add_all(
+        Patient(name=f'Anne Marsh {n}', age=40, gender='female', phone=f'0711{n:06d}', department='eye')
+        for n in range(600)
+    )
+    database.session.add(Patient(name='Mary Wanjiru', age=35, gender='female', phone='0722000000', department='eye'))
+    database.session.commit()
+
+    results = search_patients('mar', 5)
+
+    assert len(results) == 5
+    assert results[0].name == 'Mary Wanjiru'
+
+
+def test_short_terms_only_match_name_prefixes(database):
+    database.session.add_all([
+        Patient(name='Kevin Otieno', age=40, gender='male', phone='0711000000', department='eye'),
+        Patient(name='Amina Kevo', age=40, gender='female', phone='0711000001', department='eye'),
+        Patient(name='Keziah Mutua', age=40, gender='female', phone='0711000002', department='eye'),
+    ])
+    database.session.commit()
+
+    assert [p.name for p in search_patients('ke', 10)] == ['Kevin Otieno', 'Keziah Mutua']
+    # From three characters on, other matches follow the prefix matches
+    assert [p.name for p in search_patients('kev', 10)] == ['Kevin Otieno', 'Amina Kevo']
+
+
+def test_phone_numbers_match_from_three_digits(database):
+    database.session.add(Patient(name='Grace Chebet', age=40, gender='female', phone='0733123456', department='eye'))
+    database.session.commit()
+
+    assert [p.name for p in search_patients('07331', 10)] == ['Grace Chebet']
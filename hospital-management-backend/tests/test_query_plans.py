@@ -0,0 +1,38 @@
+import pytest
+
+import query_plans
+from benchmarks.synthetic import generate
+from query_plans import HOT_ROUTES, check_query_plans
+
+
+@pytest.fixture
+def seeded(database):
+    # A few thousand synthetic rows: one doctor per department
+    generate(rows=4000, doctors=3, receptionists=1, admins=1, report=lambda message: None)
+
+
+def test_hot_queries_use_an_index(seeded):
+    # Same check as `flask check-query-plans`: every hot route is requested
+    # and the plan of each statement it runs is checked, so a dropped index
+    # or a reshaped route query fails the suite
+    failures = check_query_plans()
+    assert failures == [], '\n'.join(f'{endpoint}: {detail} ({table})' for endpoint, table, detail in failures)
+
+
+def test_every_hot_route_is_checked(seeded, monkeypatch):
+    # A route that stops short (404, bad parameters) would run no list
+    # queries and pass the check without being checked
+    checked = []
+    route_statements = query_plans._route_statements
+
+    def record(app, role, user, path):
+        status, executed = route_statements(app, role, user, path)
+        checked.append((path, status, len(executed)))
+        return status, executed
+
+    monkeypatch.setattr(query_plans, '_route_statements', record)
+    check_query_plans()
+
+    assert len(checked) == len(HOT_ROUTES)
+    assert [(path, status) for path, status, _ in checked if status != 200] == []
+    assert all(count for _, _, count in checked)
@@ -0,0 +1,40 @@
+import pytest
+
+from models import Patient, Queue, VitalSigns
+from sql_stats import count_queries
+
+
+def seed_visits(database, users, count):
+    # Queued patients, each with vitals taken by the receptionist and doctor
+    patient_ids = []
+    for n in range(count):
+        patient = Patient(name=f'Patient {n}', age=40, gender='male', phone='0700000000', department='eye')
+        database.session.add(patient)
+        database.session.flush()
+        database.session.add(Queue(patient_id=patient.id, doctor_id=users['doctor'].id, priority=n % 2))
+        for recorder in ('receptionist', 'doctor'):
+            database.session.add(VitalSigns(patient_id=patient.id, recorded_by=users[recorder].id,
+                                            blood_pressure='120/80', heart_rate=70))
+        patient_ids.append(patient.id)
+    database.session.commit()
+    return patient_ids
+
+
+@pytest.mark.parametrize('role, url', [
+    ('doctor', '/api/doctor/queue'),
+    ('receptionist', '/api/receptionist/queue'),
+    ('doctor', '/api/vitals/patient/{id}'),
+])
+def test_listing_loads_related_rows_in_one_statement(database, users, login, role, url):
+    client = login(role)
+    counts = []
+    for count in (1, 15):
+        patient_ids = seed_visits(database, users, count)
+        with count_queries() as queries:
+            response = client.get(url.format(id=patient_ids[0]))
+        assert response.status_code == 200, response.get_data(as_text=True)
+        counts.append(queries.count)
+
+    # Names of the patient, doctor and recorder come from joins, not a lazy
+    # load per row
+    assert counts == [1, 1], queries.statements
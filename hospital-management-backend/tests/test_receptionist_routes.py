@@ -0,0 +1,52 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from models import Appointment, Billing, Consultation, Patient
+from sql_stats import count_queries
+
+
+def seed_patients(database, doctor, count, visits):
+    # Patients with an appointment, and a consultation and bill per visit
+    patients = []
+    for n in range(count):
+        patient = Patient(name=f'Patient {n}', age=30 + n, gender='female',
+                          phone='0700000000', address='Nairobi', department='eye')
+        database.session.add(patient)
+        database.session.flush()
+        database.session.add(Appointment(patient_id=patient.id, doctor_id=doctor.id,
+                                         date=date.today(), time=time(9, n % 60)))
+        for days_ago in range(visits):
+            consultation = Consultation(patient_id=patient.id, doctor_id=doctor.id, diagnosis='Checkup',
+                                        created_at=datetime.utcnow() - timedelta(days=days_ago))
+            database.session.add(consultation)
+            database.session.flush()
+            database.session.add(Billing(consultation_id=consultation.id, patient_id=patient.id, amount=500))
+        patients.append(patient)
+    database.session.commit()
+    return patients
+
+
+def statements_for(client, url):
+    with count_queries() as queries:
+        response = client.get(url)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return queries.count, response.get_json()
+
+
+@pytest.mark.parametrize('url', ['/api/receptionist/patients', '/api/receptionist/patient-details/{id}'])
+def test_statement_count_does_not_grow_with_rows(database, users, login, url):
+    client = login('receptionist')
+
+    few = seed_patients(database, users['doctor'], count=2, visits=1)
+    few_count, few_body = statements_for(client, url.format(id=few[0].id))
+
+    many = seed_patients(database, users['doctor'], count=20, visits=5)
+    many_count, many_body = statements_for(client, url.format(id=many[0].id))
+
+    assert many_count == few_count
+    if isinstance(many_body, list):
+        assert len(many_body) == 22
+        assert all(row['last_session'] for row in many_body)
+    else:
+        assert many_body['last_session'] and len(many_body['bills']) == 5
@@ -0,0 +1,38 @@
+import json
+
+from slow_queries import slow_query_summary
+
+
+def write_log(path, statements):
+    with open(path, 'w') as f:
+        for n, statement in enumerate(statements):
+            f.write(json.dumps({
+                'time': f'2026-10-18T10:00:{n:02d}', 'duration_ms': 10.0, 'statement': statement,
+                'params': None, 'endpoint': 'admin.dashboard', 'path': '/api/admin/dashboard'
+            }) + '\n')
+
+
+def test_summary_reads_only_the_newest_bytes(tmp_path):
+    path = str(tmp_path / 'slow.log')
+    write_log(path + '.2', ['SELECT old'] * 50)
+    write_log(path + '.1', ['SELECT older_than_current'] * 5)
+    write_log(path, ['SELECT current'] * 5)
+
+    everything = {group['statement']: group['count'] for group in slow_query_summary(path, max_bytes=10 ** 6)}
+    assert everything == {'SELECT old': 50, 'SELECT older_than_current': 5, 'SELECT current': 5}
+
+    # Budget for the current file and part of .1: .2 is never opened
+    budget = len(open(path).read()) + 300
+    recent = {group['statement']: group['count'] for group in slow_query_summary(path, max_bytes=budget)}
+    assert set(recent) == {'SELECT older_than_current', 'SELECT current'}
+    assert recent['SELECT current'] == 5 and recent['SELECT older_than_current'] < 5
+
+
+def test_summary_is_cached_until_the_log_changes(tmp_path):
+    path = str(tmp_path / 'slow.log')
+    write_log(path, ['SELECT 1'] * 3)
+    first = slow_query_summary(path)
+    assert slow_query_summary(path) is first
+
+    write_log(path, ['SELECT 1'] * 4)
+    assert slow_query_summary(path)[0]['count'] == 4
@@ -0,0 +1,89 @@
+import math
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import Integer, cast, extract, func, select
+
+from extensions import db
+from models import VitalSigns
+
+# Blood pressure is entered as free text ("120/80", "120 / 80 sitting");
+# systolic and diastolic are kept alongside it as integers so they can be
+# aggregated. Readings outside these ranges are typos and stay unparsed.
+_BLOOD_PRESSURE = re.compile(r'^\s*(\d{2,3})\s*/\s*(\d{2,3})\b')
+SYSTOLIC_RANGE = (50, 300)
+DIASTOLIC_RANGE = (20, 200)
+
+# Metrics the trend endpoint aggregates
+TREND_METRICS = ('systolic', 'diastolic', 'heart_rate', 'temperature', 'oxygen_saturation', 'weight')
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def parse_blood_pressure(text):
+    # '120/80' -> (120, 80); anything unreadable -> (None, None)
+    match = _BLOOD_PRESSURE.match(text or '')
+    if not match:
+        return None, None
+    systolic, diastolic = int(match.group(1)), int(match.group(2))
+    if not (SYSTOLIC_RANGE[0] <= systolic <= SYSTOLIC_RANGE[1]
+            and DIASTOLIC_RANGE[0] <= diastolic <= DIASTOLIC_RANGE[1]
+            and systolic > diastolic):
+        return None, None
+    return systolic, diastolic
+
+
+def _bucket(start, width):
+    # Index of the width-second bucket a reading falls in, counted from start.
+    # created_at is a naive UTC timestamp, and extract(epoch) reads it as such
+    # on both databases.
+    offset = extract('epoch', VitalSigns.created_at) - int((start - _EPOCH).total_seconds())
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.floor(offset / width)
+    # SQLite's epoch is whole seconds, so this is integer division
+    return cast(offset / width, Integer)
+
+
+def vitals_trend(patient_id, start, end, points):
+    # Splits [start, end) into at most `points` equal buckets and returns one
+    # entry per bucket that has readings, with min/max/mean of every metric.
+    # The grouping runs in the database: a long stay's thousands of readings
+    # never leave it.
+    start = start.replace(microsecond=0)
+    width = max(1, math.ceil((end - start).total_seconds() / points))
+    bucket = _bucket(start, width).label('bucket')
+
+    columns = [bucket, func.count().label('count')]
+    for metric in TREND_METRICS:
+        column = getattr(VitalSigns, metric)
+        columns += [
+            func.min(column).label(f'{metric}_min'),
+            func.max(column).label(f'{metric}_max'),
+            func.avg(column).label(f'{metric}_mean')
+        ]
+
+    rows = db.session.execute(
+        select(*columns)
+        .where(VitalSigns.patient_id == patient_id,
+               VitalSigns.created_at >= start,
+               VitalSigns.created_at < end)
+        .group_by(bucket)
+        .order_by(bucket)
+    ).all()
+
+    series = []
+    for row in rows:
+        index = int(row.bucket)
+        entry = {
+            'start': (start + timedelta(seconds=index * width)).isoformat(),
+            'count': row.count
+        }
+        for metric in TREND_METRICS:
+            mean = getattr(row, f'{metric}_mean')
+            entry[metric] = {
+                'min': getattr(row, f'{metric}_min'),
+                'max': getattr(row, f'{metric}_max'),
+                'mean': round(float(mean), 1) if mean is not None else None
+            }
+        series.append(entry)
+    return width, series
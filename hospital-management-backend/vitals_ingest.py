@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select
+
+from extensions import db
+from models import Patient, VitalSigns
+from vital_trends import parse_blood_pressure
+
+# Bedside monitors post readings for many beds at once. A batch is checked
+# as a whole (one patient lookup for every reading), the valid readings are
+# inserted in one executemany in one transaction, and the caller gets a
+# result per reading, so one bad reading never holds up the rest.
+
+# Numeric fields a reading may carry: (python type, lowest, highest)
+FIELDS = {
+    'systolic': (int, 50, 300),
+    'diastolic': (int, 20, 200),
+    'heart_rate': (int, 20, 300),
+    'temperature': (float, 25.0, 45.0),
+    'weight': (float, 0.5, 500.0),
+    'height': (float, 20.0, 300.0),
+    'oxygen_saturation': (int, 0, 100)
+}
+
+# How far ahead of the server's clock a device's recorded_at may be
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+def _number(value, kind, low, high):
+    # JSON booleans are ints to Python; a device sending true is an error
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError('must be a number')
+    if kind is int and value != int(value):
+        raise ValueError('must be a whole number')
+    if not low <= value <= high:
+        raise ValueError(f'must be between {low} and {high}')
+    return kind(value)
+
+
+def _recorded_at(value):
+    # ISO timestamp; offsets are converted to naive UTC like created_at
+    if not isinstance(value, str):
+        raise ValueError('must be an ISO timestamp')
+    recorded_at = datetime.fromisoformat(value)
+    if recorded_at.tzinfo:
+        recorded_at = recorded_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return recorded_at
+
+
+def _validate(reading, recorded_by, now):
+    # One reading -> a vital_signs row, or ValueError naming the bad field
+    if not isinstance(reading, dict):
+        raise ValueError('reading must be an object')
+    patient_id = reading.get('patient_id')
+    if isinstance(patient_id, bool) or not isinstance(patient_id, int):
+        raise ValueError('patient_id must be an integer')
+
+    row = {'patient_id': patient_id, 'recorded_by': recorded_by, 'created_at': now}
+    for name, (kind, low, high) in FIELDS.items():
+        value = reading.get(name)
+        if value is None:
+            row[name] = None
+            continue
+        try:
+            row[name] = _number(value, kind, low, high)
+        except ValueError as e:
+            raise ValueError(f'{name} {e}')
+    if row['systolic'] is not None and row['diastolic'] is not None and row['systolic'] <= row['diastolic']:
+        raise ValueError('systolic must be above diastolic')
+
+    blood_pressure = reading.get('blood_pressure')
+    if blood_pressure is not None and not isinstance(blood_pressure, str):
+        raise ValueError('blood_pressure must be text like 120/80')
+    if blood_pressure and row['systolic'] is None and row['diastolic'] is None:
+        row['systolic'], row['diastolic'] = parse_blood_pressure(blood_pressure)
+    elif not blood_pressure and row['systolic'] is not None and row['diastolic'] is not None:
+        blood_pressure = f"{row['systolic']}/{row['diastolic']}"
+    if blood_pressure and len(blood_pressure) > VitalSigns.blood_pressure.type.length:
+        raise ValueError('blood_pressure is too long')
+    row['blood_pressure'] = blood_pressure or None
+
+    if reading.get('recorded_at') is not None:
+        try:
+            row['created_at'] = _recorded_at(reading['recorded_at'])
+        except ValueError:
+            raise ValueError('recorded_at must be an ISO timestamp')
+        if row['created_at'] > now + CLOCK_SKEW:
+            raise ValueError('recorded_at is in the future')
+
+    if all(row[name] is None for name in FIELDS):
+        raise ValueError('reading has no measurements')
+    return row
+
+
+def ingest_readings(readings, recorded_by):
+    # Returns one {'index', 'id'} or {'index', 'error'} per reading, in order
+    now = datetime.utcnow()
+    results = [None] * len(readings)
+    rows = []
+    indexes = []
+    for index, reading in enumerate(readings):
+        try:
+            rows.append(_validate(reading, recorded_by, now))
+            indexes.append(index)
+        except ValueError as e:
+            results[index] = {'index': index, 'error': str(e)}
+
+    patient_ids = {row['patient_id'] for row in rows}
+    known = set(db.session.execute(
+        select(Patient.id).where(Patient.id.in_(patient_ids))
+    ).scalars()) if patient_ids else set()
+
+    valid_rows = []
+    valid_indexes = []
+    for index, row in zip(indexes, rows):
+        if row['patient_id'] in known:
+            valid_rows.append(row)
+            valid_indexes.append(index)
+        else:
+            results[index] = {'index': index, 'error': 'Patient not found'}
+
+    if valid_rows:
+        ids = db.session.execute(
+            insert(VitalSigns).returning(VitalSigns.id, sort_by_parameter_order=True),
+            valid_rows
+        ).scalars().all()
+        db.session.commit()
+        for index, id_ in zip(valid_indexes, ids):
+            results[index] = {'index': index, 'id': id_}
+    return results
@@ -39,7 +39,7 @@ export const receptionistAPI = {
   getQueue: () => api.get('/receptionist/queue'),
   addToQueue: (data) => api.post('/receptionist/add-to-queue', data),
   removeFromQueue: (queueId) => api.delete(`/receptionist/remove-from-queue/${queueId}`),
-  getPatientNames: () => api.get('/receptionist/patient-names'),
+  searchPatients: (q) => api.get('/receptionist/patients/search', { params: { q } }),
   getDoctorNames: () => api.get('/receptionist/doctor-names')
 };
 
@@ -0,0 +1,65 @@
+import React, { useState, useEffect } from 'react';
+import { receptionistAPI } from '../../api/endpoints';
+
+// Typeahead over the patient search endpoint. Calls onSelect with the chosen
+// patient ({id, name, phone, ...}), or null while the text matches none.
+const PatientSearch = ({ onSelect }) => {
+  const [term, setTerm] = useState('');
+  const [matches, setMatches] = useState([]);
+  const [open, setOpen] = useState(false);
+
+  useEffect(() => {
+    if (term.trim().length < 2) {
+      setMatches([]);
+      return undefined;
+    }
+    // Wait for a pause in typing before asking the server
+    const timer = setTimeout(async () => {
+      try {
+        const response = await receptionistAPI.searchPatients(term);
+        setMatches(response.data);
+      } catch (error) {
+        console.error('Error searching patients:', error);
+      }
+    }, 200);
+    return () => clearTimeout(timer);
+  }, [term]);
+
+  const choose = (patient) => {
+    setTerm(patient.name);
+    setOpen(false);
+    onSelect(patient);
+  };
+
+  return (
+    <div style={{position: 'relative'}}>
+      <input
+        type="text"
+        value={term}
+        placeholder="Search patient by name or phone"
+        onChange={(e) => { setTerm(e.target.value); setOpen(true); onSelect(null); }}
+        onFocus={() => setOpen(true)}
+        onBlur={() => setTimeout(() => setOpen(false), 150)}
+        required
+        style={{width: '100%', boxSizing: 'border-box', padding: '10px', borderRadius: '6px', border: '1px solid #3a3f5c', background: '#1e1e2f', color: '#ccd6f6', fontSize: '14px'}}
+      />
+      {open && matches.length > 0 && (
+        <ul style={{position: 'absolute', zIndex: 10, left: 0, right: 0, margin: '4px 0 0 0', padding: '4px 0', listStyle: 'none', background: '#1e1e2f', border: '1px solid #3a3f5c', borderRadius: '6px', maxHeight: '240px', overflowY: 'auto'}}>
+          {matches.map(patient => (
+            <li
+              key={patient.id}
+              onMouseDown={() => choose(patient)}
+              style={{padding: '8px 10px', color: '#ccd6f6', fontSize: '14px', cursor: 'pointer'}}
+              onMouseOver={(e) => e.currentTarget.style.background = '#3a3f5c'}
+              onMouseOut={(e) => e.currentTarget.style.background = 'transparent'}
+            >
+              {patient.name} <span style={{color: '#a0aec0'}}>{patient.phone}</span>
+            </li>
+          ))}
+        </ul>
+      )}
+    </div>
+  );
+};
+
+export default PatientSearch;
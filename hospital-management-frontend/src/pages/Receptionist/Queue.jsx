@@ -1,14 +1,14 @@
 import React, { useState, useEffect } from 'react';
 import { receptionistAPI } from '../../api/endpoints';
 import { showToast } from '../../components/Toast/Toast';
+import PatientSearch from '../../components/PatientSearch/PatientSearch';
 
 const Queue = () => {
   const [queue, setQueue] = useState([]);
-  const [patientNames, setPatientNames] = useState([]);
   const [doctorNames, setDoctorNames] = useState([]);
   const [showForm, setShowForm] = useState(false);
   const [formData, setFormData] = useState({
-    patientName: '',
+    patient_id: null,
     doctorName: '',
     department: ''
   });
@@ -34,11 +34,7 @@ const Queue = () => {
 
   const fetchNames = async () => {
     try {
-      const [patientsRes, doctorsRes] = await Promise.all([
-        receptionistAPI.getPatientNames(),
-        receptionistAPI.getDoctorNames()
-      ]);
-      setPatientNames(patientsRes.data);
+      const doctorsRes = await receptionistAPI.getDoctorNames();
       setDoctorNames(doctorsRes.data);
     } catch (error) {
       console.error('Error fetching names:', error);
@@ -56,12 +52,16 @@ const Queue = () => {
 
   const handleSubmit = async (e) => {
     e.preventDefault();
+    if (!formData.patient_id) {
+      showToast('Choose a patient from the search results', 'error');
+      return;
+    }
     try {
       const response = await receptionistAPI.addToQueue(formData);
       if (response.data.success) {
         showToast('Patient added to queue successfully!', 'success');
         setShowForm(false);
-        setFormData({ patientName: '', doctorName: '', department: '' });
+        setFormData({ patient_id: null, doctorName: '', department: '' });
         fetchQueue();
         window.dispatchEvent(new Event('dataChanged'));
       }
@@ -92,17 +92,9 @@ const Queue = () => {
 
       {showForm && (
         <form onSubmit={handleSubmit} className="queue-form" style={{background: '#2a2d47', padding: '20px', borderRadius: '12px', marginBottom: '24px', display: 'grid', gridTemplateColumns: 'repeat(auto-fit, minmax(200px, 1fr))', gap: '16px', alignItems: 'end'}}>
-          <select
-            value={formData.patientName}
-            onChange={(e) => setFormData({...formData, patientName: e.target.value})}
-            required
-            style={{padding: '10px', borderRadius: '6px', border: '1px solid #3a3f5c', background: '#1e1e2f', color: '#ccd6f6', fontSize: '14px'}}
-          >
-            <option value="">Select Patient</option>
-            {patientNames.map(name => (
-              <option key={name} value={name}>{name}</option>
-            ))}
-          </select>
+          <PatientSearch
+            onSelect={(patient) => setFormData(data => ({...data, patient_id: patient ? patient.id : null}))}
+          />
           <select
             value={formData.doctorName}
             onChange={(e) => setFormData({...formData, doctorName: e.target.value})}
@@ -128,7 +120,7 @@ const Queue = () => {
 
           <div style={{display: 'flex', gap: '8px'}}>
             <button type="submit" style={{padding: '10px 16px', borderRadius: '6px', border: 'none', background: '#64ffda', color: '#1e1e2f', fontSize: '14px', fontWeight: '600', cursor: 'pointer'}} onMouseOver={(e) => e.target.style.background = '#4fd1c7'} onMouseOut={(e) => e.target.style.background = '#64ffda'}>Add to Queue</button>
-            <button type="button" onClick={() => setShowForm(false)} style={{padding: '10px 16px', borderRadius: '6px', border: '1px solid #3a3f5c', background: 'transparent', color: '#ccd6f6', fontSize: '14px', cursor: 'pointer'}} onMouseOver={(e) => e.target.style.background = '#3a3f5c'} onMouseOut={(e) => e.target.style.background = 'transparent'}>Cancel</button>
+            <button type="button" onClick={() => { setShowForm(false); setFormData(data => ({...data, patient_id: null})); }} style={{padding: '10px 16px', borderRadius: '6px', border: '1px solid #3a3f5c', background: 'transparent', color: '#ccd6f6', fontSize: '14px', cursor: 'pointer'}} onMouseOver={(e) => e.target.style.background = '#3a3f5c'} onMouseOut={(e) => e.target.style.background = 'transparent'}>Cancel</button>
           </div>
         </form>
       )}